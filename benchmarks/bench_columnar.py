@@ -0,0 +1,62 @@
+"""So sánh kích thước payload và thời gian serialize: danh sách `DataOut` vs chế độ columnar.
+
+Chạy: python -m benchmarks.bench_columnar [so_dong]
+"""
+import json
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from src.schemas.data import DataOut
+from src.core.columnar import rows_to_columns
+
+KEYS = ["ma_du_lieu", "ma_may_bom", "thoi_gian_tao", "luu_luong_nuoc", "do_am_dat", "nhiet_do", "do_am", "mua", "so_xung", "tong_the_tich"]
+
+
+def _rows(n: int):
+    start = datetime(2024, 1, 1)
+    return [
+        (i, 1, start + timedelta(minutes=i), 12.5 + i % 7, 40.0 + i % 13, 28.0 + i % 5, 70.0 + i % 11, 0.0, i % 300, 1000.0 + i)
+        for i in range(n)
+    ]
+
+
+def _bench(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main(n: int = 10000) -> None:
+    rows = _rows(n)
+    owner = uuid.uuid4()
+
+    def as_objects() -> bytes:
+        items = [
+            DataOut(
+                ma_du_lieu=r[0], ma_may_bom=r[1], ma_nguoi_dung=owner, ngay=date(2024, 1, 1),
+                luu_luong_nuoc=r[3], do_am_dat=r[4], nhiet_do=r[5], do_am=r[6], mua=r[7],
+                so_xung=r[8], tong_the_tich=r[9], thoi_gian_tao=r[2],
+            )
+            for r in rows
+        ]
+        # Đường đi của FastAPI khi endpoint trả về dict chứa model pydantic
+        return json.dumps(jsonable_encoder({"data": items})).encode()
+
+    def as_columns() -> bytes:
+        return json.dumps({"data": rows_to_columns(KEYS, rows)}).encode()
+
+    size_obj, size_col = len(as_objects()), len(as_columns())
+    t_obj, t_col = _bench(as_objects), _bench(as_columns)
+    print(f"{n} dòng")
+    print(f"  DataOut list : {size_obj / 1024:8.1f} KiB  {t_obj:8.1f} ms")
+    print(f"  columnar     : {size_col / 1024:8.1f} KiB  {t_col:8.1f} ms")
+    print(f"  tỉ lệ        : {size_obj / size_col:8.2f}x      {t_obj / t_col:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,50 @@
+"""Độ tin cậy theo cây: vòng lặp `tree.predict(DataFrame)` cũ so với `forest_predict` vector hoá.
+
+Chạy: python -m benchmarks.bench_confidence
+"""
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from src.predict.ensemble import FEATURES, forest_predict
+
+warnings.filterwarnings("ignore")
+
+
+def _old(model, df):
+    prediction = model.predict(df)
+    preds = [tree.predict(df)[0] for tree in model.estimators_]
+    std_dev, mean_val = np.std(preds), np.mean(preds)
+    return float(prediction[0]), max(0.0, 1.0 - std_dev / abs(mean_val)) if mean_val else float(std_dev == 0)
+
+
+def _best(fn, repeat: int = 7) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    X = rng.uniform([0, 10, 15, 30], [1, 80, 40, 100], size=(5000, 4)).astype(np.float32)
+    y = 20 - 0.15 * X[:, 1] + 0.3 * X[:, 2] - 0.05 * X[:, 3] - 5 * X[:, 0] + rng.normal(0, 1, len(X))
+    df1 = pd.DataFrame(X[:1], columns=list(FEATURES))
+    batch = X[:256]
+
+    print(f"{'cây':>5} {'cũ 1 dòng':>12} {'mới 1 dòng':>12} {'x':>6} {'cũ 256 dòng':>13} {'mới 256 dòng':>13} {'x':>7}")
+    for n_trees in (100, 250, 500):
+        model = RandomForestRegressor(n_estimators=n_trees, max_depth=19, n_jobs=-1, random_state=0).fit(X, y)
+        model.n_jobs = 1  # cùng điều kiện như khi phục vụ request
+        t_old = _best(lambda: _old(model, df1))
+        t_new = _best(lambda: forest_predict(model, X[:1]))
+        t_old_b = _best(lambda: [_old(model, pd.DataFrame(batch[i:i + 1], columns=list(FEATURES))) for i in range(len(batch))], repeat=2)
+        t_new_b = _best(lambda: forest_predict(model, batch))
+        print(f"{n_trees:>5} {t_old:>10.2f}ms {t_new:>10.2f}ms {t_old / t_new:>5.1f}x {t_old_b:>11.1f}ms {t_new_b:>11.2f}ms {t_old_b / t_new_b:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
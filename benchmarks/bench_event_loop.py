@@ -0,0 +1,74 @@
+"""Độ trễ event loop khi có tải dự báo: suy luận inline so với thread pool / process pool.
+
+Một coroutine "nhịp tim" ngủ 5 ms liên tục và đo độ trễ thực tế so với lịch; đồng thời
+`so_request` coroutine gọi `forest_predict_async` liên tục như các request predict.
+
+Chạy: python -m benchmarks.bench_event_loop [so_request] [so_giay]
+"""
+import asyncio
+import statistics
+import sys
+import time
+import warnings
+import numpy as np
+from src.core import executor
+from src.core.config import settings
+from src.predict.ensemble import forest_predict_async
+from src.predict.registry import registry
+
+warnings.filterwarnings("ignore")
+
+TICK = 0.005
+X = np.array([[0.0, 41.0, 29.5, 72.0]], dtype=np.float32)
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append((time.perf_counter() - t0 - TICK) * 1000)
+
+
+async def _client(stop: asyncio.Event, model, done: list) -> None:
+    while not stop.is_set():
+        await forest_predict_async(settings.DEFAULT_MA_MO_HINH, model, X)
+        done.append(1)
+        # Phần I/O của request (đọc DB, ghi kết quả): nhường event loop
+        await asyncio.sleep(0)
+
+
+async def _run(n_clients: int, seconds: float):
+    model = registry.get(settings.DEFAULT_MA_MO_HINH).model
+    # Khởi động executor (và worker process) trước khi đo
+    await forest_predict_async(settings.DEFAULT_MA_MO_HINH, model, X)
+
+    stop = asyncio.Event()
+    lags, done = [], []
+    tasks = [asyncio.create_task(_heartbeat(stop, lags))]
+    tasks += [asyncio.create_task(_client(stop, model, done)) for _ in range(n_clients)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return lags, len(done) / seconds
+
+
+def main(n_clients: int = 8, seconds: float = 5.0) -> None:
+    for kind in ("inline", "thread", "process"):
+        settings.INFERENCE_EXECUTOR = kind
+        try:
+            lags, rps = asyncio.run(_run(n_clients, seconds))
+        finally:
+            executor.shutdown_executor()
+        lags.sort()
+        p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+        print(
+            f"{kind:8s} lag p50 {statistics.median(lags):7.2f} ms   p99 {p99:7.2f} ms   "
+            f"max {lags[-1]:7.2f} ms   {rps:7.1f} predict/s"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0,
+    )
@@ -0,0 +1,43 @@
+"""Thời gian dự báo: sklearn, duyệt cây của sklearn (per_tree_predictions) và FlatForest numpy/numba.
+
+Chạy: python -m benchmarks.bench_flat_forest [so_lan]
+"""
+import sys
+import time
+import warnings
+import numpy as np
+from src.predict.ensemble import per_tree_predictions
+from src.predict.flat_forest import compile_forest, numba_available
+from src.predict.registry import ModelRegistry
+
+warnings.filterwarnings("ignore")
+
+
+def _ms(fn, X, n: int) -> float:
+    fn(X)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(X)
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def main(n: int = 50) -> None:
+    model = ModelRegistry().get(11).model
+    rng = np.random.RandomState(1)
+    batches = {rows: (rng.rand(rows, 4) * [50, 100, 45, 100]).astype(np.float32) for rows in (1, 16, 256)}
+
+    candidates = [
+        ("sklearn predict", model.predict),
+        ("per_tree_predictions", lambda X: per_tree_predictions(model, X)),
+        ("flat numpy", compile_forest(model, "numpy").per_tree),
+    ]
+    if numba_available():
+        candidates.append(("flat numba", compile_forest(model, "numba").per_tree))
+
+    print(f"{'':22s}" + "".join(f"{rows:>10d} dòng" for rows in batches))
+    for name, fn in candidates:
+        print(f"{name:22s}" + "".join(f"{_ms(fn, X, n):11.3f} ms" for X in batches.values()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
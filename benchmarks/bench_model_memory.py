@@ -0,0 +1,75 @@
+"""Bộ nhớ của mỗi worker khi nạp mô hình bằng joblib so với dạng phẳng memmap.
+
+Khởi động `so_worker` process (spawn, như các worker uvicorn) cho mỗi định dạng; mỗi process
+nạp mô hình qua ModelRegistry, chạy một lần dự báo rồi đọc /proc/self/smaps_rollup khi tất cả
+worker đều đang giữ mô hình. PSS chia phần trang dùng chung cho các process nên phản ánh bộ nhớ
+thực sự tốn thêm cho mỗi worker. Chỉ chạy trên Linux.
+
+Chạy: python -m benchmarks.bench_model_memory [so_worker]
+"""
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import os
+
+
+def _memory_kib() -> dict:
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                out[key] = int(rest.split()[0])
+    return out
+
+
+def _worker(model_dir: str, model_format: str, barrier, results) -> None:
+    import warnings
+    import numpy as np
+    import sklearn.ensemble  # noqa: F401  (import ở cả hai định dạng: chỉ đo phần mảng của mô hình)
+    from src.predict.ensemble import forest_predict
+    from src.predict.registry import ModelRegistry
+
+    warnings.filterwarnings("ignore")
+    before = _memory_kib()
+    model = ModelRegistry(model_dir, model_format=model_format).get(11).model
+    forest_predict(model, np.array([[0.0, 41.0, 29.5, 72.0]], dtype=np.float32))
+    barrier.wait()
+    after = _memory_kib()
+    results.put({k: after[k] - before[k] for k in after})
+    barrier.wait()
+
+
+def _run(model_dir: str, model_format: str, n: int):
+    ctx = mp.get_context("spawn")
+    barrier = ctx.Barrier(n)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(model_dir, model_format, barrier, results)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return rows
+
+
+def main(n: int = 4) -> None:
+    from src.predict.registry import DEFAULT_ARTIFACT, MODEL_DIR, ModelRegistry
+
+    model_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(MODEL_DIR, DEFAULT_ARTIFACT), model_dir)
+        # Tạo sẵn thư mục .flat để các worker chỉ đo phần nạp memmap
+        ModelRegistry(model_dir, model_format="flat").get(11)
+        for model_format in ("joblib", "flat"):
+            rows = _run(model_dir, model_format, n)
+            rss = sum(r["Rss"] for r in rows) / len(rows) / 1024
+            pss = sum(r["Pss"] for r in rows) / len(rows) / 1024
+            print(f"{model_format:7s} x{n}: +RSS {rss:7.2f} MiB/worker   +PSS {pss:7.2f} MiB/worker   tổng +PSS {pss * n:7.2f} MiB")
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,44 @@
+"""Độ trễ predict khi nạp mô hình mỗi request (cold) so với dùng ModelRegistry (warm).
+
+Chạy: python -m benchmarks.bench_model_registry [so_lan]
+"""
+import statistics
+import sys
+import time
+import warnings
+import joblib
+import pandas as pd
+from src.predict.registry import ModelRegistry
+
+warnings.filterwarnings("ignore")
+
+ROW = pd.DataFrame({"mua": [0.0], "do_am_dat": [41.0], "nhiet_do": [29.5], "do_am": [72.0]})
+
+
+def _timed(fn, n: int):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main(n: int = 20) -> None:
+    reg = ModelRegistry(check_interval=0)  # kiểm tra mtime mỗi lần gọi: trường hợp xấu nhất
+    path = reg.artifact_path(11)
+
+    def cold():
+        joblib.load(path).predict(ROW)
+
+    def warm():
+        reg.get(11).model.predict(ROW)
+
+    reg.get(11)
+    for name, fn in (("cold (joblib.load mỗi request)", cold), ("warm (registry)", warm)):
+        p50, worst = _timed(fn, n)
+        print(f"{name:32s} p50 {p50:8.1f} ms   max {worst:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,6 @@
+-- Keyset pagination on (thoi_gian_tao, ma_du_lieu), filtered by the denormalized owner column
+CREATE INDEX IF NOT EXISTS ix_du_lieu_cam_bien_nguoi_dung_thoi_gian
+    ON du_lieu_cam_bien (ma_nguoi_dung, thoi_gian_tao DESC, ma_du_lieu DESC);
+
+CREATE INDEX IF NOT EXISTS ix_du_lieu_cam_bien_may_bom_thoi_gian
+    ON du_lieu_cam_bien (ma_may_bom, thoi_gian_tao DESC, ma_du_lieu DESC);
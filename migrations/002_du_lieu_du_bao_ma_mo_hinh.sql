@@ -0,0 +1,3 @@
+-- Forecast rows record which MoHinhDuBao produced them
+ALTER TABLE du_lieu_du_bao
+    ADD COLUMN IF NOT EXISTS ma_mo_hinh INTEGER REFERENCES mo_hinh_du_bao (ma_mo_hinh);
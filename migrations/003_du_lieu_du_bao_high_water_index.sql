@@ -0,0 +1,6 @@
+-- Latest forecast per (pump, model): high-water mark for the scheduled forecasting job
+CREATE INDEX IF NOT EXISTS ix_du_lieu_du_bao_may_bom_mo_hinh_thoi_gian
+    ON du_lieu_du_bao (ma_may_bom, ma_mo_hinh, thoi_gian_tao DESC);
+
+CREATE INDEX IF NOT EXISTS ix_nhat_ky_may_bom_may_bom_thoi_gian_bat
+    ON nhat_ky_may_bom (ma_may_bom, thoi_gian_bat DESC);
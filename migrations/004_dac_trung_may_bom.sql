@@ -0,0 +1,26 @@
+-- Feature store: rolling features per pump as of each sensor reading
+CREATE TABLE IF NOT EXISTS dac_trung_may_bom (
+    ma_du_lieu INTEGER PRIMARY KEY REFERENCES du_lieu_cam_bien (ma_du_lieu) ON DELETE CASCADE,
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom),
+    thoi_gian TIMESTAMP NOT NULL,
+    do_am_dat_tb_1h DOUBLE PRECISION,
+    do_am_dat_tb_6h DOUBLE PRECISION,
+    do_am_dat_tb_24h DOUBLE PRECISION,
+    do_am_tb_1h DOUBLE PRECISION,
+    do_am_tb_6h DOUBLE PRECISION,
+    do_am_tb_24h DOUBLE PRECISION,
+    mua_tong_6h DOUBLE PRECISION,
+    mua_tong_24h DOUBLE PRECISION,
+    thoi_luong_tuoi_gan_nhat DOUBLE PRECISION,
+    thoi_gian_tu_lan_tuoi DOUBLE PRECISION,
+    thoi_gian_tao TIMESTAMP DEFAULT now()
+);
+
+-- Point-in-time lookup and per-pump high-water mark
+CREATE INDEX IF NOT EXISTS ix_dac_trung_may_bom_may_bom_thoi_gian
+    ON dac_trung_may_bom (ma_may_bom, thoi_gian DESC, ma_du_lieu DESC);
+
+-- Completed runs per pump, ordered by stop time
+CREATE INDEX IF NOT EXISTS ix_nhat_ky_may_bom_may_bom_thoi_gian_tat
+    ON nhat_ky_may_bom (ma_may_bom, thoi_gian_tat)
+    WHERE thoi_gian_tat IS NOT NULL;
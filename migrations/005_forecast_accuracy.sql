@@ -0,0 +1,23 @@
+-- Realized flow matched to each forecast
+ALTER TABLE du_lieu_du_bao
+    ADD COLUMN IF NOT EXISTS luu_luong_thuc_te DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS thoi_gian_doi_chieu TIMESTAMP;
+
+-- Forecasts still waiting to be matched
+CREATE INDEX IF NOT EXISTS ix_du_lieu_du_bao_chua_doi_chieu
+    ON du_lieu_du_bao (thoi_diem_du_bao)
+    WHERE thoi_gian_doi_chieu IS NULL;
+
+-- Running error statistics per model and pump
+CREATE TABLE IF NOT EXISTS thong_ke_sai_so_du_bao (
+    ma_mo_hinh INTEGER NOT NULL REFERENCES mo_hinh_du_bao (ma_mo_hinh),
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom),
+    so_mau INTEGER NOT NULL DEFAULT 0,
+    tong_sai_so_tuyet_doi DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tong_binh_phuong_sai_so DOUBLE PRECISION NOT NULL DEFAULT 0,
+    so_mau_phan_tram INTEGER NOT NULL DEFAULT 0,
+    tong_sai_so_phan_tram DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ewma_sai_so_phan_tram DOUBLE PRECISION,
+    thoi_gian_cap_nhat TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (ma_mo_hinh, ma_may_bom)
+);
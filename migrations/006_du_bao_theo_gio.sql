@@ -0,0 +1,16 @@
+-- Multi-step (hourly) forecasts: one row per horizon, values stored as arrays
+CREATE TABLE IF NOT EXISTS du_bao_theo_gio (
+    ma_du_bao_theo_gio BIGSERIAL PRIMARY KEY,
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom),
+    ma_nguoi_dung UUID NOT NULL REFERENCES nguoi_dung (ma_nguoi_dung),
+    ma_mo_hinh INTEGER REFERENCES mo_hinh_du_bao (ma_mo_hinh),
+    mo_hinh VARCHAR,
+    thoi_diem_bat_dau TIMESTAMPTZ NOT NULL,
+    buoc_phut INTEGER NOT NULL DEFAULT 60,
+    luu_luong DOUBLE PRECISION[] NOT NULL,
+    do_tin_cay DOUBLE PRECISION[] NOT NULL,
+    thoi_gian_tao TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_du_bao_theo_gio_may_bom_tao
+    ON du_bao_theo_gio (ma_may_bom, thoi_gian_tao DESC);
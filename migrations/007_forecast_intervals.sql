@@ -0,0 +1,10 @@
+-- Prediction intervals (p10/p50/p90) from the per-tree forecast distribution
+ALTER TABLE du_lieu_du_bao
+    ADD COLUMN IF NOT EXISTS luu_luong_p10 DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS luu_luong_p50 DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS luu_luong_p90 DOUBLE PRECISION;
+
+ALTER TABLE du_bao_theo_gio
+    ADD COLUMN IF NOT EXISTS luu_luong_p10 DOUBLE PRECISION[],
+    ADD COLUMN IF NOT EXISTS luu_luong_p50 DOUBLE PRECISION[],
+    ADD COLUMN IF NOT EXISTS luu_luong_p90 DOUBLE PRECISION[];
@@ -0,0 +1,17 @@
+-- Raw model output when a per-pump correction was applied to luu_luong_du_bao
+ALTER TABLE du_lieu_du_bao
+    ADD COLUMN IF NOT EXISTS luu_luong_goc DOUBLE PRECISION;
+
+-- Exponentially weighted sufficient statistics for per-pump linear correction
+CREATE TABLE IF NOT EXISTS hieu_chinh_may_bom (
+    ma_mo_hinh INTEGER NOT NULL REFERENCES mo_hinh_du_bao (ma_mo_hinh),
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom),
+    so_mau INTEGER NOT NULL DEFAULT 0,
+    tong_trong_so DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tong_p DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tong_a DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tong_pp DOUBLE PRECISION NOT NULL DEFAULT 0,
+    tong_pa DOUBLE PRECISION NOT NULL DEFAULT 0,
+    thoi_gian_cap_nhat TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (ma_mo_hinh, ma_may_bom)
+);
@@ -0,0 +1,15 @@
+-- Irrigation plans: one row per pump and planning run, hourly values stored as arrays
+CREATE TABLE IF NOT EXISTS lich_tuoi (
+    ma_lich_tuoi BIGSERIAL PRIMARY KEY,
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom),
+    thoi_diem_bat_dau TIMESTAMP NOT NULL,
+    buoc_phut INTEGER NOT NULL DEFAULT 60,
+    phut_bom DOUBLE PRECISION[] NOT NULL,
+    do_am_du_kien DOUBLE PRECISION[] NOT NULL,
+    luong_nuoc_du_kien DOUBLE PRECISION,
+    dat_nguong BOOLEAN NOT NULL DEFAULT TRUE,
+    thoi_gian_tao TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_lich_tuoi_may_bom_tao
+    ON lich_tuoi (ma_may_bom, thoi_gian_tao DESC);
@@ -0,0 +1,15 @@
+-- Cached daily run-time analytics per pump (only completed days are stored)
+CREATE TABLE IF NOT EXISTS thong_ke_van_hanh_ngay (
+    ma_may_bom INTEGER NOT NULL REFERENCES may_bom (ma_may_bom) ON DELETE CASCADE,
+    ngay DATE NOT NULL,
+    so_lan_bom INTEGER NOT NULL DEFAULT 0,
+    tong_phut_bom DOUBLE PRECISION NOT NULL DEFAULT 0,
+    ty_le_hoat_dong DOUBLE PRECISION NOT NULL DEFAULT 0,
+    lan_bom_dai_nhat_phut DOUBLE PRECISION NOT NULL DEFAULT 0,
+    so_cap_chong_lan INTEGER NOT NULL DEFAULT 0,
+    phut_chong_lan DOUBLE PRECISION NOT NULL DEFAULT 0,
+    thoi_gian_cap_nhat TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (ma_may_bom, ngay)
+);
+
+-- Runs overlapping a time range per pump use ix_nhat_ky_may_bom_may_bom_thoi_gian_bat from 003
@@ -0,0 +1,5 @@
+-- Inputs each forecast was computed from: the reference sensor reading and the model artifact
+-- version. The scheduled forecast job skips pumps whose (reading, version) key is unchanged.
+ALTER TABLE du_lieu_du_bao
+    ADD COLUMN IF NOT EXISTS ma_du_lieu_tham_chieu INTEGER,
+    ADD COLUMN IF NOT EXISTS phien_ban_mo_hinh VARCHAR;
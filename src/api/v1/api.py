@@ -5,6 +5,7 @@ from .endpoints import (
     cau_hinh_thiet_bi,
     du_lieu_cam_bien,
     du_lieu_du_bao,
+    lich_tuoi,
     loai_cam_bien,
     may_bom,
     mo_hinh_du_bao,
@@ -26,6 +27,7 @@ api_v1_router.include_router(loai_cam_bien.router, prefix="/loai-cam-bien", tags
 api_v1_router.include_router(du_lieu_cam_bien.router, prefix="/du-lieu-cam-bien", tags=["du-lieu-cam-bien"])
 api_v1_router.include_router(du_lieu_du_bao.router, prefix="/du-lieu-du-bao", tags=["du-lieu-du-bao"])
 api_v1_router.include_router(mo_hinh_du_bao.router, prefix="/mo-hinh-du-bao", tags=["mo-hinh-du-bao"])
+api_v1_router.include_router(lich_tuoi.router, prefix="/lich-tuoi", tags=["lich-tuoi"])
 api_v1_router.include_router(nhat_ky_may_bom.router, prefix="/nhat-ky-may-bom", tags=["nhat-ky-may-bom"])
 api_v1_router.include_router(thong_bao.router, prefix="/thong-bao", tags=["thong-bao"])
 api_v1_router.include_router(admin_alerts.router, prefix="/admin-alerts", tags=["admin-alerts"])
@@ -11,6 +11,8 @@ from src.api import deps
 from src.crud.thong_bao import create_notification
 from src.crud.nguoi_dung import get_all_admins
 from src.crud.may_bom import get_may_bom_by_id
+from src.crud.thong_ke_sai_so_du_bao import summarize_model_errors
+from src.core.config import settings
 from src.models.du_lieu_cam_bien import DuLieuCamBien
 from datetime import datetime, timedelta
 
@@ -41,27 +43,33 @@ async def _send_alert_to_admins(
 async def check_forecast_model_error_system_wide(db: AsyncSession, ma_may_bom: Optional[int] = None):
     """
     ALERT: Lỗi mô hình dự báo ảnh hưởng toàn hệ thống
-    Kiểm tra nếu model dự báo có lỗi toàn hệ thống
+    Dựa trên thống kê sai số dự báo so với lưu lượng thực tế (thong_ke_sai_so_du_bao): cảnh báo khi
+    sai số gần đây (EWMA) của một mô hình vượt ngưỡng trên đủ tỷ lệ máy bơm
     """
-    # Lấy số lỗi dự báo trong 1 giờ gần đây
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-    
-    q = text("""
-        SELECT COUNT(*) as error_count FROM du_lieu_du_bao
-        WHERE mo_hoa_duy_bao_error = true AND thoi_gian_tao >= :one_hour_ago
-    """)
-    
-    result = await db.execute(q, {"one_hour_ago": one_hour_ago})
-    error_count = result.scalar() or 0
-    
-    # Nếu có nhiều lỗi, gửi alert tới admin
-    if error_count > 5:
+    threshold = settings.FORECAST_ERROR_ALERT_MAPE
+    summaries = await summarize_model_errors(
+        db, settings.FORECAST_ERROR_ALERT_MIN_SAMPLES, threshold, ma_may_bom=ma_may_bom
+    )
+
+    for s in summaries:
+        if not s.so_may_bom or s.so_may_bom_vuot / s.so_may_bom < settings.FORECAST_ERROR_ALERT_PUMP_RATIO:
+            continue
         await _send_alert_to_admins(
             db=db,
             tieu_de="⚠️ Lỗi mô hình dự báo ảnh hưởng hệ thống",
-            noi_dung=f"Mô hình dự báo AI gặp lỗi {error_count} lần trong 1 giờ gần đây. Dự báo có thể không chính xác trên toàn hệ thống. Cần kiểm tra và xử lý ngay lập tức.",
+            noi_dung=(
+                f"Mô hình dự báo #{s.ma_mo_hinh} có sai số gần đây vượt {threshold:.0f}% trên "
+                f"{s.so_may_bom_vuot}/{s.so_may_bom} máy bơm (sai số trung bình gần đây {s.ewma_trung_binh:.1f}%). "
+                "Dự báo có thể không chính xác trên toàn hệ thống. Cần kiểm tra và xử lý ngay lập tức."
+            ),
             muc_do="HIGH",
-            du_lieu_lien_quan={"error_count": error_count}
+            du_lieu_lien_quan={
+                "ma_mo_hinh": s.ma_mo_hinh,
+                "so_may_bom": s.so_may_bom,
+                "so_may_bom_vuot": s.so_may_bom_vuot,
+                "ewma_sai_so_phan_tram": round(float(s.ewma_trung_binh), 2),
+                "mape": round(float(s.mape), 2),
+            }
         )
 
 
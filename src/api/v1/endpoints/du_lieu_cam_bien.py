@@ -1,20 +1,32 @@
 from datetime import date, datetime, timedelta
 import uuid
-from typing import Optional
+from typing import List, Optional
 from fastapi import APIRouter, Depends, Body, Query, HTTPException
+from fastapi.responses import StreamingResponse
+import json
 import math
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from src.api import deps
+from src.core.config import settings
+from src.core.db import AsyncSessionLocal
+from src.core.last_value import last_values
+from src.predict.forecast_cache import forecast_cache
+from src.crud.dac_trung_may_bom import delete_features_from
 from src.schemas.data import DataOut, DataCreate
 from src.crud.du_lieu_cam_bien import (
     list_du_lieu_for_user,
-    list_du_lieu_by_day,
     list_du_lieu_by_day_paginated,
     get_du_lieu_by_id,
     update_du_lieu,
+    stream_du_lieu_for_user,
+    list_du_lieu_columns,
+    EXPORT_COLUMNS,
 )
-from src.crud.may_bom import get_may_bom_by_id
+from src.crud.may_bom import get_may_bom_by_id, list_may_bom_by_ids, list_may_bom_for_user
+from src.core.pagination import encode_cursor, decode_cursor
+from src.core.columnar import columnar_response
+from src.core.export import csv_chunks, gzip_chunks, parquet_available, parquet_chunks
 from src.crud.thong_bao import create_notification
 from src.api.v1.endpoints.admin_alerts import send_alert_to_admins_for_user_device_error
 
@@ -23,18 +35,9 @@ router = APIRouter()
 
 async def _check_sensor_data_timeout(db: AsyncSession, ma_may_bom: int, ma_nguoi_dung: uuid.UUID):
     """Kiểm tra nếu cảm biến không có dữ liệu trong >5 phút"""
-    # Lấy dữ liệu cảm biến gần nhất
-    from sqlalchemy import desc
-    q = (
-        text("""
-            SELECT thoi_gian_tao FROM du_lieu_cam_bien 
-            WHERE ma_may_bom = :ma_may_bom 
-            ORDER BY thoi_gian_tao DESC 
-            LIMIT 1
-        """)
-    )
-    res = await db.execute(q, {"ma_may_bom": ma_may_bom})
-    last_data_time = res.scalar()
+    # Lấy dữ liệu cảm biến gần nhất từ DB (cache có thể cũ tới LAST_VALUE_TTL_SECONDS)
+    latest = await last_values.get(db, ma_may_bom, refresh=True)
+    last_data_time = latest.thoi_gian_tao if latest else None
     
     if last_data_time:
         time_diff = datetime.utcnow() - last_data_time
@@ -157,16 +160,122 @@ async def _check_flow_decrease_trend(db: AsyncSession, ma_may_bom: int, ma_nguoi
         )
 
 
+def _to_data_out(r) -> DataOut:
+    return DataOut(
+        ma_du_lieu=r.ma_du_lieu,
+        ma_may_bom=r.ma_may_bom,
+        ma_nguoi_dung=str(r.ma_nguoi_dung) if r.ma_nguoi_dung is not None else None,
+        ngay=r.ngay,
+        luu_luong_nuoc=r.luu_luong_nuoc,
+        do_am_dat=r.do_am_dat,
+        nhiet_do=r.nhiet_do,
+        do_am=r.do_am,
+        mua=r.mua,
+        so_xung=r.so_xung,
+        tong_the_tich=r.tong_the_tich,
+        thoi_gian_tao=r.thoi_gian_tao,
+    )
+
+
+def _next_cursor(rows, limit: Optional[int]) -> Optional[str]:
+    """Cursor cho trang kế tiếp, None nếu đã hết dữ liệu."""
+    if not limit or len(rows) < limit or rows[-1].thoi_gian_tao is None:
+        return None
+    return encode_cursor(rows[-1].thoi_gian_tao, rows[-1].ma_du_lieu)
+
+
+async def _du_lieu_batches(ma_nd, ma_may_bom: Optional[int], **kwargs):
+    """Các lô dòng từ server-side cursor, dùng session riêng vì session của dependency
+    đã đóng trước khi body của StreamingResponse được gửi."""
+    async with AsyncSessionLocal() as session:
+        async for rows in stream_du_lieu_for_user(session, ma_nd, ma_may_bom, chunk_size=settings.STREAM_CHUNK_SIZE, **kwargs):
+            yield rows
+
+
+def _stream_du_lieu(ma_nd, ma_may_bom: Optional[int], ngay: Optional[date], format: str, extra: Optional[dict] = None) -> StreamingResponse:
+    """Stream toàn bộ dữ liệu cảm biến (JSON hoặc NDJSON) thay vì dựng một body lớn trong bộ nhớ."""
+    if format == "ndjson":
+        async def ndjson_body():
+            async for rows in _du_lieu_batches(ma_nd, ma_may_bom, ngay=ngay):
+                yield "".join(_to_data_out(r).model_dump_json() + "\n" for r in rows)
+
+        return StreamingResponse(ndjson_body(), media_type="application/x-ndjson")
+
+    async def json_body():
+        total = 0
+        yield '{"data":['
+        async for rows in _du_lieu_batches(ma_nd, ma_may_bom, ngay=ngay):
+            yield ("," if total else "") + ",".join(_to_data_out(r).model_dump_json() for r in rows)
+            total += len(rows)
+        # Các khóa còn lại (total, ...) được ghi sau mảng vì chỉ biết tổng khi đã đọc hết
+        yield "]," + json.dumps({"total": total, **(extra or {})})[1:]
+
+    return StreamingResponse(json_body(), media_type="application/json")
+
+
+def _columnar_next_cursor(columns: dict, limit: Optional[int]) -> Optional[str]:
+    times, ids = columns["thoi_gian_tao"], columns["ma_du_lieu"]
+    if not limit or len(ids) < limit or times[-1] is None:
+        return None
+    return encode_cursor(datetime.fromisoformat(times[-1]), ids[-1])
+
+
+async def _columnar_du_lieu(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], ngay: Optional[date], limit: Optional[int], offset: int, page: Optional[int], cursor: Optional[str], exact_total: bool):
+    """Trả dữ liệu dạng cột `{"thoi_gian_tao": [...], "do_am": [...], ...}` cho biểu đồ.
+
+    Mỗi cột chỉ hoàn chỉnh khi đã đọc hết các dòng nên không stream được; bắt buộc có `limit`.
+    """
+    if not limit or limit < 0:
+        raise HTTPException(status_code=400, detail="format=columnar cần limit > 0; dùng format=json hoặc ndjson để lấy toàn bộ dữ liệu")
+    if page is not None:
+        offset = (page - 1) * limit
+    columns, total = await list_du_lieu_columns(db, ma_nd, ma_may_bom, ngay, limit, offset, _parse_cursor(cursor), exact_total)
+    return columnar_response(
+        columns,
+        limit=limit,
+        **_page_meta(offset, limit, cursor),
+        total_pages=math.ceil(total / limit),
+        total=total,
+        total_is_estimate=not exact_total,
+        next_cursor=_columnar_next_cursor(columns, limit),
+    )
+
+
+def _page_meta(offset: int, limit: int, cursor: Optional[str]) -> dict:
+    """offset/page của trang; None khi phân trang keyset (`offset` không được dùng)."""
+    if cursor is not None:
+        return {"offset": None, "page": None}
+    return {"offset": offset, "page": (offset // limit) + 1}
+
+
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    pos = decode_cursor(cursor)
+    if pos is None:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+    return pos
+
+
 @router.get("/", status_code=200)
 async def list_du_lieu(
     ma_may_bom: Optional[int] = Query(None),
-    limit: int = Query(15, ge=1),
+    limit: int = Query(15, ge=-1),
     offset: int = Query(0, ge=0),
     page: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
+    exact_total: bool = Query(False),
+    format: str = Query("json", pattern="^(json|ndjson|columnar)$"),
     db: AsyncSession = Depends(deps.get_db_session),
     current_user=Depends(deps.get_current_user),
 ):
-    """Danh sách dữ liệu cảm biến cho các máy bơm của người dùng đã xác thực. Tùy chọn lọc theo `ma_may_bom`."""
+    """Danh sách dữ liệu cảm biến cho các máy bơm của người dùng đã xác thực. Tùy chọn lọc theo `ma_may_bom`.
+
+    Truyền `cursor` (lấy từ `next_cursor` của trang trước) để phân trang keyset thay cho `offset`;
+    khi đó `offset` và `page` trả về là null. `total` mặc định là ước lượng của planner; đặt `exact_total=true` để đếm chính xác.
+    `limit=-1` stream toàn bộ dữ liệu (`format=json` hoặc `ndjson`).
+    `format=columnar` trả về các mảng song song theo cột thay vì một object cho mỗi dòng (cần `limit` > 0).
+    """
     if ma_may_bom:
         pump = await get_may_bom_by_id(db, ma_may_bom)
         if not pump:
@@ -174,34 +283,115 @@ async def list_du_lieu(
         if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
             raise HTTPException(status_code=403, detail="Không được phép truy cập dữ liệu của máy bơm này")
 
+    if limit != -1 and limit < 1:
+        raise HTTPException(status_code=400, detail="limit phải là -1 (lấy toàn bộ) hoặc lớn hơn 0")
+
+    if format == "columnar":
+        return await _columnar_du_lieu(db, current_user.ma_nguoi_dung, ma_may_bom, None, limit, offset, page, cursor, exact_total)
+
+    #nếu limit=-1 lấy tất cả dữ liệu
+    if limit == -1:
+        return _stream_du_lieu(
+            current_user.ma_nguoi_dung, ma_may_bom, None, format,
+            extra={"limit": None, "offset": 0, "page": 1, "total_pages": 1},
+        )
+
     if page is not None:
         offset = (page - 1) * limit
-        
-    #nếu limit<0 lấy tất cả dữ liệu
-    if limit < 0:
-        limit = None
-
-    rows, total = await list_du_lieu_for_user(db, current_user.ma_nguoi_dung, ma_may_bom, limit, offset)
-    items = [
-        DataOut(
-            ma_du_lieu=r.ma_du_lieu,
-            ma_may_bom=r.ma_may_bom,
-            ma_nguoi_dung=str(r.ma_nguoi_dung) if r.ma_nguoi_dung is not None else None,
-            ngay=r.ngay,
-            luu_luong_nuoc=r.luu_luong_nuoc,
-            do_am_dat=r.do_am_dat,
-            nhiet_do=r.nhiet_do,
-            do_am=r.do_am,
-            mua=r.mua,
-            so_xung=r.so_xung,
-            tong_the_tich=r.tong_the_tich,
-            thoi_gian_tao=r.thoi_gian_tao,
-        )
-        for r in rows
-    ]
-    page = (offset // limit) + 1 if limit > 0 else 1
-    total_pages = math.ceil(total / limit) if limit > 0 else 1
-    return {"data": items, "limit": limit, "offset": offset, "page": page, "total_pages": total_pages, "total": total}
+
+    pos = _parse_cursor(cursor)
+    rows, total = await list_du_lieu_for_user(db, current_user.ma_nguoi_dung, ma_may_bom, limit, offset, cursor=pos, exact_total=exact_total)
+    items = [_to_data_out(r) for r in rows]
+    return {
+        "data": items,
+        "limit": limit,
+        **_page_meta(offset, limit, cursor),
+        "total_pages": math.ceil(total / limit),
+        "total": total,
+        "total_is_estimate": not exact_total,
+        "next_cursor": _next_cursor(rows, limit),
+    }
+
+@router.get("/latest", status_code=200)
+async def get_du_lieu_moi_nhat(
+    ma_may_bom: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Dữ liệu cảm biến mới nhất của nhiều máy bơm trong một lần gọi (`?ma_may_bom=1&ma_may_bom=2`).
+
+    Không truyền `ma_may_bom` thì trả về cho tất cả máy bơm của người dùng.
+    """
+    if ma_may_bom:
+        pumps = await list_may_bom_by_ids(db, ma_may_bom)
+        found = {p.ma_may_bom: p for p in pumps}
+        for ma in ma_may_bom:
+            if ma not in found:
+                raise HTTPException(status_code=404, detail=f"Không tìm thấy máy bơm {ma}")
+            if str(found[ma].ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
+                raise HTTPException(status_code=403, detail="Không được phép truy cập dữ liệu của máy bơm này")
+        ids = list(ma_may_bom)
+    else:
+        pumps, _ = await list_may_bom_for_user(db, current_user.ma_nguoi_dung, limit=None, offset=0)
+        ids = [p.ma_may_bom for p in pumps]
+
+    latest = await last_values.get_many(db, ids)
+    return {
+        "data": [_to_data_out(latest[ma]) for ma in ids if ma in latest],
+        "khong_co_du_lieu": [ma for ma in ids if ma not in latest],
+    }
+
+
+@router.get("/export", status_code=200)
+async def export_du_lieu(
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    tu: Optional[datetime] = Query(None, alias="from"),
+    den: Optional[datetime] = Query(None, alias="to"),
+    ma_may_bom: Optional[int] = Query(None),
+    gzip: bool = Query(False),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Xuất lịch sử dữ liệu cảm biến ra CSV hoặc Parquet, stream theo lô nên bộ nhớ không phụ thuộc số dòng.
+
+    `gzip=true` nén gzip file CSV; với Parquet thì dùng codec gzip bên trong file.
+    """
+    if ma_may_bom:
+        pump = await get_may_bom_by_id(db, ma_may_bom)
+        if not pump:
+            raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+        if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
+            raise HTTPException(status_code=403, detail="Không được phép truy cập dữ liệu của máy bơm này")
+
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Máy chủ chưa cài pyarrow, không thể xuất Parquet")
+
+    # Cột thoi_gian_tao lưu dạng naive
+    if tu is not None and tu.tzinfo is not None:
+        tu = tu.replace(tzinfo=None)
+    if den is not None and den.tzinfo is not None:
+        den = den.replace(tzinfo=None)
+
+    batches = _du_lieu_batches(
+        current_user.ma_nguoi_dung, ma_may_bom,
+        columns=EXPORT_COLUMNS, tu=tu, den=den, ascending=True,
+    )
+    filename = f"du_lieu_cam_bien_{ma_may_bom or 'tat_ca'}"
+    if format == "parquet":
+        body = parquet_chunks(batches, EXPORT_COLUMNS, compression="gzip" if gzip else "snappy")
+        media_type = "application/vnd.apache.parquet"
+        filename += ".parquet"
+    else:
+        body = csv_chunks(batches, EXPORT_COLUMNS)
+        media_type = "text/csv"
+        filename += ".csv"
+        if gzip:
+            body = gzip_chunks(body)
+            media_type = "application/gzip"
+            filename += ".gz"
+
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 
 @router.get("/ngay/{ngay}", status_code=200)
 async def get_du_lieu_theo_ngay(
@@ -210,10 +400,17 @@ async def get_du_lieu_theo_ngay(
     limit: int = Query(None, ge=1),
     offset: int = Query(0, ge=0),
     page: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = Query(None),
+    exact_total: bool = Query(False),
+    format: str = Query("json", pattern="^(json|ndjson|columnar)$"),
     db: AsyncSession = Depends(deps.get_db_session),
     current_user=Depends(deps.get_current_user),
 ):
-    """Lấy dữ liệu cảm biến theo ngày cho tất cả các máy bơm của người dùng đã xác thực."""
+    """Lấy dữ liệu cảm biến theo ngày cho tất cả các máy bơm của người dùng đã xác thực.
+
+    Không truyền `limit` thì toàn bộ dữ liệu trong ngày được stream (`format=json` hoặc `ndjson`).
+    `format=columnar` trả về các mảng song song theo cột (cần `limit`).
+    """
     if ma_may_bom:
         pump = await get_may_bom_by_id(db, ma_may_bom)
         if not pump:
@@ -221,50 +418,26 @@ async def get_du_lieu_theo_ngay(
         if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
             raise HTTPException(status_code=403, detail="Không được phép truy cập dữ liệu của máy bơm này")
 
+    if format == "columnar":
+        return await _columnar_du_lieu(db, current_user.ma_nguoi_dung, ma_may_bom, ngay, limit, offset, page, cursor, exact_total)
+
     if limit is None:
-        rows = await list_du_lieu_by_day(db, current_user.ma_nguoi_dung, ngay, ma_may_bom)
-        items = [
-            DataOut(
-                ma_du_lieu=r.ma_du_lieu,
-                ma_may_bom=r.ma_may_bom,
-                ma_nguoi_dung=str(r.ma_nguoi_dung) if r.ma_nguoi_dung is not None else None,
-                ngay=r.ngay,
-                luu_luong_nuoc=r.luu_luong_nuoc,
-                do_am_dat=r.do_am_dat,
-                nhiet_do=r.nhiet_do,
-                do_am=r.do_am,
-                mua=r.mua,
-                so_xung=r.so_xung,
-                tong_the_tich=r.tong_the_tich,
-                thoi_gian_tao=r.thoi_gian_tao,
-            )
-            for r in rows
-        ]
-        return {"data": items, "total": len(items)}
+        return _stream_du_lieu(current_user.ma_nguoi_dung, ma_may_bom, ngay, format)
     else:
         if page is not None:
             offset = (page - 1) * limit
-        rows, total = await list_du_lieu_by_day_paginated(db, current_user.ma_nguoi_dung, ngay, ma_may_bom, limit, offset)
-        items = [
-            DataOut(
-                ma_du_lieu=r.ma_du_lieu,
-                ma_may_bom=r.ma_may_bom,
-                ma_nguoi_dung=str(r.ma_nguoi_dung) if r.ma_nguoi_dung is not None else None,
-                ngay=r.ngay,
-                luu_luong_nuoc=r.luu_luong_nuoc,
-                do_am_dat=r.do_am_dat,
-                nhiet_do=r.nhiet_do,
-                do_am=r.do_am,
-                mua=r.mua,
-                so_xung=r.so_xung,
-                tong_the_tich=r.tong_the_tich,
-                thoi_gian_tao=r.thoi_gian_tao,
-            )
-            for r in rows
-        ]
-        page = (offset // limit) + 1 if limit > 0 else 1
-        total_pages = math.ceil(total / limit) if limit > 0 else 1
-        return {"data": items, "limit": limit, "offset": offset, "page": page, "total_pages": total_pages, "total": total}
+        pos = _parse_cursor(cursor)
+        rows, total = await list_du_lieu_by_day_paginated(db, current_user.ma_nguoi_dung, ngay, ma_may_bom, limit, offset, cursor=pos, exact_total=exact_total)
+        items = [_to_data_out(r) for r in rows]
+        return {
+            "data": items,
+            "limit": limit,
+            **_page_meta(offset, limit, cursor),
+            "total_pages": math.ceil(total / limit),
+            "total": total,
+            "total_is_estimate": not exact_total,
+            "next_cursor": _next_cursor(rows, limit),
+        }
 
 
 @router.put("/{ma_du_lieu}", status_code=200)
@@ -309,6 +482,12 @@ async def update_du_lieu(
     # Kiểm tra cảnh báo
     r = await get_du_lieu_by_id(db, ma_du_lieu)
     if r:
+        last_values.record(r)
+        # Bản ghi có thể là đầu vào của dự báo đã cache: bỏ các dự báo của máy bơm này
+        forecast_cache.invalidate_pump(r.ma_may_bom)
+        # Đặc trưng trượt từ thời điểm bản ghi trở đi sẽ được tính lại ở lần cập nhật feature store sau
+        if r.ma_may_bom is not None and r.thoi_gian_tao is not None:
+            await delete_features_from(db, r.ma_may_bom, r.thoi_gian_tao)
         # Kiểm tra timeout cảm biến
         await _check_sensor_data_timeout(db, r.ma_may_bom, r.ma_nguoi_dung)
         # Kiểm tra lưu lượng bất thường
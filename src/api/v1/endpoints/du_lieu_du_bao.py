@@ -1,20 +1,34 @@
 from typing import Optional
 import math
-import os
-import joblib
-import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlalchemy import select
 from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.api import deps
-from src.schemas.du_lieu_du_bao import ForecastOut
-from src.crud.may_bom import get_may_bom_by_id
-from src.crud.du_lieu_du_bao import list_du_lieu_du_bao_for_user, create_du_lieu_du_bao
+from src.schemas.du_lieu_du_bao import ForecastBatchRequest, ForecastOut, HorizonForecastOut, ScenarioRequest
+from src.crud.may_bom import get_may_bom_by_id, list_may_bom_by_ids
+from src.crud.du_lieu_du_bao import list_du_lieu_du_bao_for_user, list_du_lieu_du_bao_columns, create_du_lieu_du_bao
+from src.core.columnar import columnar_response
+from src.core.last_value import last_values
+from src.core.config import settings
+from src.crud.mo_hinh_du_bao import get_mo_hinh_du_bao_by_id
+from src.crud.thong_ke_sai_so_du_bao import list_error_stats
+from src.crud.du_bao_theo_gio import create_du_bao_theo_gio, get_latest_du_bao_theo_gio
+from src.predict.registry import registry
+from src.predict.ensemble import FEATURES, feature_matrix
+from src.predict.baseline import baseline_forecast
+from src.predict.batcher import batcher
+from src.predict.correction import pump_corrections
+from src.predict.forecast_cache import forecast_cache
+from src.predict.forecast import MO_HINH_RF, forecast_pumps
+from src.predict.horizon import forecast_horizon
+from src.predict.scenarios import evaluate_scenarios, scenario_cache
 from src.crud.thong_bao import create_notification
 from src.api.v1.endpoints.admin_alerts import send_alert_to_admins_for_user_device_error
 from src.models.du_lieu_du_bao import DuLieuDuBao
+from src.models.du_bao_theo_gio import DuBaoTheoGio
 from src.models.nhat_ky_may_bom import NhatKyMayBom
 from src.models.du_lieu_cam_bien import DuLieuCamBien
 
@@ -45,15 +59,37 @@ async def _check_forecast_model_error(db: AsyncSession, ma_may_bom: int, ma_nguo
         )
 
 
+async def _resolve_model(db: AsyncSession, ma_mo_hinh: Optional[int]):
+    """Chọn mô hình (mặc định `DEFAULT_MA_MO_HINH`) và trả về bản đã nạp (`LoadedModel`) từ registry."""
+    if ma_mo_hinh is None:
+        ma_mo_hinh = settings.DEFAULT_MA_MO_HINH
+    else:
+        mo_hinh = await get_mo_hinh_du_bao_by_id(db, ma_mo_hinh)
+        if not mo_hinh:
+            raise HTTPException(status_code=404, detail="Không tìm thấy mô hình dự báo")
+        if mo_hinh.trang_thai is False:
+            raise HTTPException(status_code=400, detail="Mô hình dự báo đang không hoạt động")
+
+    # Load Model (đã nạp sẵn trong registry, chỉ đọc lại khi artifact thay đổi)
+    try:
+        return await registry.aget(ma_mo_hinh)
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Model file not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading model: {str(e)}")
+
+
 @router.get("/", status_code=200)
 async def list_du_bao(
     ma_may_bom: Optional[int] = Query(None),
     limit: int = Query(15, ge=-1),
     offset: int = Query(0, ge=0),
     page: Optional[int] = Query(None, ge=1),
+    format: str = Query("json", pattern="^(json|columnar)$"),
     db: AsyncSession = Depends(deps.get_db_session),
     current_user=Depends(deps.get_current_user),
 ):
+    """Danh sách dự báo. `format=columnar` trả về các mảng song song theo cột cho biểu đồ."""
 
     if ma_may_bom:
         pump = await get_may_bom_by_id(db, ma_may_bom)
@@ -70,12 +106,18 @@ async def list_du_bao(
     else:
         limit_arg = limit
 
+    resp_limit = limit if (limit is None or limit >= 0) else None
+    page_num = (offset // limit) + 1 if (limit and limit > 0) else 1
+
+    if format == "columnar":
+        columns, total = await list_du_lieu_du_bao_columns(db, current_user.ma_nguoi_dung, ma_may_bom, limit_arg, offset)
+        total_pages = math.ceil(total / limit) if (limit and limit > 0) else 1
+        return columnar_response(columns, limit=resp_limit, offset=offset, page=page_num, total_pages=total_pages, total=total)
+
     rows, total = await list_du_lieu_du_bao_for_user(db, current_user.ma_nguoi_dung, ma_may_bom, limit_arg, offset)
 
     items = [ForecastOut.from_orm(r) for r in rows]
 
-    resp_limit = limit if (limit is None or limit >= 0) else None
-    page_num = (offset // limit) + 1 if (limit and limit > 0) else 1
     total_pages = math.ceil(total / limit) if (limit and limit > 0) else 1
 
     return {"data": items, "limit": resp_limit, "offset": offset, "page": page_num, "total_pages": total_pages, "total": total}
@@ -102,14 +144,27 @@ async def report_forecast_error(
     return {"message": "Báo cáo lỗi mô hình dự báo thành công. Hệ thống sẽ xử lý lại."}
 
 
+async def _baseline_forecast(db: AsyncSession, ma_may_bom: int, ma_nguoi_dung, now: datetime) -> Optional[ForecastOut]:
+    """Dự báo Holt-Winters cho giờ hiện tại (xem `baseline_forecast`); None nếu chưa có."""
+    try:
+        forecast = await baseline_forecast(db, ma_may_bom, ma_nguoi_dung, now)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lưu kết quả dự báo: {str(e)}")
+    return ForecastOut.from_orm(forecast) if forecast is not None else None
+
+
 @router.post("/predict", status_code=200, response_model=ForecastOut)
 async def predict_flow(
     ma_may_bom: int = Query(...),
+    ma_mo_hinh: Optional[int] = Query(None),
     db: AsyncSession = Depends(deps.get_db_session),
     current_user=Depends(deps.get_current_user),
 ):
     """
     Chạy mô hình dự báo dòng chảy cho máy bơm dựa trên dữ liệu cảm biến tại thời điểm bật máy gần nhất.
+    Không truyền `ma_mo_hinh` thì dùng mô hình mặc định (`DEFAULT_MA_MO_HINH`); khi đó nếu bản ghi
+    cảm biến mới nhất cũ hơn `BASELINE_STALE_MINUTES` thì trả về dự báo Holt-Winters (`mo_hinh` = "HoltWinters").
+    Truyền `ma_mo_hinh` thì luôn dùng đúng mô hình đó.
     """
     # Check pump
     pump = await get_may_bom_by_id(db, ma_may_bom)
@@ -118,21 +173,16 @@ async def predict_flow(
     if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
         raise HTTPException(status_code=403, detail="Không được phép truy cập máy bơm này")
 
-    # Load Model
-    try:
-        model_path = os.path.join(os.path.dirname(__file__), "../../../predict/mo_hinh_random_forest.joblib")
-        model = joblib.load(model_path)
-    except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Model file not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error loading model: {str(e)}")
+    explicit_model = ma_mo_hinh is not None
+    loaded = await _resolve_model(db, ma_mo_hinh)
+    ma_mo_hinh = loaded.ma_mo_hinh
 
-    # Get latest pump start time
-    stmt = select(NhatKyMayBom).where(NhatKyMayBom.ma_may_bom == ma_may_bom).order_by(NhatKyMayBom.thoi_gian_bat.desc()).limit(1)
+    # Get latest pump start time (cùng thứ tự với get_forecast_inputs_for_pumps của dự báo hàng loạt)
+    stmt = select(NhatKyMayBom).where(NhatKyMayBom.ma_may_bom == ma_may_bom).order_by(NhatKyMayBom.thoi_gian_bat.desc().nulls_last()).limit(1)
     log_res = await db.execute(stmt)
     latest_log = log_res.scalars().first()
 
-    if not latest_log:
+    if not latest_log or latest_log.thoi_gian_bat is None:
         reference_time = datetime.now()
     else:
         reference_time = latest_log.thoi_gian_bat
@@ -145,63 +195,61 @@ async def predict_flow(
     sensor_stmt = select(DuLieuCamBien).where(
         DuLieuCamBien.ma_may_bom == ma_may_bom,
         DuLieuCamBien.thoi_gian_tao <= reference_time
-    ).order_by(DuLieuCamBien.thoi_gian_tao.desc()).limit(1)
-    
+    ).order_by(DuLieuCamBien.thoi_gian_tao.desc(), DuLieuCamBien.ma_du_lieu.desc()).limit(1)
+
     sensor_res = await db.execute(sensor_stmt)
     sensor_data = sensor_res.scalars().first()
 
+    newest = await last_values.get(db, ma_may_bom)
     if not sensor_data:
-        sensor_stmt = select(DuLieuCamBien).where(
-            DuLieuCamBien.ma_may_bom == ma_may_bom
-        ).order_by(DuLieuCamBien.thoi_gian_tao.desc()).limit(1)
-        sensor_res = await db.execute(sensor_stmt)
-        sensor_data = sensor_res.scalars().first()
+        sensor_data = newest
+
+    # Cảm biến không gửi dữ liệu mới (bản ghi mới nhất quá cũ hoặc không có): dùng mô hình cơ sở
+    # Holt-Winters theo giờ hiện tại. Đo trên bản ghi mới nhất, không phải bản ghi trước lần bật máy.
+    now = datetime.now()
+    if not explicit_model and (newest is None or newest.thoi_gian_tao is None or newest.thoi_gian_tao < now - timedelta(minutes=settings.BASELINE_STALE_MINUTES)):
+        fallback = await _baseline_forecast(db, ma_may_bom, current_user.ma_nguoi_dung, now)
+        if fallback is not None:
+            return fallback
 
     if not sensor_data:
         raise HTTPException(status_code=400, detail="Không tìm thấy dữ liệu cảm biến cho máy bơm này để dự báo")
 
-    # Prepare Data
-    input_data = pd.DataFrame({
-        'mua': [sensor_data.mua if sensor_data.mua is not None else 0],
-        'do_am_dat': [sensor_data.do_am_dat if sensor_data.do_am_dat is not None else 0],
-        'nhiet_do': [sensor_data.nhiet_do if sensor_data.nhiet_do is not None else 0],
-        'do_am': [sensor_data.do_am if sensor_data.do_am is not None else 0]
-    })
+    # Cùng bản ghi tham chiếu và cùng phiên bản mô hình: trả lại dự báo đã lưu
+    cache_key = (ma_may_bom, sensor_data.ma_du_lieu, loaded.version)
+    cached = forecast_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # Predict
+    # Predict: gộp với các request đồng thời thành một lần gọi mô hình (dự báo = trung bình các cây, độ tin cậy = 1 - CV)
     try:
-        prediction = model.predict(input_data)
-        predicted_flow = float(prediction[0])
-        
-        # Calculate confidence
-        if hasattr(model, "estimators_"):
-            # RandomForestRegressor
-            preds = [tree.predict(input_data)[0] for tree in model.estimators_]
-            std_dev = np.std(preds)
-            mean_val = np.mean(preds)
-            
-            if mean_val == 0:
-                confidence = 1.0 if std_dev == 0 else 0.0
-            else:
-                # Coefficient of variation
-                cv = std_dev / abs(mean_val)
-                confidence = max(0.0, 1.0 - cv)
-        else:
-            # Fallback if not RF or no estimators
-            confidence = 0.9
-            
+        predicted_flow, confidence, (p10, p50, p90) = await batcher.predict(ma_mo_hinh, loaded.model, feature_matrix([sensor_data]))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi chạy mô hình dự báo: {str(e)}")
 
+    # Hiệu chỉnh theo máy bơm (nếu bật): giữ dự báo gốc để job đối chiếu học tiếp trên đầu ra của mô hình
+    luu_luong_goc = None
+    if settings.PUMP_CORRECTION_ENABLED:
+        correction = await pump_corrections.get(db, ma_mo_hinh, ma_may_bom)
+        if correction is not None:
+            luu_luong_goc = predicted_flow
+            predicted_flow, p10, p50, p90 = (float(v) for v in correction.apply([predicted_flow, p10, p50, p90]))
+
     # Save to DB
     new_forecast = DuLieuDuBao(
-        mo_hinh="RandomForest",
+        mo_hinh=MO_HINH_RF,
         thoi_diem_du_bao=datetime.now(),
         luu_luong_du_bao=predicted_flow,
         do_tin_cay=confidence,
+        luu_luong_p10=p10,
+        luu_luong_p50=p50,
+        luu_luong_p90=p90,
+        luu_luong_goc=luu_luong_goc,
         ma_nguoi_dung=current_user.ma_nguoi_dung,
         ma_may_bom=ma_may_bom,
-        ma_mo_hinh=11
+        ma_mo_hinh=ma_mo_hinh,
+        ma_du_lieu_tham_chieu=sensor_data.ma_du_lieu,
+        phien_ban_mo_hinh=loaded.version,
     )
 
     try:
@@ -209,4 +257,198 @@ async def predict_flow(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi khi lưu kết quả dự báo: {str(e)}")
 
-    return ForecastOut.from_orm(created_forecast)
+    result = ForecastOut.from_orm(created_forecast)
+    forecast_cache.put(cache_key, result)
+    return result
+
+
+@router.post("/predict/horizon", status_code=200, response_model=HorizonForecastOut)
+async def predict_flow_horizon(
+    ma_may_bom: int = Query(...),
+    ma_mo_hinh: Optional[int] = Query(None),
+    so_gio: int = Query(settings.FORECAST_HORIZON_HOURS, ge=1, le=settings.FORECAST_HORIZON_MAX_HOURS),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """
+    Dự báo lưu lượng theo từng giờ cho `so_gio` giờ tới (mặc định 24), bắt đầu từ đầu giờ kế tiếp.
+    Đặc trưng của mọi giờ được dựng cùng lúc và chạy mô hình một lần; kết quả lưu thành một dòng.
+    """
+    pump = await get_may_bom_by_id(db, ma_may_bom)
+    if not pump:
+        raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+    if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
+        raise HTTPException(status_code=403, detail="Không được phép truy cập máy bơm này")
+
+    loaded = await _resolve_model(db, ma_mo_hinh)
+
+    try:
+        result = await forecast_horizon(db, ma_may_bom, loaded.ma_mo_hinh, loaded.model, so_gio)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi chạy mô hình dự báo: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=400, detail="Không tìm thấy dữ liệu cảm biến cho máy bơm này để dự báo")
+    start, flows, confidences, (p10, p50, p90) = result
+
+    row = DuBaoTheoGio(
+        ma_may_bom=ma_may_bom,
+        ma_nguoi_dung=current_user.ma_nguoi_dung,
+        ma_mo_hinh=loaded.ma_mo_hinh,
+        mo_hinh=MO_HINH_RF,
+        thoi_diem_bat_dau=start,
+        buoc_phut=60,
+        luu_luong=[float(v) for v in flows],
+        do_tin_cay=[float(v) for v in confidences],
+        luu_luong_p10=[float(v) for v in p10],
+        luu_luong_p50=[float(v) for v in p50],
+        luu_luong_p90=[float(v) for v in p90],
+    )
+    try:
+        row = await create_du_bao_theo_gio(db, row)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lưu kết quả dự báo: {str(e)}")
+    return HorizonForecastOut.from_row(row)
+
+
+@router.get("/horizon", status_code=200, response_model=HorizonForecastOut)
+async def get_latest_horizon(
+    ma_may_bom: int = Query(...),
+    ma_mo_hinh: Optional[int] = Query(None),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Dự báo theo giờ mới nhất đã lưu của máy bơm."""
+    pump = await get_may_bom_by_id(db, ma_may_bom)
+    if not pump:
+        raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+    if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
+        raise HTTPException(status_code=403, detail="Không được phép truy cập dữ liệu của máy bơm này")
+
+    row = await get_latest_du_bao_theo_gio(db, ma_may_bom, ma_mo_hinh)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Chưa có dự báo theo giờ cho máy bơm này")
+    return HorizonForecastOut.from_row(row)
+
+
+@router.get("/inference-metrics", status_code=200)
+async def get_inference_metrics(current_user=Depends(deps.get_current_user)):
+    """Thông số của hàng đợi gộp request dự báo (kích thước lô, thời gian chờ, thời gian chạy mô hình). Chỉ quản trị viên."""
+    if not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới có quyền xem thông số dự báo")
+    return {**batcher.metrics(), "forecast_cache": forecast_cache.stats(), "scenario_cache": scenario_cache.stats()}
+
+
+@router.post("/scenarios", status_code=200)
+async def simulate_scenarios(
+    payload: ScenarioRequest,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """
+    Mô phỏng "nếu ... thì": mỗi đặc trưng là một khoảng giá trị, lưới tích Descartes của các khoảng được
+    chạy mô hình một lần. Trả về ma trận lưu lượng/độ tin cậy theo các trục (thứ tự `truc`).
+    Kết quả được cache theo phiên bản mô hình.
+    """
+    ranges = {f: getattr(payload, f) for f in FEATURES}
+    missing = [f for f, r in ranges.items() if r is None]
+    latest = None
+    if missing:
+        if payload.ma_may_bom is None:
+            raise HTTPException(status_code=400, detail=f"Thiếu khoảng giá trị cho {', '.join(missing)} (hoặc truyền ma_may_bom để lấy giá trị hiện tại)")
+        pump = await get_may_bom_by_id(db, payload.ma_may_bom)
+        if not pump:
+            raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+        if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
+            raise HTTPException(status_code=403, detail="Không được phép truy cập máy bơm này")
+        latest = await last_values.get(db, payload.ma_may_bom)
+        if not latest:
+            raise HTTPException(status_code=400, detail="Không tìm thấy dữ liệu cảm biến cho máy bơm này")
+
+    axes = []
+    for f, r in ranges.items():
+        if r is None:
+            axes.append(np.array([getattr(latest, f, None) or 0], dtype=np.float32))
+        elif r.den is None or r.so_diem == 1:
+            axes.append(np.array([r.tu], dtype=np.float32))
+        else:
+            axes.append(np.linspace(r.tu, r.den, r.so_diem, dtype=np.float32))
+    so_dong = math.prod(len(a) for a in axes)
+    if so_dong > settings.SCENARIO_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Lưới kịch bản quá lớn ({so_dong} dòng, tối đa {settings.SCENARIO_MAX_ROWS})")
+
+    loaded = await _resolve_model(db, payload.ma_mo_hinh)
+    try:
+        flows, confidences, cached = await evaluate_scenarios(loaded, axes)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi chạy mô hình dự báo: {str(e)}")
+
+    # Ma trận lớn: trả thẳng kiểu JSON gốc (làm tròn 4 chữ số), bỏ qua bộ mã hoá từng phần tử của FastAPI
+    return JSONResponse(content={
+        "ma_mo_hinh": loaded.ma_mo_hinh,
+        "phien_ban": loaded.version,
+        "truc": {f: np.round(a.astype(np.float64), 4).tolist() for f, a in zip(FEATURES, axes)},
+        "kich_thuoc": list(flows.shape),
+        "luu_luong": np.round(flows.astype(np.float64), 4).tolist(),
+        "do_tin_cay": np.round(confidences.astype(np.float64), 4).tolist(),
+        "cached": cached,
+    })
+
+
+@router.get("/accuracy", status_code=200)
+async def get_forecast_accuracy(
+    ma_mo_hinh: Optional[int] = Query(None),
+    ma_may_bom: Optional[int] = Query(None),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Sai số dự báo so với lưu lượng thực tế theo mô hình và máy bơm (MAE, RMSE, MAPE, EWMA APE). Chỉ quản trị viên."""
+    if not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới có quyền xem sai số dự báo")
+    stats = await list_error_stats(db, ma_mo_hinh=ma_mo_hinh, ma_may_bom=ma_may_bom)
+    return [
+        {
+            "ma_mo_hinh": s.ma_mo_hinh,
+            "ma_may_bom": s.ma_may_bom,
+            "so_mau": s.so_mau,
+            "mae": s.tong_sai_so_tuyet_doi / s.so_mau if s.so_mau else None,
+            "rmse": math.sqrt(s.tong_binh_phuong_sai_so / s.so_mau) if s.so_mau else None,
+            "mape": s.tong_sai_so_phan_tram / s.so_mau_phan_tram if s.so_mau_phan_tram else None,
+            "ewma_sai_so_phan_tram": s.ewma_sai_so_phan_tram,
+            "thoi_gian_cap_nhat": s.thoi_gian_cap_nhat,
+        }
+        for s in stats
+    ]
+
+
+@router.post("/predict/batch", status_code=200)
+async def predict_flow_batch(
+    payload: ForecastBatchRequest,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """
+    Dự báo cho nhiều máy bơm trong một lần: một truy vấn lấy dữ liệu tham chiếu cho tất cả máy bơm,
+    một lần gọi mô hình trên cả ma trận đặc trưng và một câu INSERT cho toàn bộ kết quả.
+    Máy bơm có bản ghi tham chiếu và phiên bản mô hình không đổi dùng lại dự báo đã lưu (như /predict).
+    Quản trị viên được dự báo cho máy bơm của mọi người dùng.
+    """
+    ids = list(dict.fromkeys(payload.ma_may_bom))
+    pumps = await list_may_bom_by_ids(db, ids)
+    found = {p.ma_may_bom: p for p in pumps}
+    for ma in ids:
+        if ma not in found:
+            raise HTTPException(status_code=404, detail=f"Không tìm thấy máy bơm {ma}")
+        if str(found[ma].ma_nguoi_dung) != str(current_user.ma_nguoi_dung) and not current_user.quan_tri_vien:
+            raise HTTPException(status_code=403, detail="Không được phép truy cập máy bơm này")
+
+    loaded = await _resolve_model(db, payload.ma_mo_hinh)
+
+    try:
+        forecasts, missing = await forecast_pumps(db, [found[ma] for ma in ids], loaded.ma_mo_hinh, loaded.model, loaded.version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi chạy mô hình dự báo: {str(e)}")
+
+    return {
+        "data": forecasts,
+        "khong_co_du_lieu": missing,
+    }
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api import deps
+from src.crud.lich_tuoi import get_latest_lich_tuoi
+from src.crud.may_bom import get_may_bom_by_id
+from src.predict.irrigation import plan_fleet
+from src.schemas.lich_tuoi import LichTuoiOut
+
+router = APIRouter()
+
+
+@router.post("/lap-lich", status_code=200)
+async def plan_irrigation_now(
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Lập lại lịch tưới cho cả đội máy bơm ngay (job định kỳ chạy mỗi giờ). Chỉ quản trị viên."""
+    if not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới có quyền lập lịch tưới")
+    try:
+        so_lich = await plan_fleet(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi khi lập lịch tưới: {str(e)}")
+    return {"message": "Lập lịch tưới thành công", "so_lich": so_lich}
+
+
+@router.get("/{ma_may_bom}", status_code=200, response_model=LichTuoiOut)
+async def get_lich_tuoi(
+    ma_may_bom: int,
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Lịch tưới mới nhất của máy bơm: số phút bơm đầu mỗi giờ và các khoảng bật/tắt cho thiết bị."""
+    pump = await get_may_bom_by_id(db, ma_may_bom)
+    if not pump:
+        raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+    if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung) and not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Không được phép truy cập máy bơm này")
+
+    row = await get_latest_lich_tuoi(db, ma_may_bom)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Máy bơm chưa có lịch tưới")
+    return LichTuoiOut.from_row(row)
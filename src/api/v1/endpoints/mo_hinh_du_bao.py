@@ -1,9 +1,10 @@
 import math
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.api import deps
 from src.schemas.mo_hinh_du_bao import (
+    HuanLuyenMoHinhRequest,
     MoHinhDuBaoCreate,
     MoHinhDuBaoOut,
     MoHinhDuBaoUpdate,
@@ -17,6 +18,8 @@ from src.crud.mo_hinh_du_bao import (
 )
 from src.crud.nguoi_dung import get_all_admins
 from src.crud.thong_bao import create_notification
+from src.core.config import settings
+from src.predict.training import TrainingParams, create_job, run_training_job, running_job, training_jobs
 
 router = APIRouter()
 
@@ -59,6 +62,52 @@ async def list_mo_hinh_du_bao_endpoint(
     }
 
 
+@router.post("/train", status_code=202)
+async def train_mo_hinh_du_bao_endpoint(
+    payload: HuanLuyenMoHinhRequest,
+    background_tasks: BackgroundTasks,
+    current_user=Depends(deps.get_current_user),
+):
+    """Huấn luyện mô hình mới từ dữ liệu cảm biến (chạy nền). Trả về mã công việc để theo dõi."""
+
+    if not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới được phép huấn luyện mô hình dự báo")
+    if running_job() is not None:
+        raise HTTPException(status_code=409, detail="Đang có một công việc huấn luyện mô hình chạy")
+
+    params = TrainingParams(
+        tu=payload.tu,
+        den=payload.den,
+        max_rows=payload.max_rows or settings.TRAINING_MAX_ROWS,
+        n_estimators=payload.n_estimators,
+        max_depth=payload.max_depth,
+        max_leaf_nodes=payload.max_leaf_nodes,
+        max_samples=payload.max_samples,
+        min_samples_leaf=payload.min_samples_leaf,
+        validation_fraction=payload.validation_fraction,
+        n_jobs=settings.TRAINING_N_JOBS,
+        ten_mo_hinh=payload.ten_mo_hinh,
+    )
+    job = create_job(params)
+    background_tasks.add_task(run_training_job, job, params)
+    return {"ma_cong_viec": job.ma_cong_viec, "trang_thai": job.trang_thai}
+
+
+@router.get("/train/{ma_cong_viec}", status_code=200)
+async def get_training_job_endpoint(
+    ma_cong_viec: str,
+    current_user=Depends(deps.get_current_user),
+):
+    """Trạng thái công việc huấn luyện mô hình (lưu trong bộ nhớ của process, chỉ giữ các công việc gần nhất)."""
+
+    if not getattr(current_user, "quan_tri_vien", False):
+        raise HTTPException(status_code=403, detail="Chỉ quản trị viên mới được phép xem công việc huấn luyện")
+    job = training_jobs.get(ma_cong_viec)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy công việc huấn luyện")
+    return job
+
+
 @router.get("/{ma_mo_hinh}", status_code=200, response_model=MoHinhDuBaoOut)
 async def get_mo_hinh_du_bao_endpoint(
     ma_mo_hinh: int,
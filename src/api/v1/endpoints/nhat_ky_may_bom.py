@@ -5,8 +5,10 @@ import math
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, select, func
 from src.api import deps
-from src.schemas.nhat_ky import NhatKyCreate, NhatKyOut
+from src.core.config import settings
+from src.schemas.nhat_ky import NhatKyCreate, NhatKyOut, ThongKeVanHanhNgayOut, ThongKeVanHanhOut
 from src.crud.nhat_ky_may_bom import create_nhat_ky, list_nhat_ky_for_pump, get_nhat_ky_by_id, update_nhat_ky, delete_nhat_ky
+from src.crud.thong_ke_van_hanh_ngay import get_daily_run_stats, invalidate_daily_run_stats
 from src.crud.may_bom import get_may_bom_by_id
 from src.crud.thong_bao import create_notification
 from src.models.nhat_ky_may_bom import NhatKyMayBom
@@ -126,6 +128,14 @@ async def _send_daily_watering_report(db: AsyncSession, ma_may_bom: int, ma_nguo
     )
 
 
+async def _invalidate_run_stats(db: AsyncSession, ma_may_bom: int, thoi_gian_bat, thoi_gian_tat):
+    """Xoá thống kê vận hành đã cache của các ngày mà lần bơm đi qua (lần đang bơm: đến hôm nay)."""
+    if thoi_gian_bat is None:
+        return
+    tat = thoi_gian_tat or datetime.now()
+    await invalidate_daily_run_stats(db, ma_may_bom, thoi_gian_bat.date(), max(thoi_gian_bat, tat).date())
+
+
 @router.post("/", status_code=201, response_model=NhatKyOut)
 async def create_nhat_ky_endpoint(
     payload: NhatKyCreate,
@@ -141,6 +151,7 @@ async def create_nhat_ky_endpoint(
         raise HTTPException(status_code=403, detail="Không được phép tạo nhật ký cho máy bơm này")
 
     obj = await create_nhat_ky(db, payload)
+    await _invalidate_run_stats(db, payload.ma_may_bom, obj.thoi_gian_bat, obj.thoi_gian_tat)
     await db.commit()
     
     # Kiểm tra cảnh báo tưới bất thường
@@ -228,6 +239,49 @@ async def list_nhat_ky_endpoint(
     return {"data": items, "limit": limit, "offset": offset, "page": page, "total_pages": total_pages, "total": total}
 
 
+@router.get("/thong-ke", status_code=200, response_model=ThongKeVanHanhOut)
+async def run_time_stats_endpoint(
+    ma_may_bom: int = Query(...),
+    tu: Optional[date] = Query(None),
+    den: Optional[date] = Query(None),
+    db: AsyncSession = Depends(deps.get_db_session),
+    current_user=Depends(deps.get_current_user),
+):
+    """Thống kê vận hành theo ngày (mặc định 7 ngày gần nhất): số lần bơm, tổng phút bơm (hợp các lần
+    bơm), tỉ lệ hoạt động, lần bơm dài nhất và các lần bơm chồng lấn (chủ sở hữu hoặc admin).
+    """
+    pump = await get_may_bom_by_id(db, ma_may_bom)
+    if not pump:
+        raise HTTPException(status_code=404, detail="Không tìm thấy máy bơm")
+    if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung) and not current_user.quan_tri_vien:
+        raise HTTPException(status_code=403, detail="Không được phép truy cập nhật ký của máy bơm này")
+
+    # Giờ địa phương không tz, cùng quy ước với thoi_gian_bat/thoi_gian_tat của nhật ký
+    now = datetime.now()
+    den = den or now.date()
+    tu = tu or den - timedelta(days=6)
+    if tu > den:
+        raise HTTPException(status_code=400, detail="Ngày bắt đầu phải trước hoặc bằng ngày kết thúc")
+    if (den - tu).days + 1 > settings.RUN_STATS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Khoảng thời gian tối đa {settings.RUN_STATS_MAX_DAYS} ngày")
+
+    daily = await get_daily_run_stats(db, ma_may_bom, tu, den, now)
+    n_days = (den - tu).days + 1
+    tong_phut = float(daily["tong_phut_bom"].sum())
+    return ThongKeVanHanhOut(
+        ma_may_bom=ma_may_bom,
+        tu=tu,
+        den=den,
+        so_lan_bom=int(daily["so_lan_bom"].sum()),
+        tong_phut_bom=tong_phut,
+        ty_le_hoat_dong=tong_phut / (n_days * 1440),
+        lan_bom_dai_nhat_phut=float(daily["lan_bom_dai_nhat_phut"].max()) if len(daily) else 0.0,
+        so_cap_chong_lan=int(daily["so_cap_chong_lan"].sum()),
+        phut_chong_lan=float(daily["phut_chong_lan"].sum()),
+        theo_ngay=[ThongKeVanHanhNgayOut(**r) for r in daily.drop(columns="ma_may_bom").to_dict("records")],
+    )
+
+
 @router.get("/{ma_nhat_ky}", status_code=200)
 async def get_nhat_ky_endpoint(
     ma_nhat_ky: int,
@@ -265,7 +319,10 @@ async def update_nhat_ky_endpoint(
     if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
         raise HTTPException(status_code=403, detail="Không được phép chỉnh sửa nhật ký của người khác")
 
+    old_bat, old_tat = r.thoi_gian_bat, r.thoi_gian_tat
     await update_nhat_ky(db, ma_nhat_ky, payload)
+    await _invalidate_run_stats(db, r.ma_may_bom, old_bat, old_tat)
+    await _invalidate_run_stats(db, r.ma_may_bom, r.thoi_gian_bat, r.thoi_gian_tat)
     await db.commit()
     
     return {"message": "Cập nhật nhật ký thành công", "ma_nhat_ky": ma_nhat_ky}
@@ -289,6 +346,7 @@ async def delete_nhat_ky_endpoint(
     if str(pump.ma_nguoi_dung) != str(current_user.ma_nguoi_dung):
         raise HTTPException(status_code=403, detail="Không được phép xoá nhật ký của người khác")
 
+    await _invalidate_run_stats(db, r.ma_may_bom, r.thoi_gian_bat, r.thoi_gian_tat)
     await delete_nhat_ky(db, ma_nhat_ky)
     await db.commit()
     
@@ -0,0 +1,26 @@
+from datetime import date, datetime
+from typing import Any, Dict, List
+from uuid import UUID
+from fastapi.responses import JSONResponse
+
+
+def _encode_column(values: tuple) -> list:
+    """Chuyển một cột sang kiểu JSON; kiểu giá trị được xét một lần cho cả cột, không theo từng ô."""
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, (datetime, date)):
+        return [v.isoformat() if v is not None else None for v in values]
+    if isinstance(sample, UUID):
+        return [str(v) if v is not None else None for v in values]
+    return list(values)
+
+
+def rows_to_columns(keys: List[str], rows: List[tuple]) -> Dict[str, list]:
+    """Chuyển các dòng kết quả Core thành các mảng song song theo tên cột."""
+    if not rows:
+        return {k: [] for k in keys}
+    return {k: _encode_column(col) for k, col in zip(keys, zip(*rows))}
+
+
+def columnar_response(columns: Dict[str, list], **meta: Any) -> JSONResponse:
+    """Trả về các cột đã ở kiểu JSON gốc, bỏ qua bộ encode từng phần tử của FastAPI."""
+    return JSONResponse(content={"data": columns, **meta})
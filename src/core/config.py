@@ -1,18 +1,114 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 import os
-from typing import Any
+from typing import Any, Optional
 
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Water Flow Prediction API"
     API_V1_STR: str = "/api/v1"
+    DATABASE_URL: Optional[str] = None
 
     # JWT / security settings
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days by default
 
+    # Streaming responses: rows fetched per server-side cursor round trip
+    STREAM_CHUNK_SIZE: int = 1000
+
+    # Last-value cache (read cache only; readings are ingested straight into the DB): a pump's
+    # cached latest reading is re-read from DB after this many seconds
+    LAST_VALUE_TTL_SECONDS: float = 30.0
+
+    # Forecast model registry
+    MODEL_DIR: str = ""  # empty = src/predict
+    DEFAULT_MA_MO_HINH: int = 11
+    MODEL_RELOAD_CHECK_SECONDS: float = 5.0
+    MODEL_PRELOAD: bool = True
+    # "joblib" (sklearn object per process), "compiled" (in-memory flat node arrays)
+    # or "flat" (memory-mapped node arrays shared by workers)
+    MODEL_FORMAT: str = "joblib"
+    # Evaluator for compiled/flat forests: "auto" (numba when installed), "numpy" or "numba"
+    MODEL_EVALUATOR: str = "auto"
+
+    # Scheduled fleet forecasting (only pumps whose reference reading or model version changed
+    # since their last stored forecast)
+    FORECAST_JOB_INTERVAL_MINUTES: int = 15
+    FORECAST_JOB_CHUNK_SIZE: int = 500
+
+    # Model inference off the event loop: "thread", "process" or "inline"
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_WORKERS: int = 2
+
+    # Micro-batching of concurrent single-pump predictions: a request runs at once when no batch
+    # is in flight, otherwise it waits at most MAX_WAIT_MS (max_batch 1 disables coalescing)
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 5.0
+    INFERENCE_BATCH_MAX_SIZE: int = 64
+
+    # Forecasts reused while the reference reading and model version are unchanged
+    FORECAST_CACHE_MAX_ENTRIES: int = 10000
+
+    # Rolling feature store (dac_trung_may_bom), refreshed incrementally by the scheduler. Off by
+    # default: the current models are trained on raw readings only, nothing reads the table yet
+    FEATURE_STORE_ENABLED: bool = False
+    FEATURE_STORE_INTERVAL_MINUTES: int = 5
+    FEATURE_STORE_CHUNK_SIZE: int = 1000
+
+    # Forecast accuracy: each forecast is matched to the mean realized flow over
+    # [thoi_diem_du_bao, thoi_diem_du_bao + WINDOW) once that window has passed
+    FORECAST_ACCURACY_WINDOW_MINUTES: int = 60
+    FORECAST_ACCURACY_INTERVAL_MINUTES: int = 15
+    FORECAST_ACCURACY_CHUNK_SIZE: int = 2000
+    FORECAST_ACCURACY_EWMA_ALPHA: float = 0.1
+    # System-wide alert: a model whose recent error (EWMA APE, %) exceeds the threshold
+    # on at least this share of pumps with enough samples
+    FORECAST_ERROR_ALERT_MAPE: float = 30.0
+    FORECAST_ERROR_ALERT_MIN_SAMPLES: int = 20
+    FORECAST_ERROR_ALERT_PUMP_RATIO: float = 0.5
+
+    # Multi-step forecasts (du_bao_theo_gio): default and maximum number of hourly steps
+    FORECAST_HORIZON_HOURS: int = 24
+    FORECAST_HORIZON_MAX_HOURS: int = 72
+
+    # Optional per-pump linear correction of the global model, fitted online from matched
+    # forecasts (exponential forgetting per sample); applied only when enabled
+    PUMP_CORRECTION_ENABLED: bool = False
+    PUMP_CORRECTION_FORGETTING: float = 0.99
+    PUMP_CORRECTION_MIN_SAMPLES: int = 20
+    PUMP_CORRECTION_TTL_SECONDS: float = 300.0
+
+    # What-if scenario grids: maximum grid size per request and cached grids (per model version)
+    SCENARIO_MAX_ROWS: int = 50_000
+    SCENARIO_CACHE_MAX_ENTRIES: int = 128
+
+    # Fleet-wide Holt-Winters baseline over hourly flow rollups: history window, refit period of the
+    # scheduler job (requests never refit), and the sensor-data age after which predict_flow falls
+    # back to it when no explicit ma_mo_hinh is given
+    BASELINE_HISTORY_DAYS: int = 14
+    BASELINE_REFRESH_MINUTES: int = 60
+    BASELINE_STALE_MINUTES: int = 180
+
+    # Irrigation planner (lich_tuoi): planned hours, history used to estimate per-pump soil-moisture
+    # dry-down/gain per hour (defaults apply below IRRIGATION_MIN_SAMPLES hour pairs)
+    IRRIGATION_PLAN_HOURS: int = 24
+    IRRIGATION_HISTORY_DAYS: int = 7
+    IRRIGATION_DRYDOWN_PER_HOUR: float = 0.5
+    IRRIGATION_GAIN_PER_HOUR: float = 5.0
+    IRRIGATION_MIN_SAMPLES: int = 6
+
+    # Pump run-time analytics (nhat_ky_may_bom): longest date range per request
+    RUN_STATS_MAX_DAYS: int = 366
+
+    # Model training: rows beyond TRAINING_MAX_ROWS are sampled uniformly (bounds memory; model
+    # size is bounded separately by max_leaf_nodes). Jobs started from the API fit in a child
+    # process with TRAINING_N_JOBS cores, leaving the rest to the API (-1 uses every core)
+    TRAINING_MAX_ROWS: int = 20_000_000
+    TRAINING_N_JOBS: int = 2
+    # Training jobs started from the API are tracked in process memory (run a single uvicorn
+    # worker); only the most recent TRAINING_JOB_HISTORY jobs are kept
+    TRAINING_JOB_HISTORY: int = 20
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+_executor: Optional[Executor] = None
+_lock = threading.Lock()
+
+
+def _init_process_worker(ma_mo_hinh_ids) -> None:
+    """Initializer của worker process: nạp sẵn mô hình vào registry của process đó."""
+    from src.predict.registry import registry
+
+    try:
+        registry.preload(ma_mo_hinh_ids)
+    except Exception as e:
+        # Worker vẫn dùng được, mô hình sẽ được nạp ở lần gọi đầu tiên
+        logger.error(f"Worker không nạp sẵn được mô hình: {str(e)}")
+
+
+def executor_kind() -> str:
+    kind = settings.INFERENCE_EXECUTOR.lower()
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"INFERENCE_EXECUTOR không hợp lệ: {settings.INFERENCE_EXECUTOR}")
+    return kind
+
+
+def get_executor() -> Optional[Executor]:
+    """Executor dùng chung cho tác vụ nặng CPU (suy luận mô hình), tạo lười ở lần gọi đầu.
+
+    - `thread`: ThreadPoolExecutor; phần duyệt cây của sklearn và các phép NumPy nhả GIL.
+    - `process`: ProcessPoolExecutor (spawn), mỗi worker nạp sẵn mô hình mặc định.
+    - `inline`: chạy thẳng trên event loop (trả về None).
+    """
+    global _executor
+    kind = executor_kind()
+    if kind == "inline":
+        return None
+    if _executor is not None:
+        return _executor
+
+    with _lock:
+        if _executor is None:
+            workers = settings.INFERENCE_WORKERS
+            if kind == "process":
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # spawn: không fork một process đang có thread của scheduler/uvicorn
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker,
+                    initargs=([settings.DEFAULT_MA_MO_HINH],),
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+            logger.info(f"Khởi tạo executor suy luận: {kind} x {workers}")
+    return _executor
+
+
+async def run_cpu(func: Callable, *args: Any) -> Any:
+    """Chạy `func(*args)` trên executor dùng chung để không chặn event loop.
+
+    Với `process`, `func` và tham số phải pickle được.
+    """
+    executor = get_executor()
+    if executor is None:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
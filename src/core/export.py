@@ -0,0 +1,100 @@
+import csv
+import importlib.util
+import io
+import zlib
+from typing import AsyncIterator, List, Sequence
+from sqlalchemy import Date, DateTime, Float, Integer
+
+
+def parquet_available() -> bool:
+    """pyarrow là phụ thuộc tuỳ chọn, chỉ cần khi xuất Parquet."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+async def csv_chunks(batches: AsyncIterator[Sequence[tuple]], columns: List) -> AsyncIterator[bytes]:
+    """Ghi từng lô dòng thành một đoạn CSV; header được ghi ở đoạn đầu tiên."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([c.name for c in columns])
+    async for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like đích cho ParquetWriter; phần đã ghi được lấy ra bằng `drain()` sau mỗi row group."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(columns: List):
+    import pyarrow as pa
+
+    fields = []
+    for c in columns:
+        if isinstance(c.type, Integer):
+            t = pa.int64()
+        elif isinstance(c.type, Float):
+            t = pa.float64()
+        elif isinstance(c.type, DateTime):
+            t = pa.timestamp("us")
+        elif isinstance(c.type, Date):
+            t = pa.date32()
+        else:
+            t = pa.string()
+        fields.append(pa.field(c.name, t))
+    return pa.schema(fields)
+
+
+async def parquet_chunks(batches: AsyncIterator[Sequence[tuple]], columns: List, compression: str = "snappy") -> AsyncIterator[bytes]:
+    """Ghi mỗi lô dòng thành một row group Parquet và trả về phần byte vừa ghi."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        async for rows in batches:
+            arrays = [pa.array(list(col), type=f.type) for col, f in zip(zip(*rows), schema)] if rows else None
+            if arrays:
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Nén gzip luồng byte theo từng đoạn, không cần giữ toàn bộ nội dung."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
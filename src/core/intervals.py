@@ -0,0 +1,146 @@
+from datetime import date, datetime, timedelta
+from typing import Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+DAY_SECONDS = 86_400
+SUMMARY_COLUMNS = (
+    "ma_may_bom",
+    "ngay",
+    "so_lan_bom",
+    "tong_phut_bom",
+    "ty_le_hoat_dong",
+    "lan_bom_dai_nhat_phut",
+    "so_cap_chong_lan",
+    "phut_chong_lan",
+)
+
+
+def to_seconds(values) -> np.ndarray:
+    """Mảng datetime (naive) thành số giây int64 kể từ epoch."""
+    return pd.to_datetime(pd.Series(values)).to_numpy("datetime64[s]").astype(np.int64)
+
+
+def _separated(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Dời mỗi nhóm sang một đoạn thời gian riêng (cách nhau hơn độ dài dữ liệu), để các phép tích
+    luỹ trên toàn mảng (maximum.accumulate, cumsum) không trộn các nhóm với nhau."""
+    base = int(starts.min())
+    gap = int(ends.max()) - base + 1
+    offset = codes.astype(np.int64) * gap - base
+    return starts + offset, ends + offset, gap
+
+
+def interval_union(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hợp các khoảng [start, end) trong từng nhóm; trả về (nhóm, start, end) của các khoảng đã gộp.
+
+    Sắp theo (nhóm, start) rồi một khoảng mở khoảng gộp mới khi start lớn hơn end lớn nhất trước đó
+    (khoảng chạm nhau được gộp).
+    """
+    if not len(starts):
+        return codes[:0], starts[:0], ends[:0]
+    s, e, _ = _separated(codes, starts, ends)
+    order = np.lexsort((s, codes))
+    s, e = s[order], e[order]
+    reach = np.maximum.accumulate(e)
+    new = np.ones(len(s), dtype=bool)
+    new[1:] = s[1:] > reach[:-1]
+    first = np.flatnonzero(new)
+    merged_codes = codes[order][first]
+    shift = s[first] - starts[order][first]
+    return merged_codes, s[first] - shift, np.maximum.reduceat(e, first) - shift
+
+
+def sweep_overlaps(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Quét sự kiện bật (+1) / tắt (-1) theo thời gian trong từng nhóm.
+
+    Trả về (số khoảng đang mở lúc mỗi khoảng bắt đầu, tức số cặp chồng lấn mà nó là khoảng bắt đầu
+    sau; và các đoạn (nhóm, start, end) có từ hai khoảng cùng mở). Tại cùng thời điểm, sự kiện tắt
+    xử lý trước sự kiện bật nên hai khoảng chỉ chạm nhau không tính là chồng lấn.
+    """
+    n = len(starts)
+    if not n:
+        return np.zeros(0, dtype=np.int64), codes[:0], starts[:0], ends[:0]
+    s, e, _ = _separated(codes, starts, ends)
+    times = np.concatenate([s, e])
+    delta = np.concatenate([np.ones(n, dtype=np.int64), -np.ones(n, dtype=np.int64)])
+    owner = np.concatenate([np.arange(n), np.arange(n)])
+    order = np.lexsort((delta, times))
+    times, delta, owner = times[order], delta[order], owner[order]
+    depth = np.cumsum(delta)
+
+    open_at_start = np.zeros(n, dtype=np.int64)
+    is_start = delta > 0
+    open_at_start[owner[is_start]] = (depth - delta)[is_start]
+
+    # Đoạn giữa hai sự kiện liên tiếp có độ sâu >= 2; độ sâu về 0 giữa các nhóm nên không có đoạn liên nhóm
+    seg = np.flatnonzero((depth[:-1] >= 2) & (times[1:] > times[:-1]))
+    seg_codes = codes[owner[seg]]
+    shift = s[owner[seg]] - starts[owner[seg]]
+    return open_at_start, seg_codes, times[seg] - shift, times[seg + 1] - shift
+
+
+def clip_to_days(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray, day0: int, n_days: int, n_codes: int) -> np.ndarray:
+    """Tổng số giây của các khoảng rơi vào từng ngày: ma trận (n_codes, n_days) bắt đầu từ `day0` (giây).
+
+    Mỗi khoảng được tách tại các mốc nửa đêm (lặp theo số ngày nó trải qua) rồi cộng dồn bằng add.at.
+    """
+    out = np.zeros((n_codes, n_days), dtype=np.int64)
+    lo_all, hi_all = day0, day0 + n_days * DAY_SECONDS
+    s, e = np.maximum(starts, lo_all), np.minimum(ends, hi_all)
+    keep = e > s
+    codes, s, e = codes[keep], s[keep], e[keep]
+    if not len(s):
+        return out
+    d0 = (s - day0) // DAY_SECONDS
+    d1 = (e - 1 - day0) // DAY_SECONDS
+    counts = d1 - d0 + 1
+    rep = np.repeat(np.arange(len(s)), counts)
+    day = d0[rep] + np.arange(len(rep)) - np.repeat(np.cumsum(counts) - counts, counts)
+    piece = np.minimum(e[rep], day0 + (day + 1) * DAY_SECONDS) - np.maximum(s[rep], day0 + day * DAY_SECONDS)
+    np.add.at(out, (codes[rep], day), piece)
+    return out
+
+
+def summarize_runs(runs: pd.DataFrame, pumps: Sequence[int], tu: date, den: date, now: datetime) -> pd.DataFrame:
+    """Thống kê vận hành theo (máy bơm, ngày) cho các ngày trong [tu, den] từ các lần bơm.
+
+    `runs` gồm ma_may_bom, thoi_gian_bat, thoi_gian_tat (lần đang bơm tính đến `now`) và phải gồm mọi
+    lần bơm giao với khoảng ngày. Thời gian bơm là hợp các lần bơm (chồng lấn không tính hai lần), cắt
+    theo ngày; lần bơm dài nhất, số lần bơm và số cặp chồng lấn tính theo ngày bật máy.
+    """
+    pumps = np.asarray(sorted(pumps), dtype=np.int64)
+    n_days = (den - tu).days + 1
+    day0 = int(to_seconds([datetime.combine(tu, datetime.min.time())])[0])
+
+    runs = runs[runs["ma_may_bom"].isin(pumps) & runs["thoi_gian_bat"].notna()]
+    codes = np.searchsorted(pumps, runs["ma_may_bom"].to_numpy(np.int64))
+    starts = to_seconds(runs["thoi_gian_bat"])
+    ends = to_seconds(runs["thoi_gian_tat"].fillna(pd.Timestamp(now)))
+    ends = np.maximum(ends, starts)
+
+    merged = interval_union(codes, starts, ends)
+    busy = clip_to_days(*merged, day0, n_days, len(pumps))
+    open_at_start, *segments = sweep_overlaps(codes, starts, ends)
+    overlap = clip_to_days(*segments, day0, n_days, len(pumps))
+
+    start_day = (starts - day0) // DAY_SECONDS
+    in_range = (start_day >= 0) & (start_day < n_days)
+    c, d = codes[in_range], start_day[in_range]
+    count = np.zeros((len(pumps), n_days), dtype=np.int64)
+    np.add.at(count, (c, d), 1)
+    longest = np.zeros((len(pumps), n_days), dtype=np.int64)
+    np.maximum.at(longest, (c, d), (ends - starts)[in_range])
+    pairs = np.zeros((len(pumps), n_days), dtype=np.int64)
+    np.add.at(pairs, (c, d), open_at_start[in_range])
+
+    days = [tu + timedelta(days=i) for i in range(n_days)]
+    return pd.DataFrame({
+        "ma_may_bom": np.repeat(pumps, n_days),
+        "ngay": np.tile(np.array(days, dtype=object), len(pumps)),
+        "so_lan_bom": count.ravel(),
+        "tong_phut_bom": busy.ravel() / 60.0,
+        "ty_le_hoat_dong": busy.ravel() / DAY_SECONDS,
+        "lan_bom_dai_nhat_phut": longest.ravel() / 60.0,
+        "so_cap_chong_lan": pairs.ravel(),
+        "phut_chong_lan": overlap.ravel() / 60.0,
+    }, columns=list(SUMMARY_COLUMNS))
@@ -0,0 +1,76 @@
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.crud.du_lieu_cam_bien import get_latest_du_lieu_for_pumps
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+
+# Ảnh chụp bất biến của một dòng du_lieu_cam_bien (truy cập theo thuộc tính như entity ORM)
+LatestReading = namedtuple("LatestReading", [c.name for c in DuLieuCamBien.__table__.c])
+
+
+def _position(reading) -> Tuple:
+    return (reading.thoi_gian_tao, reading.ma_du_lieu)
+
+
+class LastValueStore:
+    """Cache đọc bản ghi cảm biến mới nhất của mỗi máy bơm, giữ trong bộ nhớ của process.
+
+    Dữ liệu cảm biến được thiết bị ghi thẳng vào DB (service này không có đường ingest), nên mỗi mục
+    chỉ được tin trong `ttl_seconds`: giá trị trả về có thể cũ tới chừng đó. Sau TTL (hoặc khi khởi
+    động nguội) các máy bơm thiếu được đọc lại từ DB trong một truy vấn duy nhất. `record()` chỉ
+    được gọi khi sửa bản ghi qua API. Nơi cần giá trị đúng lúc (kiểm tra mất dữ liệu) dùng
+    `refresh=True` để luôn đọc DB.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._items: Dict[int, Tuple[float, LatestReading]] = {}
+
+    def _put(self, reading: LatestReading) -> None:
+        self._items[reading.ma_may_bom] = (time.monotonic(), reading)
+
+    def record(self, obj) -> None:
+        """Cập nhật khi có dữ liệu mới được ghi; bỏ qua nếu bản ghi cũ hơn bản đang giữ."""
+        reading = LatestReading(*(getattr(obj, f) for f in LatestReading._fields))
+        cached = self._items.get(reading.ma_may_bom)
+        if cached is None or reading.thoi_gian_tao is None:
+            # Không biết đây có phải bản mới nhất hay không, để lần đọc sau lấy từ DB
+            return
+        if cached[1].thoi_gian_tao is None or _position(reading) >= _position(cached[1]):
+            self._put(reading)
+
+    def invalidate(self, ma_may_bom: Optional[int] = None) -> None:
+        if ma_may_bom is None:
+            self._items.clear()
+        else:
+            self._items.pop(ma_may_bom, None)
+
+    async def get_many(self, db: AsyncSession, ma_may_bom_ids: Iterable[int], refresh: bool = False) -> Dict[int, LatestReading]:
+        """Bản ghi mới nhất theo máy bơm (máy bơm chưa có dữ liệu không có trong kết quả).
+
+        `refresh=True` bỏ qua cache, đọc DB cho mọi máy bơm rồi cập nhật cache.
+        """
+        now = time.monotonic()
+        found: Dict[int, LatestReading] = {}
+        missing: List[int] = []
+        for ma in dict.fromkeys(ma_may_bom_ids):
+            cached = None if refresh else self._items.get(ma)
+            if cached is not None and now - cached[0] < self.ttl_seconds:
+                found[ma] = cached[1]
+            else:
+                missing.append(ma)
+
+        if missing:
+            for row in await get_latest_du_lieu_for_pumps(db, missing):
+                reading = LatestReading(*(row._mapping[f] for f in LatestReading._fields))
+                self._put(reading)
+                found[reading.ma_may_bom] = reading
+        return found
+
+    async def get(self, db: AsyncSession, ma_may_bom: int, refresh: bool = False) -> Optional[LatestReading]:
+        return (await self.get_many(db, [ma_may_bom], refresh)).get(ma_may_bom)
+
+
+last_values = LastValueStore(settings.LAST_VALUE_TTL_SECONDS)
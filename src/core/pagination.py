@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(thoi_gian_tao: datetime, ma: int) -> str:
+    """Mã hoá vị trí keyset (thoi_gian_tao, mã) thành chuỗi token an toàn trên URL."""
+    raw = json.dumps([thoi_gian_tao.isoformat(), ma], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """Giải mã token do `encode_cursor` tạo ra; None nếu token không hợp lệ."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        thoi_gian_tao, ma = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(thoi_gian_tao), int(ma)
+    except Exception:
+        return None
+
+
+async def estimate_count(db: AsyncSession, q) -> int:
+    """Số dòng ước lượng của planner cho `q` (EXPLAIN) thay vì chạy COUNT(*)."""
+    compiled = q.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    conn = await db.connection()
+    res = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = res.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,5 +1,6 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, date, timedelta
@@ -175,6 +176,53 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # Job: Dự báo cho các máy bơm có đầu vào dự báo đổi - mỗi FORECAST_JOB_INTERVAL_MINUTES phút
+    scheduler.add_job(
+        lambda: run_async(forecast_changed_pumps()),
+        IntervalTrigger(minutes=settings.FORECAST_JOB_INTERVAL_MINUTES),
+        id="fleet_forecast",
+        name="Fleet Forecast",
+        replace_existing=True
+    )
+    
+    # Job: Cập nhật feature store cho các bản ghi cảm biến mới - mỗi FEATURE_STORE_INTERVAL_MINUTES phút (khi bật)
+    if settings.FEATURE_STORE_ENABLED:
+        scheduler.add_job(
+            lambda: run_async(refresh_feature_store_periodic()),
+            IntervalTrigger(minutes=settings.FEATURE_STORE_INTERVAL_MINUTES),
+            id="feature_store",
+            name="Feature Store Refresh",
+            replace_existing=True
+        )
+    
+    # Job: Đối chiếu dự báo với lưu lượng thực tế - mỗi FORECAST_ACCURACY_INTERVAL_MINUTES phút
+    scheduler.add_job(
+        lambda: run_async(track_forecast_accuracy_periodic()),
+        IntervalTrigger(minutes=settings.FORECAST_ACCURACY_INTERVAL_MINUTES),
+        id="forecast_accuracy",
+        name="Forecast Accuracy Tracking",
+        replace_existing=True
+    )
+    
+    # Job: Khớp lại mô hình cơ sở Holt-Winters của cả đội máy bơm - chạy ngay khi khởi động, sau đó mỗi BASELINE_REFRESH_MINUTES phút
+    scheduler.add_job(
+        lambda: run_async(refresh_baseline_periodic()),
+        IntervalTrigger(minutes=settings.BASELINE_REFRESH_MINUTES),
+        id="fleet_baseline",
+        name="Fleet Baseline Refit",
+        next_run_time=datetime.now(),
+        replace_existing=True
+    )
+    
+    # Job: Lập lịch tưới cho cả đội máy bơm - phút 10 mỗi giờ (sau job dự báo)
+    scheduler.add_job(
+        lambda: run_async(plan_irrigation_periodic()),
+        CronTrigger(minute=10),
+        id="irrigation_plan",
+        name="Irrigation Planning",
+        replace_existing=True
+    )
+    
     scheduler.start()
     logger.info("Scheduler khởi động thành công")
     
@@ -291,3 +339,136 @@ async def check_system_health_periodic():
             logger.info("Kiểm tra sức khỏe hệ thống hoàn tất")
     except Exception as e:
         logger.error(f"Lỗi khi kiểm tra sức khỏe hệ thống: {str(e)}")
+
+
+async def forecast_changed_pumps():
+    """Dự báo định kỳ cho các máy bơm đang hoạt động có đầu vào dự báo (bản ghi cảm biến tham chiếu, phiên bản mô hình) đổi kể từ lần dự báo gần nhất"""
+    try:
+        from src.crud.may_bom import list_active_may_bom
+        from src.predict.forecast import forecast_pumps
+        from src.predict.registry import registry
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        from sqlalchemy.orm import sessionmaker
+        
+        ma_mo_hinh = settings.DEFAULT_MA_MO_HINH
+        loaded = await registry.aget(ma_mo_hinh)
+        chunk_size = settings.FORECAST_JOB_CHUNK_SIZE
+        
+        # Tạo async session
+        async_engine = create_async_engine(settings.DATABASE_URL)
+        async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with async_session() as db:
+                pumps = await list_active_may_bom(db)
+                
+                # Mỗi lô: truy vấn dữ liệu tham chiếu và khoá dự báo đã lưu, một lần gọi mô hình cho
+                # các máy bơm có khoá đổi, một câu INSERT
+                created_count, missing_count = 0, 0
+                for i in range(0, len(pumps), chunk_size):
+                    forecasts, missing = await forecast_pumps(
+                        db, pumps[i:i + chunk_size], ma_mo_hinh, loaded.model, loaded.version, skip_unchanged=True
+                    )
+                    created_count += len(forecasts)
+                    missing_count += len(missing)
+        finally:
+            await async_engine.dispose()
+        
+        unchanged_count = len(pumps) - created_count - missing_count
+        logger.info(f"Dự báo định kỳ: {created_count} máy bơm có kết quả mới, {unchanged_count} máy bơm không đổi đầu vào, {missing_count} máy bơm thiếu dữ liệu")
+    except Exception as e:
+        logger.error(f"Lỗi khi chạy dự báo định kỳ: {str(e)}")
+
+
+async def refresh_feature_store_periodic():
+    """Tính đặc trưng trượt (dac_trung_may_bom) cho các bản ghi cảm biến mới của từng máy bơm"""
+    try:
+        from src.predict.features import refresh_feature_store
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        from sqlalchemy.orm import sessionmaker
+        
+        # Tạo async session
+        async_engine = create_async_engine(settings.DATABASE_URL)
+        async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with async_session() as db:
+                written = await refresh_feature_store(db, settings.FEATURE_STORE_CHUNK_SIZE)
+        finally:
+            await async_engine.dispose()
+        
+        logger.info(f"Cập nhật feature store: {written} dòng đặc trưng mới")
+    except Exception as e:
+        logger.error(f"Lỗi khi cập nhật feature store: {str(e)}")
+
+
+async def track_forecast_accuracy_periodic():
+    """Đối chiếu các dự báo đã hết cửa sổ với lưu lượng thực tế và cập nhật thống kê sai số theo mô hình/máy bơm"""
+    try:
+        from src.predict.accuracy import track_forecast_accuracy
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        from sqlalchemy.orm import sessionmaker
+        
+        # Tạo async session
+        async_engine = create_async_engine(settings.DATABASE_URL)
+        async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with async_session() as db:
+                matched = await track_forecast_accuracy(
+                    db,
+                    window_minutes=settings.FORECAST_ACCURACY_WINDOW_MINUTES,
+                    chunk_size=settings.FORECAST_ACCURACY_CHUNK_SIZE,
+                    alpha=settings.FORECAST_ACCURACY_EWMA_ALPHA,
+                    forgetting=settings.PUMP_CORRECTION_FORGETTING,
+                )
+        finally:
+            await async_engine.dispose()
+        
+        logger.info(f"Đối chiếu độ chính xác dự báo: {matched} dự báo")
+    except Exception as e:
+        logger.error(f"Lỗi khi đối chiếu độ chính xác dự báo: {str(e)}")
+
+
+async def refresh_baseline_periodic():
+    """Khớp lại mô hình cơ sở Holt-Winters (baseline_store) từ lưu lượng theo giờ của mọi máy bơm"""
+    try:
+        from src.predict.baseline import baseline_store
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        from sqlalchemy.orm import sessionmaker
+        
+        # Tạo async session
+        async_engine = create_async_engine(settings.DATABASE_URL)
+        async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with async_session() as db:
+                baseline = await baseline_store.refresh(db)
+        finally:
+            await async_engine.dispose()
+        
+        logger.info(f"Khớp lại mô hình cơ sở: {len(baseline.pumps)} máy bơm")
+    except Exception as e:
+        logger.error(f"Lỗi khi khớp lại mô hình cơ sở: {str(e)}")
+
+
+async def plan_irrigation_periodic():
+    """Lập lịch tưới (lich_tuoi) cho các máy bơm có ngưỡng độ ẩm trong cấu hình thiết bị"""
+    try:
+        from src.predict.irrigation import plan_fleet
+        from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+        from sqlalchemy.orm import sessionmaker
+        
+        # Tạo async session
+        async_engine = create_async_engine(settings.DATABASE_URL)
+        async_session = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            async with async_session() as db:
+                planned = await plan_fleet(db)
+        finally:
+            await async_engine.dispose()
+        
+        logger.info(f"Lập lịch tưới: {planned} máy bơm")
+    except Exception as e:
+        logger.error(f"Lỗi khi lập lịch tưới: {str(e)}")
@@ -0,0 +1,124 @@
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.models.dac_trung_may_bom import DacTrungMayBom
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+from src.models.nhat_ky_may_bom import NhatKyMayBom
+
+
+async def list_pumps_with_new_readings(db: AsyncSession) -> Dict[int, Optional[Tuple[datetime, int]]]:
+    """Máy bơm có bản ghi cảm biến sau đặc trưng đã tính gần nhất (hoặc chưa có đặc trưng), kèm
+    high-water mark (thoi_gian, ma_du_lieu) của máy bơm đó (None nếu chưa có).
+
+    So sánh theo cặp (thoi_gian_tao, ma_du_lieu) như thứ tự đọc của job, nên bản ghi đến sau nhưng
+    trùng thời điểm với high-water mark vẫn được tính.
+    """
+    q = text("""
+        SELECT m.ma_may_bom, hw.thoi_gian, hw.ma_du_lieu
+        FROM may_bom m
+        LEFT JOIN LATERAL (
+            SELECT thoi_gian, ma_du_lieu FROM dac_trung_may_bom
+            WHERE dac_trung_may_bom.ma_may_bom = m.ma_may_bom
+            ORDER BY thoi_gian DESC, ma_du_lieu DESC
+            LIMIT 1
+        ) hw ON true
+        WHERE EXISTS (
+            SELECT 1 FROM du_lieu_cam_bien d
+            WHERE d.ma_may_bom = m.ma_may_bom
+              AND d.thoi_gian_tao IS NOT NULL
+              AND (hw.thoi_gian IS NULL OR (d.thoi_gian_tao, d.ma_du_lieu) > (hw.thoi_gian, hw.ma_du_lieu))
+        )
+        ORDER BY m.ma_may_bom
+    """)
+    res = await db.execute(q)
+    return {
+        r.ma_may_bom: (r.thoi_gian, r.ma_du_lieu) if r.thoi_gian is not None else None
+        for r in res.all()
+    }
+
+
+def _reading_columns():
+    c = DuLieuCamBien
+    return (c.ma_du_lieu, c.ma_may_bom, c.thoi_gian_tao, c.do_am_dat, c.do_am, c.mua)
+
+
+async def list_readings_for_pump(
+    db: AsyncSession,
+    ma_may_bom: int,
+    after: Optional[Tuple[datetime, int]],
+    limit: int,
+) -> list:
+    """Một trang keyset các bản ghi sau vị trí `after`, theo (thoi_gian_tao, ma_du_lieu) tăng dần."""
+    c = DuLieuCamBien
+    conds = [c.ma_may_bom == ma_may_bom, c.thoi_gian_tao.isnot(None)]
+    if after is not None:
+        conds.append(tuple_(c.thoi_gian_tao, c.ma_du_lieu) > tuple_(*after))
+    q = select(*_reading_columns()).where(*conds).order_by(c.thoi_gian_tao.asc(), c.ma_du_lieu.asc()).limit(limit)
+    res = await db.execute(q)
+    return res.all()
+
+
+async def stream_readings_for_pump(
+    db: AsyncSession,
+    ma_may_bom: int,
+    until: Optional[Tuple[datetime, int]] = None,
+    since: Optional[datetime] = None,
+    chunk_size: int = 1000,
+) -> AsyncIterator[Sequence]:
+    """Bản ghi cảm biến của một máy bơm theo thứ tự (thoi_gian_tao, ma_du_lieu) tăng dần, từng lô.
+
+    `until` là vị trí keyset (gồm), `since` là mốc thời gian (gồm). Chỉ đọc: không ghi/commit trên
+    session khi đang duyệt.
+    """
+    c = DuLieuCamBien
+    conds = [c.ma_may_bom == ma_may_bom, c.thoi_gian_tao.isnot(None)]
+    if until is not None:
+        conds.append(tuple_(c.thoi_gian_tao, c.ma_du_lieu) <= tuple_(*until))
+    if since is not None:
+        conds.append(c.thoi_gian_tao >= since)
+    q = (
+        select(*_reading_columns())
+        .where(*conds)
+        .order_by(c.thoi_gian_tao.asc(), c.ma_du_lieu.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(q)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def list_completed_runs(db: AsyncSession, ma_may_bom: int, after: Optional[datetime]) -> list:
+    """Các lần bơm đã kết thúc, theo thời gian tắt tăng dần.
+
+    Với `after`, gồm lần cuối cùng kết thúc trước hoặc đúng `after` (để biết lần tưới gần nhất tại
+    thời điểm bắt đầu) và mọi lần kết thúc sau đó.
+    """
+    n = NhatKyMayBom
+    conds = [n.ma_may_bom == ma_may_bom, n.thoi_gian_bat.isnot(None), n.thoi_gian_tat.isnot(None)]
+    cols = (n.thoi_gian_bat, n.thoi_gian_tat)
+    runs = []
+    if after is not None:
+        prev_q = select(*cols).where(*conds, n.thoi_gian_tat <= after).order_by(n.thoi_gian_tat.desc()).limit(1)
+        runs = list((await db.execute(prev_q)).all())
+        conds.append(n.thoi_gian_tat > after)
+    res = await db.execute(select(*cols).where(*conds).order_by(n.thoi_gian_tat.asc()))
+    return runs + list(res.all())
+
+
+async def insert_features(db: AsyncSession, rows: List[dict]) -> None:
+    """Ghi nhiều dòng đặc trưng; dòng đã có (cùng ma_du_lieu) được giữ nguyên."""
+    if not rows:
+        return
+    stmt = pg_insert(DacTrungMayBom).on_conflict_do_nothing(index_elements=["ma_du_lieu"])
+    await db.execute(stmt, rows)
+    await db.commit()
+
+
+async def delete_features_from(db: AsyncSession, ma_may_bom: int, thoi_gian: datetime) -> None:
+    """Xoá đặc trưng từ `thoi_gian` trở đi để lần cập nhật sau tính lại (khi bản ghi cũ bị sửa)."""
+    await db.execute(
+        delete(DacTrungMayBom).where(DacTrungMayBom.ma_may_bom == ma_may_bom, DacTrungMayBom.thoi_gian >= thoi_gian)
+    )
+    await db.commit()
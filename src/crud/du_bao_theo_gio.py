@@ -0,0 +1,51 @@
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from src.models.du_bao_theo_gio import DuBaoTheoGio
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+
+
+async def get_hourly_feature_profile(db: AsyncSession, ma_may_bom: int, since: datetime) -> list:
+    """Trung bình mua/do_am_dat/nhiet_do/do_am theo giờ trong ngày của máy bơm từ `since`."""
+    c = DuLieuCamBien
+    gio = func.extract("hour", c.thoi_gian_tao).label("gio")
+    q = (
+        select(gio, func.avg(c.mua).label("mua"), func.avg(c.do_am_dat).label("do_am_dat"),
+               func.avg(c.nhiet_do).label("nhiet_do"), func.avg(c.do_am).label("do_am"))
+        .where(c.ma_may_bom == ma_may_bom, c.thoi_gian_tao >= since)
+        .group_by(gio)
+    )
+    res = await db.execute(q)
+    return res.all()
+
+
+async def create_du_bao_theo_gio(db: AsyncSession, obj_in: DuBaoTheoGio) -> DuBaoTheoGio:
+    db.add(obj_in)
+    await db.commit()
+    await db.refresh(obj_in)
+    return obj_in
+
+
+async def get_latest_du_bao_theo_gio(db: AsyncSession, ma_may_bom: int, ma_mo_hinh: Optional[int] = None) -> Optional[DuBaoTheoGio]:
+    q = select(DuBaoTheoGio).where(DuBaoTheoGio.ma_may_bom == ma_may_bom)
+    if ma_mo_hinh is not None:
+        q = q.where(DuBaoTheoGio.ma_mo_hinh == ma_mo_hinh)
+    q = q.order_by(DuBaoTheoGio.thoi_gian_tao.desc(), DuBaoTheoGio.ma_du_bao_theo_gio.desc()).limit(1)
+    res = await db.execute(q)
+    return res.scalars().first()
+
+
+async def get_latest_hourly_forecasts(db: AsyncSession, ma_may_bom_ids: List[int], since: datetime) -> list:
+    """Dự báo theo giờ mới nhất (tạo từ `since`) của mỗi máy bơm, một truy vấn DISTINCT ON."""
+    if not ma_may_bom_ids:
+        return []
+    d = DuBaoTheoGio
+    q = (
+        select(d.ma_may_bom, d.thoi_diem_bat_dau, d.buoc_phut, d.luu_luong)
+        .where(d.ma_may_bom.in_(ma_may_bom_ids), d.thoi_gian_tao >= since)
+        .distinct(d.ma_may_bom)
+        .order_by(d.ma_may_bom, d.thoi_gian_tao.desc(), d.ma_du_bao_theo_gio.desc())
+    )
+    res = await db.execute(q)
+    return res.all()
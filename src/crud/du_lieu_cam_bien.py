@@ -1,51 +1,191 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, text, tuple_
 from src.schemas.data import DataCreate
-from typing import Optional, List, Tuple
+from typing import AsyncIterator, Dict, Optional, List, Sequence, Tuple
+from datetime import datetime
 import uuid
 from src.models.du_lieu_cam_bien import DuLieuCamBien
-from src.models.may_bom import MayBom
+from src.core.pagination import estimate_count
+from src.core.columnar import rows_to_columns
 
 
-async def list_du_lieu_for_user(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], limit: int, offset: int) -> Tuple[List[DuLieuCamBien], int]:
-    q = select(DuLieuCamBien).join(MayBom, DuLieuCamBien.ma_may_bom == MayBom.ma_may_bom).where(MayBom.ma_nguoi_dung == ma_nd)
+def _du_lieu_filters(ma_nd, ma_may_bom: Optional[int], ngay=None) -> list:
+    """Lọc theo cột `ma_nguoi_dung` sao chép sẵn trên du_lieu_cam_bien nên không cần join `may_bom`."""
+    conds = [DuLieuCamBien.ma_nguoi_dung == ma_nd]
+    if ngay is not None:
+        conds.append(DuLieuCamBien.ngay == ngay)
     if ma_may_bom:
-        q = q.where(DuLieuCamBien.ma_may_bom == ma_may_bom)
-    q = q.order_by(DuLieuCamBien.thoi_gian_tao.desc()).limit(limit).offset(offset)
+        conds.append(DuLieuCamBien.ma_may_bom == ma_may_bom)
+    return conds
+
+
+async def _count_du_lieu(db: AsyncSession, conds: list, exact_total: bool) -> int:
+    if not exact_total:
+        return await estimate_count(db, select(DuLieuCamBien.ma_du_lieu).where(*conds))
+    count_q = select(func.count()).select_from(DuLieuCamBien).where(*conds)
+    count_res = await db.execute(count_q)
+    return int(count_res.scalar_one())
+
+
+def paginate_du_lieu(q, limit: Optional[int], offset: int, cursor: Optional[Tuple[datetime, int]]):
+    """Sắp xếp mới nhất trước và cắt trang cho truy vấn dữ liệu cảm biến.
+
+    Có `cursor` thì phân trang keyset: chỉ lấy các dòng đứng sau (thoi_gian_tao, ma_du_lieu) cuối
+    của trang trước và bỏ qua `offset`. `limit` None thì không giới hạn.
+    """
+    if cursor is not None:
+        q = q.where(tuple_(DuLieuCamBien.thoi_gian_tao, DuLieuCamBien.ma_du_lieu) < tuple_(*cursor))
+    q = q.order_by(DuLieuCamBien.thoi_gian_tao.desc(), DuLieuCamBien.ma_du_lieu.desc())
+    if limit is not None:
+        q = q.limit(limit)
+        if cursor is None:
+            q = q.offset(offset)
+    return q
+
+
+async def _list_du_lieu_page(db: AsyncSession, conds: list, limit: Optional[int], offset: int, cursor: Optional[Tuple[datetime, int]], exact_total: bool) -> Tuple[List[DuLieuCamBien], int]:
+    q = paginate_du_lieu(select(DuLieuCamBien).where(*conds), limit, offset, cursor)
     res = await db.execute(q)
     items = res.scalars().all()
 
-    count_q = select(func.count()).select_from(DuLieuCamBien).join(MayBom, DuLieuCamBien.ma_may_bom == MayBom.ma_may_bom).where(MayBom.ma_nguoi_dung == ma_nd)
-    if ma_may_bom:
-        count_q = count_q.where(DuLieuCamBien.ma_may_bom == ma_may_bom)
-    count_res = await db.execute(count_q)
-    total = int(count_res.scalar_one())
+    total = await _count_du_lieu(db, conds, exact_total)
     return items, total
 
 
-async def list_du_lieu_by_day(db: AsyncSession, ma_nd, ngay, ma_may_bom: Optional[int]) -> List[DuLieuCamBien]:
-    q = select(DuLieuCamBien).join(MayBom, DuLieuCamBien.ma_may_bom == MayBom.ma_may_bom).where(MayBom.ma_nguoi_dung == ma_nd, DuLieuCamBien.ngay == ngay)
-    if ma_may_bom:
-        q = q.where(DuLieuCamBien.ma_may_bom == ma_may_bom)
-    q = q.order_by(DuLieuCamBien.thoi_gian_tao.desc())
+async def list_du_lieu_for_user(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], limit: Optional[int], offset: int, cursor: Optional[Tuple[datetime, int]] = None, exact_total: bool = False) -> Tuple[List[DuLieuCamBien], int]:
+    """Một trang dữ liệu cảm biến. `cursor` bật phân trang keyset (bỏ qua `offset`);
+    `total` là ước lượng của planner trừ khi `exact_total=True`."""
+    conds = _du_lieu_filters(ma_nd, ma_may_bom)
+    return await _list_du_lieu_page(db, conds, limit, offset, cursor, exact_total)
+
+
+async def list_du_lieu_by_day_paginated(db: AsyncSession, ma_nd, ngay, ma_may_bom: Optional[int], limit: int, offset: int, cursor: Optional[Tuple[datetime, int]] = None, exact_total: bool = False) -> Tuple[List[DuLieuCamBien], int]:
+    conds = _du_lieu_filters(ma_nd, ma_may_bom, ngay)
+    return await _list_du_lieu_page(db, conds, limit, offset, cursor, exact_total)
+
+
+# Cột trả về cho chế độ columnar (biểu đồ)
+COLUMNAR_COLUMNS = (
+    DuLieuCamBien.ma_du_lieu,
+    DuLieuCamBien.ma_may_bom,
+    DuLieuCamBien.thoi_gian_tao,
+    DuLieuCamBien.luu_luong_nuoc,
+    DuLieuCamBien.do_am_dat,
+    DuLieuCamBien.nhiet_do,
+    DuLieuCamBien.do_am,
+    DuLieuCamBien.mua,
+    DuLieuCamBien.so_xung,
+    DuLieuCamBien.tong_the_tich,
+)
+
+
+async def list_du_lieu_columns(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], ngay=None, limit: Optional[int] = None, offset: int = 0, cursor: Optional[Tuple[datetime, int]] = None, exact_total: bool = False) -> Tuple[Dict[str, list], int]:
+    """Dữ liệu cảm biến dạng mảng song song theo cột, đọc thẳng từ kết quả Core (không dựng entity ORM)."""
+    conds = _du_lieu_filters(ma_nd, ma_may_bom, ngay)
+    q = paginate_du_lieu(select(*COLUMNAR_COLUMNS).where(*conds), limit, offset, cursor)
     res = await db.execute(q)
-    return res.scalars().all()
+    columns = rows_to_columns(list(res.keys()), res.all())
 
+    total = await _count_du_lieu(db, conds, exact_total)
+    return columns, total
 
-async def list_du_lieu_by_day_paginated(db: AsyncSession, ma_nd, ngay, ma_may_bom: Optional[int], limit: int, offset: int) -> Tuple[List[DuLieuCamBien], int]:
-    q = select(DuLieuCamBien).join(MayBom, DuLieuCamBien.ma_may_bom == MayBom.ma_may_bom).where(MayBom.ma_nguoi_dung == ma_nd, DuLieuCamBien.ngay == ngay)
-    if ma_may_bom:
-        q = q.where(DuLieuCamBien.ma_may_bom == ma_may_bom)
-    q = q.order_by(DuLieuCamBien.thoi_gian_tao.desc()).limit(limit).offset(offset)
+
+# Cột xuất file (CSV/Parquet), không gồm ma_nguoi_dung
+EXPORT_COLUMNS = (
+    DuLieuCamBien.ma_du_lieu,
+    DuLieuCamBien.ma_may_bom,
+    DuLieuCamBien.ngay,
+    DuLieuCamBien.thoi_gian_tao,
+    DuLieuCamBien.luu_luong_nuoc,
+    DuLieuCamBien.do_am_dat,
+    DuLieuCamBien.nhiet_do,
+    DuLieuCamBien.do_am,
+    DuLieuCamBien.mua,
+    DuLieuCamBien.so_xung,
+    DuLieuCamBien.tong_the_tich,
+)
+
+
+async def stream_du_lieu_for_user(
+    db: AsyncSession,
+    ma_nd,
+    ma_may_bom: Optional[int],
+    ngay=None,
+    chunk_size: int = 1000,
+    columns: Optional[Sequence] = None,
+    tu: Optional[datetime] = None,
+    den: Optional[datetime] = None,
+    ascending: bool = False,
+) -> AsyncIterator[list]:
+    """Đọc dữ liệu cảm biến qua server-side cursor, trả về từng lô `chunk_size` dòng.
+
+    Chọn cột Core thay vì entity ORM để các dòng không bị giữ lại trong identity map của session.
+    """
+    conds = _du_lieu_filters(ma_nd, ma_may_bom, ngay)
+    if tu is not None:
+        conds.append(DuLieuCamBien.thoi_gian_tao >= tu)
+    if den is not None:
+        conds.append(DuLieuCamBien.thoi_gian_tao < den)
+    if ascending:
+        order = (DuLieuCamBien.thoi_gian_tao.asc(), DuLieuCamBien.ma_du_lieu.asc())
+    else:
+        order = (DuLieuCamBien.thoi_gian_tao.desc(), DuLieuCamBien.ma_du_lieu.desc())
+    q = (
+        select(*(columns or DuLieuCamBien.__table__.c))
+        .where(*conds)
+        .order_by(*order)
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(q)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_latest_du_lieu_for_pumps(db: AsyncSession, ma_may_bom_ids: List[int]) -> list:
+    """Bản ghi mới nhất của từng máy bơm trong một truy vấn.
+
+    LATERAL + LIMIT 1 cho mỗi máy bơm dùng index (ma_may_bom, thoi_gian_tao DESC) thay vì
+    quét toàn bộ lịch sử như DISTINCT ON.
+    """
+    if not ma_may_bom_ids:
+        return []
+    q = text("""
+        SELECT d.* FROM unnest(CAST(:ids AS integer[])) AS p(ma_may_bom)
+        CROSS JOIN LATERAL (
+            SELECT * FROM du_lieu_cam_bien
+            WHERE du_lieu_cam_bien.ma_may_bom = p.ma_may_bom
+            ORDER BY thoi_gian_tao DESC, ma_du_lieu DESC
+            LIMIT 1
+        ) d
+    """)
+    res = await db.execute(q, {"ids": list(ma_may_bom_ids)})
+    return res.all()
+
+
+async def _hourly_rollups(db: AsyncSession, column, since: datetime, until: datetime) -> list:
+    gio = func.date_trunc("hour", DuLieuCamBien.thoi_gian_tao).label("gio")
+    q = (
+        select(DuLieuCamBien.ma_may_bom, gio, func.avg(column))
+        .where(
+            DuLieuCamBien.thoi_gian_tao >= since,
+            DuLieuCamBien.thoi_gian_tao < until,
+            column.isnot(None),
+            DuLieuCamBien.ma_may_bom.isnot(None),
+        )
+        .group_by(DuLieuCamBien.ma_may_bom, gio)
+    )
     res = await db.execute(q)
-    items = res.scalars().all()
+    return res.all()
 
-    count_q = select(func.count()).select_from(DuLieuCamBien).join(MayBom, DuLieuCamBien.ma_may_bom == MayBom.ma_may_bom).where(MayBom.ma_nguoi_dung == ma_nd, DuLieuCamBien.ngay == ngay)
-    if ma_may_bom:
-        count_q = count_q.where(DuLieuCamBien.ma_may_bom == ma_may_bom)
-    count_res = await db.execute(count_q)
-    total = int(count_res.scalar_one())
-    return items, total
+
+async def get_hourly_flow_rollups(db: AsyncSession, since: datetime, until: datetime) -> list:
+    """Trung bình `luu_luong_nuoc` theo (máy bơm, giờ) trong [since, until) cho mọi máy bơm."""
+    return await _hourly_rollups(db, DuLieuCamBien.luu_luong_nuoc, since, until)
+
+
+async def get_hourly_soil_moisture_rollups(db: AsyncSession, since: datetime, until: datetime) -> list:
+    """Trung bình `do_am_dat` theo (máy bơm, giờ) trong [since, until) cho mọi máy bơm."""
+    return await _hourly_rollups(db, DuLieuCamBien.do_am_dat, since, until)
 
 
 async def get_du_lieu_by_id(db: AsyncSession, ma_du_lieu: int) -> Optional[DuLieuCamBien]:
@@ -1,7 +1,9 @@
-from typing import Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import insert, select, func, text
+from datetime import datetime
 from src.models.du_lieu_du_bao import DuLieuDuBao
+from src.core.columnar import rows_to_columns
 
 
 async def list_du_lieu_du_bao_for_user(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], limit: Optional[int], offset: int) -> Tuple[List[DuLieuDuBao], int]:
@@ -26,6 +28,110 @@ async def list_du_lieu_du_bao_for_user(db: AsyncSession, ma_nd, ma_may_bom: Opti
     return items, total
 
 
+async def list_du_lieu_du_bao_columns(db: AsyncSession, ma_nd, ma_may_bom: Optional[int], limit: Optional[int], offset: int) -> Tuple[Dict[str, list], int]:
+    """Dữ liệu dự báo dạng mảng song song theo cột, đọc thẳng từ kết quả Core."""
+    conds = [DuLieuDuBao.ma_nguoi_dung == ma_nd]
+    if ma_may_bom:
+        conds.append(DuLieuDuBao.ma_may_bom == ma_may_bom)
+
+    q = select(
+        DuLieuDuBao.ma_du_bao,
+        DuLieuDuBao.ma_may_bom,
+        DuLieuDuBao.mo_hinh,
+        DuLieuDuBao.ma_mo_hinh,
+        DuLieuDuBao.thoi_diem_du_bao,
+        DuLieuDuBao.luu_luong_du_bao,
+        DuLieuDuBao.do_tin_cay,
+        DuLieuDuBao.luu_luong_p10,
+        DuLieuDuBao.luu_luong_p50,
+        DuLieuDuBao.luu_luong_p90,
+        DuLieuDuBao.thoi_gian_tao,
+    ).where(*conds).order_by(DuLieuDuBao.thoi_gian_tao.desc())
+    if limit is not None and limit >= 0:
+        q = q.limit(limit).offset(offset)
+    res = await db.execute(q)
+    columns = rows_to_columns(list(res.keys()), res.all())
+
+    count_q = select(func.count()).select_from(DuLieuDuBao).where(*conds)
+    total = int((await db.execute(count_q)).scalar_one())
+    return columns, total
+
+
+async def get_forecast_inputs_for_pumps(db: AsyncSession, ma_may_bom_ids: List[int], now: datetime) -> list:
+    """Một truy vấn lấy, cho mỗi máy bơm, thời điểm bật máy gần nhất và bản ghi cảm biến
+    tham chiếu (bản mới nhất không muộn hơn thời điểm đó, hoặc `now` nếu chưa có nhật ký).
+
+    Máy bơm không có bản ghi tham chiếu vẫn có một dòng với `ma_du_lieu` là NULL.
+    """
+    if not ma_may_bom_ids:
+        return []
+    q = text("""
+        SELECT p.ma_may_bom, l.thoi_gian_bat,
+               d.ma_du_lieu, d.mua, d.do_am_dat, d.nhiet_do, d.do_am, d.thoi_gian_tao
+        FROM unnest(CAST(:ids AS integer[])) AS p(ma_may_bom)
+        LEFT JOIN LATERAL (
+            SELECT thoi_gian_bat FROM nhat_ky_may_bom
+            WHERE nhat_ky_may_bom.ma_may_bom = p.ma_may_bom
+            ORDER BY thoi_gian_bat DESC NULLS LAST
+            LIMIT 1
+        ) l ON true
+        LEFT JOIN LATERAL (
+            SELECT * FROM du_lieu_cam_bien
+            WHERE du_lieu_cam_bien.ma_may_bom = p.ma_may_bom
+              AND du_lieu_cam_bien.thoi_gian_tao <= COALESCE(l.thoi_gian_bat, :now)
+            ORDER BY thoi_gian_tao DESC, ma_du_lieu DESC
+            LIMIT 1
+        ) d ON true
+    """)
+    res = await db.execute(q, {"ids": list(ma_may_bom_ids), "now": now})
+    return res.all()
+
+
+async def get_latest_forecast_keys(db: AsyncSession, ma_may_bom_ids: List[int], ma_mo_hinh: int) -> Dict[int, Tuple[Optional[int], Optional[str]]]:
+    """(ma_du_lieu_tham_chieu, phien_ban_mo_hinh) của dự báo mới nhất của mô hình cho từng máy bơm
+    trong một truy vấn; máy bơm chưa có dự báo không có trong kết quả."""
+    if not ma_may_bom_ids:
+        return {}
+    q = text("""
+        SELECT p.ma_may_bom, f.ma_du_lieu_tham_chieu, f.phien_ban_mo_hinh
+        FROM unnest(CAST(:ids AS integer[])) AS p(ma_may_bom)
+        CROSS JOIN LATERAL (
+            SELECT ma_du_lieu_tham_chieu, phien_ban_mo_hinh FROM du_lieu_du_bao
+            WHERE du_lieu_du_bao.ma_may_bom = p.ma_may_bom AND du_lieu_du_bao.ma_mo_hinh = :ma_mo_hinh
+            ORDER BY thoi_gian_tao DESC
+            LIMIT 1
+        ) f
+    """)
+    res = await db.execute(q, {"ids": list(ma_may_bom_ids), "ma_mo_hinh": ma_mo_hinh})
+    return {r.ma_may_bom: (r.ma_du_lieu_tham_chieu, r.phien_ban_mo_hinh) for r in res.all()}
+
+
+async def get_latest_du_bao_by_mo_hinh(db: AsyncSession, ma_may_bom: int, mo_hinh: str, since: datetime) -> Optional[DuLieuDuBao]:
+    """Dự báo mới nhất của máy bơm theo tên mô hình (không gắn `ma_mo_hinh`) có thoi_diem_du_bao >= since."""
+    q = (
+        select(DuLieuDuBao)
+        .where(
+            DuLieuDuBao.ma_may_bom == ma_may_bom,
+            DuLieuDuBao.ma_mo_hinh.is_(None),
+            DuLieuDuBao.mo_hinh == mo_hinh,
+            DuLieuDuBao.thoi_diem_du_bao >= since,
+        )
+        .order_by(DuLieuDuBao.thoi_diem_du_bao.desc())
+        .limit(1)
+    )
+    return (await db.execute(q)).scalars().first()
+
+
+async def create_du_lieu_du_bao_bulk(db: AsyncSession, rows: List[dict]) -> List[DuLieuDuBao]:
+    """Chèn nhiều dòng dự báo trong một câu INSERT ... RETURNING."""
+    if not rows:
+        return []
+    res = await db.scalars(insert(DuLieuDuBao).returning(DuLieuDuBao), rows)
+    created = res.all()
+    await db.commit()
+    return created
+
+
 async def create_du_lieu_du_bao(db: AsyncSession, obj_in: DuLieuDuBao) -> DuLieuDuBao:
     db.add(obj_in)
     await db.commit()
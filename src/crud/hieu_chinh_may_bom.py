@@ -0,0 +1,41 @@
+from typing import Dict, List, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from src.models.hieu_chinh_may_bom import HieuChinhMayBom
+
+
+async def add_correction_stats(db: AsyncSession, rows: List[dict]) -> None:
+    """Cập nhật các tổng quên dần của một lô (upsert, chưa commit).
+
+    Mỗi dòng gồm `he_so_giam` = λ^k và các tổng của lô đã nhân trọng số λ^(k-1-i), nên
+    tổng mới = tổng cũ * λ^k + tổng của lô.
+    """
+    if not rows:
+        return
+    q = text("""
+        INSERT INTO hieu_chinh_may_bom AS t (
+            ma_mo_hinh, ma_may_bom, so_mau, tong_trong_so, tong_p, tong_a, tong_pp, tong_pa, thoi_gian_cap_nhat
+        ) VALUES (
+            :ma_mo_hinh, :ma_may_bom, :so_mau, :tong_trong_so, :tong_p, :tong_a, :tong_pp, :tong_pa, now()
+        )
+        ON CONFLICT (ma_mo_hinh, ma_may_bom) DO UPDATE SET
+            so_mau = t.so_mau + EXCLUDED.so_mau,
+            tong_trong_so = t.tong_trong_so * CAST(:he_so_giam AS double precision) + EXCLUDED.tong_trong_so,
+            tong_p = t.tong_p * CAST(:he_so_giam AS double precision) + EXCLUDED.tong_p,
+            tong_a = t.tong_a * CAST(:he_so_giam AS double precision) + EXCLUDED.tong_a,
+            tong_pp = t.tong_pp * CAST(:he_so_giam AS double precision) + EXCLUDED.tong_pp,
+            tong_pa = t.tong_pa * CAST(:he_so_giam AS double precision) + EXCLUDED.tong_pa,
+            thoi_gian_cap_nhat = now()
+    """)
+    await db.execute(q, rows)
+
+
+async def get_correction_stats(db: AsyncSession, ma_mo_hinh: int, ma_may_bom_ids: Sequence[int]) -> Dict[int, HieuChinhMayBom]:
+    if not ma_may_bom_ids:
+        return {}
+    q = select(HieuChinhMayBom).where(
+        HieuChinhMayBom.ma_mo_hinh == ma_mo_hinh,
+        HieuChinhMayBom.ma_may_bom.in_(list(ma_may_bom_ids)),
+    )
+    res = await db.execute(q)
+    return {r.ma_may_bom: r for r in res.scalars().all()}
@@ -0,0 +1,58 @@
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select
+from src.models.cau_hinh_thiet_bi import CauHinhThietBi
+from src.models.lich_tuoi import LichTuoi
+from src.models.may_bom import MayBom
+
+
+def irrigation_configs_query():
+    """Câu truy vấn của `list_irrigation_configs`: cấu hình mới nhất của mỗi máy bơm (DISTINCT ON),
+    rồi mới lọc máy bơm đang hoạt động có ngưỡng độ ẩm tối thiểu."""
+    c = CauHinhThietBi
+    latest = (
+        select(c.ma_thiet_bi, c.do_am_toi_thieu, c.do_am_toi_da, c.gio_bat_dau, c.gio_ket_thuc)
+        .distinct(c.ma_thiet_bi)
+        .order_by(c.ma_thiet_bi, c.thoi_gian_tao.desc().nulls_last(), c.ma_cau_hinh.desc())
+        .subquery()
+    )
+    return (
+        select(
+            MayBom.ma_may_bom,
+            MayBom.gioi_han_thoi_gian,
+            latest.c.do_am_toi_thieu,
+            latest.c.do_am_toi_da,
+            latest.c.gio_bat_dau,
+            latest.c.gio_ket_thuc,
+        )
+        .join(latest, latest.c.ma_thiet_bi == MayBom.ma_may_bom)
+        .where(MayBom.trang_thai.is_(True), latest.c.do_am_toi_thieu > 0)
+        .order_by(MayBom.ma_may_bom)
+    )
+
+
+async def list_irrigation_configs(db: AsyncSession) -> list:
+    """Máy bơm đang hoạt động có ngưỡng độ ẩm tối thiểu, kèm cửa sổ giờ và ngưỡng độ ẩm trong cấu hình
+    mới nhất của máy bơm (một dòng mỗi máy bơm dù có nhiều dòng cấu hình)."""
+    res = await db.execute(irrigation_configs_query())
+    return res.all()
+
+
+async def create_lich_tuoi_bulk(db: AsyncSession, rows: List[dict]) -> int:
+    """Chèn các lịch tưới trong một câu INSERT."""
+    if not rows:
+        return 0
+    await db.execute(insert(LichTuoi), rows)
+    await db.commit()
+    return len(rows)
+
+
+async def get_latest_lich_tuoi(db: AsyncSession, ma_may_bom: int) -> Optional[LichTuoi]:
+    q = (
+        select(LichTuoi)
+        .where(LichTuoi.ma_may_bom == ma_may_bom)
+        .order_by(LichTuoi.thoi_gian_tao.desc(), LichTuoi.ma_lich_tuoi.desc())
+        .limit(1)
+    )
+    res = await db.execute(q)
+    return res.scalars().first()
@@ -2,7 +2,7 @@ import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, delete
 from src.schemas.pump import PumpCreate, PumpUpdate
-from typing import Optional
+from typing import List, Optional
 from src.models.may_bom import MayBom
 from src.models.nguoi_dung import NguoiDung
 from src.models.cam_bien import CamBien
@@ -57,6 +57,15 @@ async def get_may_bom_by_id(db: AsyncSession, ma_may_bom: int):
     return res.scalars().first()
 
 
+async def list_may_bom_by_ids(db: AsyncSession, ma_may_bom_ids: List[int]) -> List[MayBom]:
+    """Lấy nhiều máy bơm trong một truy vấn (dùng để kiểm tra quyền sở hữu theo lô)."""
+    if not ma_may_bom_ids:
+        return []
+    q = select(MayBom).where(MayBom.ma_may_bom.in_(ma_may_bom_ids))
+    res = await db.execute(q)
+    return res.scalars().all()
+
+
 async def get_may_bom_with_sensors(db: AsyncSession, ma_may_bom: int):
     """Return pump object and its sensors (as mapping list) and sensor count."""
     pump = await get_may_bom_by_id(db, ma_may_bom)
@@ -174,3 +183,10 @@ async def count_may_bom_for_user(db: AsyncSession, ma_nguoi_dung: uuid.UUID) ->
     q = select(func.count()).select_from(MayBom).where(MayBom.ma_nguoi_dung == ma_nguoi_dung)
     res = await db.execute(q)
     return int(res.scalar_one())
+
+
+async def list_active_may_bom(db: AsyncSession) -> List[MayBom]:
+    """Máy bơm đang hoạt động, theo mã máy bơm."""
+    q = select(MayBom).where(MayBom.trang_thai.is_(True)).order_by(MayBom.ma_may_bom)
+    res = await db.execute(q)
+    return res.scalars().all()
@@ -66,6 +66,20 @@ async def list_nhat_ky_for_pump(db: AsyncSession, ngay: Optional[date],  ma_may_
     total = int(count_res.scalar_one())
     return items, total
 
+async def list_runs_between(db: AsyncSession, since: datetime, until: datetime, ma_may_bom: Optional[int] = None) -> list:
+    """(ma_may_bom, thoi_gian_bat, thoi_gian_tat) của các lần bơm giao với [since, until); lần đang bơm có thoi_gian_tat None."""
+    n = NhatKyMayBom
+    q = select(n.ma_may_bom, n.thoi_gian_bat, n.thoi_gian_tat).where(
+        n.ma_may_bom.isnot(None),
+        n.thoi_gian_bat < until,
+        (n.thoi_gian_tat.is_(None)) | (n.thoi_gian_tat > since),
+    )
+    if ma_may_bom is not None:
+        q = q.where(n.ma_may_bom == ma_may_bom)
+    res = await db.execute(q)
+    return res.all()
+
+
 async def get_nhat_ky_by_id(db: AsyncSession, ma_nhat_ky: int):
     q = select(NhatKyMayBom).where(NhatKyMayBom.ma_nhat_ky == ma_nhat_ky)
     res = await db.execute(q)
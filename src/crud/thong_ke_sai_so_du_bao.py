@@ -0,0 +1,115 @@
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
+from src.models.thong_ke_sai_so_du_bao import ThongKeSaiSoDuBao
+
+
+async def match_forecasts_to_actuals(db: AsyncSession, cutoff: datetime, window_minutes: int, limit: int) -> list:
+    """Đối chiếu một lô dự báo chưa đối chiếu có `thoi_diem_du_bao <= cutoff` với lưu lượng thực tế.
+
+    Lưu lượng thực tế là trung bình `luu_luong_nuoc` của máy bơm trên [thoi_diem_du_bao,
+    thoi_diem_du_bao + window); không có bản ghi nào thì để NULL nhưng vẫn đánh dấu đã đối chiếu để
+    không quét lại. Các dòng đang bị job khác khoá được bỏ qua. Trả về các dòng vừa cập nhật; chưa commit.
+    """
+    q = text("""
+        WITH lo AS (
+            SELECT ma_du_bao, ma_may_bom, CAST(thoi_diem_du_bao AS timestamp) AS t0
+            FROM du_lieu_du_bao
+            WHERE thoi_gian_doi_chieu IS NULL AND thoi_diem_du_bao <= :cutoff
+            ORDER BY thoi_diem_du_bao
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        ), thuc_te AS (
+            SELECT lo.ma_du_bao, a.luu_luong
+            FROM lo
+            LEFT JOIN LATERAL (
+                SELECT avg(d.luu_luong_nuoc) AS luu_luong
+                FROM du_lieu_cam_bien d
+                WHERE d.ma_may_bom = lo.ma_may_bom
+                  AND d.thoi_gian_tao >= lo.t0
+                  AND d.thoi_gian_tao < lo.t0 + make_interval(mins => :window)
+            ) a ON true
+        )
+        UPDATE du_lieu_du_bao AS f
+        SET luu_luong_thuc_te = thuc_te.luu_luong, thoi_gian_doi_chieu = now()
+        FROM thuc_te
+        WHERE f.ma_du_bao = thuc_te.ma_du_bao
+        RETURNING f.ma_mo_hinh, f.ma_may_bom, f.thoi_diem_du_bao, f.luu_luong_du_bao, f.luu_luong_thuc_te,
+                  COALESCE(f.luu_luong_goc, f.luu_luong_du_bao) AS luu_luong_goc
+    """)
+    res = await db.execute(q, {"cutoff": cutoff, "window": window_minutes, "limit": limit})
+    return res.all()
+
+
+async def add_error_stats(db: AsyncSession, rows: List[dict]) -> None:
+    """Cộng dồn thống kê sai số của một lô vào thong_ke_sai_so_du_bao (upsert, chưa commit).
+
+    Mỗi dòng gồm các tổng của lô và phần EWMA của lô: `ewma_moi` (EWMA của riêng lô, dùng khi
+    chưa có thống kê), `he_so_giam` = (1 - alpha)^k và `dong_gop` = Σ alpha (1 - alpha)^(k-1-i) x_i,
+    để EWMA cũ được cập nhật trong cùng câu lệnh dưới khoá dòng.
+    """
+    if not rows:
+        return
+    q = text("""
+        INSERT INTO thong_ke_sai_so_du_bao AS t (
+            ma_mo_hinh, ma_may_bom, so_mau, tong_sai_so_tuyet_doi, tong_binh_phuong_sai_so,
+            so_mau_phan_tram, tong_sai_so_phan_tram, ewma_sai_so_phan_tram, thoi_gian_cap_nhat
+        ) VALUES (
+            :ma_mo_hinh, :ma_may_bom, :so_mau, :tong_sai_so_tuyet_doi, :tong_binh_phuong_sai_so,
+            :so_mau_phan_tram, :tong_sai_so_phan_tram, :ewma_moi, now()
+        )
+        ON CONFLICT (ma_mo_hinh, ma_may_bom) DO UPDATE SET
+            so_mau = t.so_mau + EXCLUDED.so_mau,
+            tong_sai_so_tuyet_doi = t.tong_sai_so_tuyet_doi + EXCLUDED.tong_sai_so_tuyet_doi,
+            tong_binh_phuong_sai_so = t.tong_binh_phuong_sai_so + EXCLUDED.tong_binh_phuong_sai_so,
+            so_mau_phan_tram = t.so_mau_phan_tram + EXCLUDED.so_mau_phan_tram,
+            tong_sai_so_phan_tram = t.tong_sai_so_phan_tram + EXCLUDED.tong_sai_so_phan_tram,
+            ewma_sai_so_phan_tram = CASE
+                WHEN t.ewma_sai_so_phan_tram IS NULL THEN EXCLUDED.ewma_sai_so_phan_tram
+                ELSE t.ewma_sai_so_phan_tram * CAST(:he_so_giam AS double precision) + CAST(:dong_gop AS double precision)
+            END,
+            thoi_gian_cap_nhat = now()
+    """)
+    await db.execute(q, rows)
+
+
+async def list_error_stats(db: AsyncSession, ma_mo_hinh: Optional[int] = None, ma_may_bom: Optional[int] = None) -> List[ThongKeSaiSoDuBao]:
+    q = select(ThongKeSaiSoDuBao)
+    if ma_mo_hinh is not None:
+        q = q.where(ThongKeSaiSoDuBao.ma_mo_hinh == ma_mo_hinh)
+    if ma_may_bom is not None:
+        q = q.where(ThongKeSaiSoDuBao.ma_may_bom == ma_may_bom)
+    q = q.order_by(ThongKeSaiSoDuBao.ma_mo_hinh, ThongKeSaiSoDuBao.ma_may_bom)
+    res = await db.execute(q)
+    return res.scalars().all()
+
+
+async def summarize_model_errors(
+    db: AsyncSession,
+    min_samples: int,
+    threshold: float,
+    ma_may_bom: Optional[int] = None,
+) -> list:
+    """Tổng hợp theo mô hình trên các máy bơm có đủ `min_samples` mẫu sai số phần trăm.
+
+    Mỗi dòng: ma_mo_hinh, so_may_bom, so_may_bom_vuot (EWMA APE > threshold), ewma_trung_binh
+    (trung bình EWMA có trọng số theo số mẫu) và mape (sai số phần trăm trung bình cộng dồn).
+    """
+    t = ThongKeSaiSoDuBao
+    q = (
+        select(
+            t.ma_mo_hinh,
+            func.count().label("so_may_bom"),
+            func.count().filter(t.ewma_sai_so_phan_tram > threshold).label("so_may_bom_vuot"),
+            (func.sum(t.ewma_sai_so_phan_tram * t.so_mau_phan_tram) / func.sum(t.so_mau_phan_tram)).label("ewma_trung_binh"),
+            (func.sum(t.tong_sai_so_phan_tram) / func.sum(t.so_mau_phan_tram)).label("mape"),
+        )
+        .where(t.so_mau_phan_tram >= min_samples, t.ewma_sai_so_phan_tram.isnot(None))
+        .group_by(t.ma_mo_hinh)
+        .order_by(t.ma_mo_hinh)
+    )
+    if ma_may_bom is not None:
+        q = q.where(t.ma_may_bom == ma_may_bom)
+    res = await db.execute(q)
+    return res.all()
@@ -0,0 +1,64 @@
+from typing import List
+from datetime import date, datetime, timedelta
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.core.intervals import SUMMARY_COLUMNS, summarize_runs
+from src.crud.nhat_ky_may_bom import list_runs_between
+from src.models.thong_ke_van_hanh_ngay import ThongKeVanHanhNgay
+
+
+async def list_daily_run_stats(db: AsyncSession, ma_may_bom: int, tu: date, den: date) -> List[ThongKeVanHanhNgay]:
+    t = ThongKeVanHanhNgay
+    q = select(t).where(t.ma_may_bom == ma_may_bom, t.ngay >= tu, t.ngay <= den).order_by(t.ngay)
+    res = await db.execute(q)
+    return res.scalars().all()
+
+
+async def upsert_daily_run_stats(db: AsyncSession, rows: List[dict]) -> None:
+    if not rows:
+        return
+    stmt = pg_insert(ThongKeVanHanhNgay)
+    values = {c: stmt.excluded[c] for c in SUMMARY_COLUMNS if c not in ("ma_may_bom", "ngay")}
+    await db.execute(
+        stmt.on_conflict_do_update(index_elements=["ma_may_bom", "ngay"], set_={**values, "thoi_gian_cap_nhat": func.now()}),
+        rows,
+    )
+
+
+async def invalidate_daily_run_stats(db: AsyncSession, ma_may_bom: int, tu: date, den: date) -> None:
+    """Xoá thống kê đã cache của các ngày [tu, den] (khi nhật ký trong các ngày đó thay đổi)."""
+    t = ThongKeVanHanhNgay
+    await db.execute(delete(t).where(t.ma_may_bom == ma_may_bom, t.ngay >= tu, t.ngay <= den))
+
+
+async def get_daily_run_stats(db: AsyncSession, ma_may_bom: int, tu: date, den: date, now: datetime) -> pd.DataFrame:
+    """Thống kê theo ngày cho [tu, den]: ngày đã qua lấy từ cache, ngày thiếu được tính lại từ
+    nhat_ky_may_bom trong một truy vấn và ghi vào cache (trừ hôm nay, còn thay đổi)."""
+    cached = await list_daily_run_stats(db, ma_may_bom, tu, den)
+    today = now.date()
+    have = {r.ngay for r in cached if r.ngay < today}
+    days = [tu + timedelta(days=i) for i in range((den - tu).days + 1)]
+    missing = [d for d in days if d not in have]
+
+    frames = [pd.DataFrame([{c: getattr(r, c) for c in SUMMARY_COLUMNS} for r in cached if r.ngay in have], columns=list(SUMMARY_COLUMNS))]
+    if missing:
+        lo, hi = min(missing), max(missing)
+        since = datetime.combine(lo, datetime.min.time())
+        until = datetime.combine(hi + timedelta(days=1), datetime.min.time())
+        runs = pd.DataFrame.from_records(
+            await list_runs_between(db, since, until, ma_may_bom),
+            columns=["ma_may_bom", "thoi_gian_bat", "thoi_gian_tat"],
+        )
+        computed = summarize_runs(runs, [ma_may_bom], lo, hi, now)
+        computed = computed[computed["ngay"].isin(missing)]
+        frames.append(computed)
+        to_cache = computed[computed["ngay"] < today]
+        if not to_cache.empty:
+            await upsert_daily_run_stats(db, to_cache.to_dict("records"))
+            await db.commit()
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(SUMMARY_COLUMNS))
+    return pd.concat(frames, ignore_index=True).sort_values("ngay", kind="stable").reset_index(drop=True)
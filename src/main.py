@@ -5,6 +5,8 @@ from .core.config import settings
 from .api.v1.api import api_v1_router
 from .core.logging_config import setup_logging
 from .core.scheduler import start_scheduler
+from .predict.registry import registry
+from .core.executor import get_executor, shutdown_executor
 import logging
 
 
@@ -42,6 +44,19 @@ async def startup_event():
     except Exception as e:
         logging.getLogger("uvicorn.error").error(f"Lỗi khi khởi động scheduler: {str(e)}")
 
+    # Nạp sẵn mô hình dự báo để request đầu tiên không phải chờ joblib.load
+    if settings.MODEL_PRELOAD:
+        try:
+            registry.preload([settings.DEFAULT_MA_MO_HINH])
+        except Exception as e:
+            logging.getLogger("uvicorn.error").error(f"Lỗi khi nạp mô hình dự báo: {str(e)}")
+
+    # Tạo sẵn executor suy luận (với "process", các worker nạp mô hình trong initializer)
+    try:
+        get_executor()
+    except Exception as e:
+        logging.getLogger("uvicorn.error").error(f"Lỗi khi khởi tạo executor suy luận: {str(e)}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -50,6 +65,7 @@ async def shutdown_event():
     if scheduler:
         scheduler.shutdown()
         logging.getLogger("uvicorn.error").info("Scheduler đã dừng")
+    shutdown_executor()
 
 
 @app.exception_handler(Exception)
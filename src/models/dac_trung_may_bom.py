@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Float, Integer
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class DacTrungMayBom(Base):
+    """Đặc trưng trượt của máy bơm tại thời điểm một bản ghi cảm biến (feature store)."""
+
+    __tablename__ = "dac_trung_may_bom"
+
+    ma_du_lieu = Column(Integer, ForeignKey("du_lieu_cam_bien.ma_du_lieu", ondelete="CASCADE"), primary_key=True)
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), nullable=False)
+    thoi_gian = Column(DateTime, nullable=False)
+    do_am_dat_tb_1h = Column(Float)
+    do_am_dat_tb_6h = Column(Float)
+    do_am_dat_tb_24h = Column(Float)
+    do_am_tb_1h = Column(Float)
+    do_am_tb_6h = Column(Float)
+    do_am_tb_24h = Column(Float)
+    mua_tong_6h = Column(Float)
+    mua_tong_24h = Column(Float)
+    thoi_luong_tuoi_gan_nhat = Column(Float)
+    thoi_gian_tu_lan_tuoi = Column(Float)
+    thoi_gian_tao = Column(DateTime, server_default=func.now())
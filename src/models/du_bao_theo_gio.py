@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class DuBaoTheoGio(Base):
+    """Dự báo nhiều bước (mặc định 24 giờ tới): cả chuỗi lưu trong một dòng dạng mảng.
+
+    Phần tử thứ i của mỗi mảng ứng với khoảng bắt đầu lúc `thoi_diem_bat_dau + i * buoc_phut`.
+    """
+
+    __tablename__ = "du_bao_theo_gio"
+
+    ma_du_bao_theo_gio = Column(BigInteger, primary_key=True, autoincrement=True)
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), nullable=False)
+    ma_nguoi_dung = Column(PG_UUID(as_uuid=True), ForeignKey("nguoi_dung.ma_nguoi_dung"), nullable=False)
+    ma_mo_hinh = Column(Integer, ForeignKey("mo_hinh_du_bao.ma_mo_hinh"))
+    mo_hinh = Column(String)
+    thoi_diem_bat_dau = Column(DateTime(timezone=True), nullable=False)
+    buoc_phut = Column(Integer, nullable=False, default=60)
+    luu_luong = Column(ARRAY(Float), nullable=False)
+    do_tin_cay = Column(ARRAY(Float), nullable=False)
+    luu_luong_p10 = Column(ARRAY(Float))
+    luu_luong_p50 = Column(ARRAY(Float))
+    luu_luong_p90 = Column(ARRAY(Float))
+    thoi_gian_tao = Column(DateTime, server_default=func.now())
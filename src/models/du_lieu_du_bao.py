@@ -11,9 +11,22 @@ class DuLieuDuBao(Base):
 
     ma_du_bao = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     mo_hinh = Column(String)
+    # Ghi bằng datetime.now() (giờ địa phương, không tz) như thoi_gian_tao của du_lieu_cam_bien
     thoi_diem_du_bao = Column(DateTime(timezone=True))
     luu_luong_du_bao = Column(Float, default=0)
     do_tin_cay = Column(Float, default=0)
+    # Khoảng dự báo từ phân phối dự báo của các cây
+    luu_luong_p10 = Column(Float)
+    luu_luong_p50 = Column(Float)
+    luu_luong_p90 = Column(Float)
+    # Dự báo gốc của mô hình khi luu_luong_du_bao đã được hiệu chỉnh theo máy bơm
+    luu_luong_goc = Column(Float)
+    # Đầu vào của dự báo: bản ghi cảm biến tham chiếu và phiên bản artifact mô hình
+    ma_du_lieu_tham_chieu = Column(Integer)
+    phien_ban_mo_hinh = Column(String)
     thoi_gian_tao = Column(DateTime, server_default=func.now())
     ma_nguoi_dung = Column(PG_UUID(as_uuid=True), ForeignKey("nguoi_dung.ma_nguoi_dung"), nullable=False)
     ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), nullable=False)
+    ma_mo_hinh = Column(Integer, ForeignKey("mo_hinh_du_bao.ma_mo_hinh"))
+    luu_luong_thuc_te = Column(Float)
+    thoi_gian_doi_chieu = Column(DateTime)
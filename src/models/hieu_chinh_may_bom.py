@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Float, Integer
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class HieuChinhMayBom(Base):
+    """Tổng có trọng số quên dần của (dự báo gốc p, lưu lượng thực tế a) theo mô hình và máy bơm.
+
+    Đủ để ước lượng hiệu chỉnh tuyến tính a ≈ he_so_chan + he_so_goc * p của từng máy bơm.
+    """
+
+    __tablename__ = "hieu_chinh_may_bom"
+
+    ma_mo_hinh = Column(Integer, ForeignKey("mo_hinh_du_bao.ma_mo_hinh"), primary_key=True)
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), primary_key=True)
+    so_mau = Column(Integer, nullable=False, default=0)
+    tong_trong_so = Column(Float, nullable=False, default=0)
+    tong_p = Column(Float, nullable=False, default=0)
+    tong_a = Column(Float, nullable=False, default=0)
+    tong_pp = Column(Float, nullable=False, default=0)
+    tong_pa = Column(Float, nullable=False, default=0)
+    thoi_gian_cap_nhat = Column(DateTime, server_default=func.now(), onupdate=func.now())
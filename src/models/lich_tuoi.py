@@ -0,0 +1,27 @@
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Float, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class LichTuoi(Base):
+    """Lịch bơm theo giờ cho `so_gio` giờ tới, lập từ dự báo và cấu hình thiết bị.
+
+    Phần tử thứ i của mỗi mảng ứng với giờ bắt đầu lúc `thoi_diem_bat_dau + i * buoc_phut`:
+    `phut_bom` là số phút bơm tính từ đầu giờ, `do_am_du_kien` là độ ẩm đất dự kiến cuối giờ.
+    """
+
+    __tablename__ = "lich_tuoi"
+
+    ma_lich_tuoi = Column(BigInteger, primary_key=True, autoincrement=True)
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), nullable=False)
+    thoi_diem_bat_dau = Column(DateTime, nullable=False)
+    buoc_phut = Column(Integer, nullable=False, default=60)
+    phut_bom = Column(ARRAY(Float), nullable=False)
+    do_am_du_kien = Column(ARRAY(Float), nullable=False)
+    # Tổng lưu lượng dự báo × thời gian bơm; None nếu máy bơm chưa có dự báo theo giờ
+    luong_nuoc_du_kien = Column(Float)
+    # False khi cửa sổ giờ cho phép không đủ để giữ độ ẩm trên `do_am_toi_thieu`
+    dat_nguong = Column(Boolean, nullable=False, default=True)
+    thoi_gian_tao = Column(DateTime, server_default=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Float, Integer
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class ThongKeSaiSoDuBao(Base):
+    """Sai số dự báo cộng dồn theo mô hình và máy bơm (cập nhật bởi job đối chiếu lưu lượng thực tế)."""
+
+    __tablename__ = "thong_ke_sai_so_du_bao"
+
+    ma_mo_hinh = Column(Integer, ForeignKey("mo_hinh_du_bao.ma_mo_hinh"), primary_key=True)
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), primary_key=True)
+    so_mau = Column(Integer, nullable=False, default=0)
+    tong_sai_so_tuyet_doi = Column(Float, nullable=False, default=0)
+    tong_binh_phuong_sai_so = Column(Float, nullable=False, default=0)
+    so_mau_phan_tram = Column(Integer, nullable=False, default=0)
+    tong_sai_so_phan_tram = Column(Float, nullable=False, default=0)
+    # Trung bình trượt hàm mũ của sai số phần trăm tuyệt đối: phản ánh chất lượng gần đây
+    ewma_sai_so_phan_tram = Column(Float)
+    thoi_gian_cap_nhat = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Date, DateTime, Float, Integer
+from sqlalchemy.sql import func
+from sqlalchemy import ForeignKey
+from .base import Base
+
+
+class ThongKeVanHanhNgay(Base):
+    """Thống kê vận hành theo ngày của máy bơm, tính từ nhat_ky_may_bom (cache cho các ngày đã qua)."""
+
+    __tablename__ = "thong_ke_van_hanh_ngay"
+
+    ma_may_bom = Column(Integer, ForeignKey("may_bom.ma_may_bom"), primary_key=True)
+    ngay = Column(Date, primary_key=True)
+    so_lan_bom = Column(Integer, nullable=False, default=0)
+    # Hợp các lần bơm trong ngày (phút); ty_le_hoat_dong = tong_phut_bom / 1440
+    tong_phut_bom = Column(Float, nullable=False, default=0)
+    ty_le_hoat_dong = Column(Float, nullable=False, default=0)
+    lan_bom_dai_nhat_phut = Column(Float, nullable=False, default=0)
+    so_cap_chong_lan = Column(Integer, nullable=False, default=0)
+    phut_chong_lan = Column(Float, nullable=False, default=0)
+    thoi_gian_cap_nhat = Column(DateTime, server_default=func.now(), onupdate=func.now())
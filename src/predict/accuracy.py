@@ -0,0 +1,95 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.crud.hieu_chinh_may_bom import add_correction_stats
+from src.crud.thong_ke_sai_so_du_bao import add_error_stats, match_forecasts_to_actuals
+from src.predict.correction import summarize_corrections
+
+logger = logging.getLogger(__name__)
+
+KEYS = ["ma_mo_hinh", "ma_may_bom"]
+MATCH_COLUMNS = [*KEYS, "thoi_diem_du_bao", "luu_luong_du_bao", "luu_luong_thuc_te", "luu_luong_goc"]
+
+
+def summarize_errors(rows, alpha: float) -> List[dict]:
+    """Gom sai số của một lô dự báo đã đối chiếu thành các dòng cho `add_error_stats`.
+
+    `rows` có các cột MATCH_COLUMNS (như kết quả `match_forecasts_to_actuals`).
+    Bỏ qua dòng không có mô hình hoặc không có lưu lượng thực tế; sai số phần trăm chỉ tính khi
+    lưu lượng thực tế > 0. EWMA của lô được tính theo thứ tự thời điểm dự báo trong từng nhóm.
+    """
+    df = pd.DataFrame.from_records(rows, columns=MATCH_COLUMNS)
+    df = df.dropna(subset=["ma_mo_hinh", "luu_luong_thuc_te"])
+    if df.empty:
+        return []
+    df = df.astype({"ma_mo_hinh": "int64", "luu_luong_du_bao": "float64", "luu_luong_thuc_te": "float64"})
+    df = df.sort_values([*KEYS, "thoi_diem_du_bao"], kind="stable")
+
+    err = df["luu_luong_du_bao"].fillna(0.0) - df["luu_luong_thuc_te"]
+    df["abs_err"] = err.abs()
+    df["sq_err"] = err * err
+    out = df.groupby(KEYS).agg(
+        so_mau=("abs_err", "size"),
+        tong_sai_so_tuyet_doi=("abs_err", "sum"),
+        tong_binh_phuong_sai_so=("sq_err", "sum"),
+    )
+
+    pct = df[df["luu_luong_thuc_te"] > 0]
+    ape = pct["abs_err"] / pct["luu_luong_thuc_te"] * 100.0
+    g = ape.groupby([pct["ma_mo_hinh"], pct["ma_may_bom"]])
+    k = g.transform("size")
+    # EWMA(k mẫu) = (1 - a)^k * EWMA_cũ + Σ a (1 - a)^(k-1-i) x_i
+    weights = alpha * np.power(1.0 - alpha, k - 1 - g.cumcount())
+    ewma = pd.DataFrame({
+        "so_mau_phan_tram": g.size(),
+        "tong_sai_so_phan_tram": g.sum(),
+        "dong_gop": (weights * ape).groupby([pct["ma_mo_hinh"], pct["ma_may_bom"]]).sum(),
+        "dau_tien": g.first(),
+    })
+    ewma.index.names = KEYS
+    ewma["he_so_giam"] = np.power(1.0 - alpha, ewma["so_mau_phan_tram"])
+    # Chưa có thống kê: coi EWMA cũ bằng mẫu đầu tiên
+    ewma["ewma_moi"] = ewma["he_so_giam"] * ewma["dau_tien"] + ewma["dong_gop"]
+
+    out = out.join(ewma.drop(columns="dau_tien"), how="left")
+    out = out.fillna({"so_mau_phan_tram": 0, "tong_sai_so_phan_tram": 0.0, "dong_gop": 0.0, "he_so_giam": 1.0})
+    out = out.astype({"so_mau": "int64", "so_mau_phan_tram": "int64"}).reset_index()
+    records = out.to_dict("records")
+    for r in records:
+        if pd.isna(r["ewma_moi"]):
+            r["ewma_moi"] = None
+        for key in ("ma_mo_hinh", "ma_may_bom", "so_mau", "so_mau_phan_tram"):
+            r[key] = int(r[key])
+    return records
+
+
+async def track_forecast_accuracy(
+    db: AsyncSession,
+    window_minutes: int = 60,
+    chunk_size: int = 2000,
+    alpha: float = 0.1,
+    forgetting: float = 0.99,
+) -> int:
+    """Đối chiếu mọi dự báo đã hết cửa sổ với lưu lượng thực tế, cộng dồn thống kê sai số và cập nhật
+    các tổng cho hiệu chỉnh theo máy bơm (trên dự báo gốc của mô hình).
+
+    Mỗi lô đánh dấu dự báo và cập nhật thống kê trong cùng một transaction, nên mỗi dự báo được
+    tính đúng một lần. Trả về số dự báo đã đối chiếu.
+    """
+    # Cùng quy ước với nơi ghi dự báo (predict_flow, forecast_pumps): giờ địa phương, không tz
+    cutoff = datetime.now() - timedelta(minutes=window_minutes)
+    total = 0
+    while True:
+        rows = await match_forecasts_to_actuals(db, cutoff, window_minutes, chunk_size)
+        if not rows:
+            break
+        await add_error_stats(db, summarize_errors(rows, alpha))
+        await add_correction_stats(db, summarize_corrections(rows, forgetting))
+        await db.commit()
+        total += len(rows)
+        if len(rows) < chunk_size:
+            break
+    return total
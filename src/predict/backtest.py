@@ -0,0 +1,273 @@
+"""Backtest mô hình dự báo trên dữ liệu lịch sử.
+
+Mỗi lần bơm trong nhat_ky_may_bom là một mẫu: đặc trưng lấy từ bản ghi cảm biến gần nhất không
+sau `thoi_gian_bat` (như predict_flow), giá trị thực tế là trung bình `luu_luong_nuoc` của các bản
+ghi trong [thoi_gian_bat, thoi_gian_tat]. Dữ liệu được đọc theo lô gồm trọn các máy bơm; mọi bước
+ghép, tính đặc trưng và sai số đều chạy vector hoá bằng pandas/NumPy.
+
+Với --baseline, mô hình cơ sở Holt-Winters (dự báo một bước theo giờ bật máy; mức và mùa vụ khởi tạo
+từ tối đa 7 ngày đầu của dữ liệu đọc) được chấm điểm trên cùng các mẫu dưới tên "HoltWinters".
+
+Chạy: python -m src.predict.backtest --from 2024-01-01 --to 2025-01-01 --model 11 --model path/moi.joblib --baseline
+"""
+import argparse
+import asyncio
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+from src.models.nhat_ky_may_bom import NhatKyMayBom
+from src.predict.baseline import MO_HINH_HW, one_step_predictions
+from src.predict.ensemble import FEATURES, forest_predict
+
+READING_COLUMNS = ("ma_may_bom", "thoi_gian_tao", *FEATURES, "luu_luong_nuoc")
+METRIC_COLUMNS = ("n", "mae", "rmse", "mape")
+
+
+@dataclass
+class ErrorStats:
+    """Tổng sai số cộng dồn theo máy bơm; MAE/RMSE/MAPE được tính khi lấy kết quả."""
+
+    n: Dict[int, int] = field(default_factory=dict)
+    abs_sum: Dict[int, float] = field(default_factory=dict)
+    sq_sum: Dict[int, float] = field(default_factory=dict)
+    ape_sum: Dict[int, float] = field(default_factory=dict)
+    ape_n: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, pumps: np.ndarray, actual: np.ndarray, predicted: np.ndarray) -> None:
+        err = predicted - actual
+        nonzero = actual != 0
+        ape = np.zeros_like(err)
+        ape[nonzero] = np.abs(err[nonzero] / actual[nonzero])
+        frame = pd.DataFrame({
+            "p": pumps,
+            "n": 1,
+            "abs": np.abs(err),
+            "sq": err * err,
+            "ape": ape,
+            "ape_n": nonzero.astype(np.int64),
+        })
+        for ma, row in frame.groupby("p").sum().iterrows():
+            ma = int(ma)
+            self.n[ma] = self.n.get(ma, 0) + int(row["n"])
+            self.abs_sum[ma] = self.abs_sum.get(ma, 0.0) + row["abs"]
+            self.sq_sum[ma] = self.sq_sum.get(ma, 0.0) + row["sq"]
+            self.ape_sum[ma] = self.ape_sum.get(ma, 0.0) + row["ape"]
+            self.ape_n[ma] = self.ape_n.get(ma, 0) + int(row["ape_n"])
+
+    @staticmethod
+    def _metrics(n: int, abs_sum: float, sq_sum: float, ape_sum: float, ape_n: int) -> Tuple:
+        if n == 0:
+            return (0, None, None, None)
+        return (n, float(abs_sum / n), float(np.sqrt(sq_sum / n)), float(ape_sum / ape_n * 100) if ape_n else None)
+
+    def per_pump(self) -> pd.DataFrame:
+        rows = {
+            ma: self._metrics(self.n[ma], self.abs_sum[ma], self.sq_sum[ma], self.ape_sum[ma], self.ape_n[ma])
+            for ma in sorted(self.n)
+        }
+        return pd.DataFrame.from_dict(rows, orient="index", columns=list(METRIC_COLUMNS)).rename_axis("ma_may_bom")
+
+    def overall(self) -> Dict[str, Optional[float]]:
+        totals = (
+            sum(self.n.values()),
+            sum(self.abs_sum.values()),
+            sum(self.sq_sum.values()),
+            sum(self.ape_sum.values()),
+            sum(self.ape_n.values()),
+        )
+        return dict(zip(METRIC_COLUMNS, self._metrics(*totals)))
+
+
+async def stream_pump_batches(
+    db: AsyncSession,
+    tu: datetime,
+    den: datetime,
+    ma_may_bom: Optional[Sequence[int]] = None,
+    chunk_size: int = 200_000,
+) -> AsyncIterator[pd.DataFrame]:
+    """Bản ghi cảm biến theo (ma_may_bom, thoi_gian_tao), mỗi lô gồm trọn một số máy bơm.
+
+    Đọc qua server-side cursor; một lô được trả về khi đủ `chunk_size` dòng và máy bơm cuối đã đọc xong.
+    """
+    c = DuLieuCamBien
+    conds = [c.thoi_gian_tao >= tu, c.thoi_gian_tao < den, c.ma_may_bom.isnot(None)]
+    if ma_may_bom:
+        conds.append(c.ma_may_bom.in_(list(ma_may_bom)))
+    q = (
+        select(*(getattr(c, name) for name in READING_COLUMNS))
+        .where(*conds)
+        .order_by(c.ma_may_bom, c.thoi_gian_tao, c.ma_du_lieu)
+        .execution_options(yield_per=min(chunk_size, 50_000))
+    )
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+    result = await db.stream(q)
+    async for rows in result.partitions():
+        frame = pd.DataFrame.from_records(rows, columns=list(READING_COLUMNS))
+        pending.append(frame)
+        pending_rows += len(frame)
+        if pending_rows < chunk_size:
+            continue
+        batch = pd.concat(pending, ignore_index=True)
+        # Giữ lại máy bơm cuối (có thể còn dòng ở partition sau) cho lô tiếp theo
+        last = batch["ma_may_bom"].iat[-1]
+        done = batch["ma_may_bom"].to_numpy() != last
+        if done.any():
+            yield batch[done]
+            pending, pending_rows = [batch[~done]], int((~done).sum())
+        else:
+            pending, pending_rows = [batch], len(batch)
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+async def load_runs(db: AsyncSession, tu: datetime, den: datetime, ma_may_bom: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    """Các lần bơm đã kết thúc, bắt đầu trong [tu, den)."""
+    n = NhatKyMayBom
+    conds = [n.thoi_gian_bat >= tu, n.thoi_gian_bat < den, n.thoi_gian_tat.isnot(None), n.thoi_gian_tat > n.thoi_gian_bat]
+    if ma_may_bom:
+        conds.append(n.ma_may_bom.in_(list(ma_may_bom)))
+    res = await db.execute(select(n.ma_nhat_ky, n.ma_may_bom, n.thoi_gian_bat, n.thoi_gian_tat).where(*conds))
+    return pd.DataFrame.from_records(res.all(), columns=["ma_nhat_ky", "ma_may_bom", "thoi_gian_bat", "thoi_gian_tat"])
+
+
+def build_samples(readings: pd.DataFrame, runs: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(mã máy bơm, ma trận đặc trưng float32, lưu lượng thực tế, lúc bật máy) cho các lần bơm của các
+    máy bơm trong lô.
+
+    Đặc trưng: merge_asof lùi về bản ghi gần nhất không sau lúc bật máy. Thực tế: hiệu tổng tích luỹ
+    `luu_luong_nuoc` theo máy bơm tại lúc tắt (gồm) và trước lúc bật (không gồm).
+    """
+    empty = (
+        np.empty(0, dtype=np.int64),
+        np.empty((0, len(FEATURES)), dtype=np.float32),
+        np.empty(0),
+        np.empty(0, dtype="datetime64[ns]"),
+    )
+    runs = runs[runs["ma_may_bom"].isin(readings["ma_may_bom"].unique())]
+    if runs.empty or readings.empty:
+        return empty
+
+    readings = readings.sort_values("thoi_gian_tao", kind="stable")
+    flow = pd.to_numeric(readings["luu_luong_nuoc"], errors="coerce")
+    by_pump = readings.assign(_v=flow.fillna(0.0), _c=flow.notna().astype(np.int64)).groupby("ma_may_bom")
+    cum = readings[["ma_may_bom", "thoi_gian_tao"]].assign(
+        cum_sum=by_pump["_v"].cumsum(),
+        cum_n=by_pump["_c"].cumsum(),
+    )
+
+    features = pd.merge_asof(
+        runs.sort_values("thoi_gian_bat"),
+        readings[["ma_may_bom", "thoi_gian_tao", *FEATURES]],
+        left_on="thoi_gian_bat", right_on="thoi_gian_tao", by="ma_may_bom", direction="backward",
+    )
+    end = pd.merge_asof(
+        features.sort_values("thoi_gian_tat")[["ma_nhat_ky", "ma_may_bom", "thoi_gian_tat"]],
+        cum, left_on="thoi_gian_tat", right_on="thoi_gian_tao", by="ma_may_bom", direction="backward",
+    ).set_index("ma_nhat_ky")
+    start = pd.merge_asof(
+        features[["ma_nhat_ky", "ma_may_bom", "thoi_gian_bat"]],
+        cum, left_on="thoi_gian_bat", right_on="thoi_gian_tao", by="ma_may_bom", direction="backward",
+        allow_exact_matches=False,
+    ).set_index("ma_nhat_ky")
+
+    features = features.set_index("ma_nhat_ky")
+    count = end["cum_n"].fillna(0) - start["cum_n"].reindex(end.index).fillna(0)
+    total = end["cum_sum"].fillna(0) - start["cum_sum"].reindex(end.index).fillna(0)
+    has_features = features["thoi_gian_tao"].notna().reindex(end.index)
+    keep = (count > 0) & has_features
+    idx = keep[keep].index
+
+    X = features.loc[idx, list(FEATURES)].apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(np.float32)
+    actual = (total[idx] / count[idx]).to_numpy(np.float64)
+    started = features.loc[idx, "thoi_gian_bat"].to_numpy("datetime64[ns]")
+    return features.loc[idx, "ma_may_bom"].to_numpy(np.int64), X, actual, started
+
+
+async def run_backtest(
+    db: AsyncSession,
+    models: Dict[str, object],
+    tu: datetime,
+    den: datetime,
+    ma_may_bom: Optional[Sequence[int]] = None,
+    chunk_size: int = 200_000,
+    baseline: bool = False,
+) -> Dict[str, ErrorStats]:
+    """Chạy mọi mô hình trên cùng các mẫu, trả về sai số cộng dồn theo tên mô hình."""
+    runs = await load_runs(db, tu, den, ma_may_bom)
+    stats = {name: ErrorStats() for name in models}
+    if baseline:
+        stats[MO_HINH_HW] = ErrorStats()
+    if runs.empty:
+        return stats
+    # Đặc trưng của lần bơm đầu tiên có thể nằm trước `tu`: đọc thêm bản ghi từ trước đó
+    since = min(tu, runs["thoi_gian_bat"].min())
+    async for readings in stream_pump_batches(db, since - pd.Timedelta(days=1), den, ma_may_bom, chunk_size):
+        pumps, X, actual, started = build_samples(readings, runs)
+        if not len(actual):
+            continue
+        for name, model in models.items():
+            predicted, _ = forest_predict(model, X)
+            stats[name].add(pumps, actual, predicted)
+        if baseline:
+            stats[MO_HINH_HW].add(pumps, actual, baseline_for_samples(readings, pumps, started))
+    return stats
+
+
+def baseline_for_samples(readings: pd.DataFrame, pumps: np.ndarray, started: np.ndarray) -> np.ndarray:
+    """Dự báo Holt-Winters một bước cho giờ bật máy của từng mẫu (0 nếu máy bơm chưa có dữ liệu trước đó)."""
+    hw = one_step_predictions(readings).set_index(["ma_may_bom", "gio"])["du_bao"]
+    keys = pd.MultiIndex.from_arrays([pumps, pd.DatetimeIndex(started).floor("h")])
+    return hw.reindex(keys).fillna(0.0).to_numpy(np.float64)
+
+
+def _load_model(spec: str):
+    """`spec` là ma_mo_hinh (lấy qua registry) hoặc đường dẫn file .joblib."""
+    if spec.isdigit():
+        from src.predict.registry import registry
+
+        return registry.get(int(spec)).model
+    return joblib.load(spec)
+
+
+async def _main(args) -> None:
+    from src.core.db import AsyncSessionLocal
+
+    models = {spec: _load_model(spec) for spec in args.model}
+    async with AsyncSessionLocal() as db:
+        stats = await run_backtest(db, models, args.tu, args.den, args.ma_may_bom, args.chunk_size, args.baseline)
+
+    frames = []
+    for name, s in stats.items():
+        print(f"{name}: " + "  ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in s.overall().items()))
+        frames.append(s.per_pump().assign(mo_hinh=name))
+    if args.csv and frames:
+        pd.concat(frames).reset_index().to_csv(args.csv, index=False)
+        print(f"Đã ghi sai số theo máy bơm vào {args.csv}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backtest mô hình dự báo lưu lượng trên dữ liệu lịch sử")
+    parser.add_argument("--from", dest="tu", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--to", dest="den", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--model", action="append", required=True, help="ma_mo_hinh hoặc đường dẫn .joblib (lặp lại để so sánh)")
+    parser.add_argument("--ma-may-bom", type=int, nargs="*", default=None)
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--baseline", action="store_true", help="So sánh thêm với mô hình cơ sở Holt-Winters")
+    parser.add_argument("--csv", help="Ghi MAE/RMSE/MAPE theo máy bơm ra file CSV")
+    args = parser.parse_args(argv)
+    if not all(spec.isdigit() or os.path.exists(spec) for spec in args.model):
+        parser.error("--model phải là ma_mo_hinh hoặc đường dẫn file tồn tại")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,244 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.crud.du_lieu_cam_bien import get_hourly_flow_rollups
+from src.crud.du_lieu_du_bao import create_du_lieu_du_bao, get_latest_du_bao_by_mo_hinh
+from src.models.du_lieu_du_bao import DuLieuDuBao
+
+MO_HINH_HW = "HoltWinters"
+SEASON = 24
+# Số ngày đầu chuỗi dùng để khởi tạo mức và mùa vụ
+INIT_DAYS = 7
+# z của phân vị 10%/90% phân phối chuẩn: khoảng dự báo từ sai số một bước
+Z90 = 1.2815515655446004
+
+
+@dataclass
+class HoltWintersParams:
+    alpha: float = 0.3   # mức
+    beta: float = 0.05   # xu hướng
+    gamma: float = 0.2   # mùa vụ
+    phi: float = 0.95    # tắt dần xu hướng
+
+
+@dataclass
+class HoltWintersState:
+    """Trạng thái cuối của mọi máy bơm; mảng theo dòng của ma trận đầu vào."""
+
+    level: np.ndarray     # (P,)
+    trend: np.ndarray     # (P,)
+    season: np.ndarray    # (P, 24), theo giờ trong ngày
+    sigma: np.ndarray     # (P,) RMSE của dự báo một bước, bỏ ngày đầu
+    n_obs: np.ndarray     # (P,) số giờ có dữ liệu
+    next_hour: datetime   # giờ ngay sau chuỗi đã khớp
+    phi: float
+
+
+def rollup_matrix(
+    rollups: pd.DataFrame,
+    start: datetime,
+    hours: int,
+    pumps: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(mã máy bơm, ma trận (P, hours)) từ các dòng (ma_may_bom, gio, giá trị); giờ thiếu là NaN.
+
+    Cột giá trị là cột thứ ba. Truyền `pumps` (đã sắp xếp) để cố định thứ tự dòng; máy bơm ngoài
+    danh sách bị bỏ qua.
+    """
+    if pumps is None:
+        pumps = np.unique(rollups["ma_may_bom"].to_numpy(np.int64))
+    Y = np.full((len(pumps), hours), np.nan)
+    if rollups.empty or not len(pumps):
+        return pumps, Y
+    ma = rollups["ma_may_bom"].to_numpy(np.int64)
+    rows = np.minimum(np.searchsorted(pumps, ma), len(pumps) - 1)
+    cols = ((pd.to_datetime(rollups["gio"]) - pd.Timestamp(start)) // pd.Timedelta(hours=1)).to_numpy(np.int64)
+    keep = (pumps[rows] == ma) & (cols >= 0) & (cols < hours)
+    Y[rows[keep], cols[keep]] = rollups.iloc[:, 2].to_numpy(np.float64)[keep]
+    return pumps, Y
+
+
+def _initial_state(Y: np.ndarray, h0: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Mức = trung bình các ngày đầu; mùa vụ = trung bình theo giờ trong ngày trừ mức (0 nếu thiếu)."""
+    init = Y[:, : SEASON * INIT_DAYS]
+    obs = ~np.isnan(init)
+    n = obs.sum(axis=1)
+    level = np.nansum(init, axis=1) / np.maximum(n, 1)
+    hod = (h0 + np.arange(init.shape[1])) % SEASON
+    onehot = (hod[:, None] == np.arange(SEASON)[None, :]).astype(np.float64)
+    sums = np.nan_to_num(init) @ onehot
+    counts = obs.astype(np.float64) @ onehot
+    season = np.where(counts > 0, sums / np.maximum(counts, 1) - level[:, None], 0.0)
+    return level, season
+
+
+def fit_holt_winters(
+    Y: np.ndarray,
+    start: datetime,
+    params: Optional[HoltWintersParams] = None,
+) -> Tuple[HoltWintersState, np.ndarray]:
+    """Khớp Holt-Winters cộng tính (xu hướng tắt dần, mùa vụ 24 giờ) cho mọi dòng của Y cùng lúc.
+
+    Mỗi bước thời gian cập nhật cả đội máy bơm bằng phép toán mảng, nên số vòng lặp Python là số giờ,
+    không phụ thuộc số máy bơm. Giờ thiếu dữ liệu: mức/xu hướng đi theo dự báo, mùa vụ giữ nguyên.
+    Trả về (trạng thái cuối, dự báo một bước (P, H)); cột t chỉ dùng dữ liệu trước giờ t.
+    """
+    params = params or HoltWintersParams()
+    a, b, g, phi = params.alpha, params.beta, params.gamma, params.phi
+    P, H = Y.shape
+    h0 = start.hour
+    level, season = _initial_state(Y, h0)
+    trend = np.zeros(P)
+
+    one_step = np.empty((P, H))
+    sq_err = np.zeros(P)
+    n_err = np.zeros(P, dtype=np.int64)
+    for t in range(H):
+        s_idx = (h0 + t) % SEASON
+        s = season[:, s_idx]
+        base = level + phi * trend
+        one_step[:, t] = base + s
+        y = Y[:, t]
+        obs = ~np.isnan(y)
+        y = np.where(obs, y, 0.0)
+        if t >= SEASON:
+            err = np.where(obs, y - one_step[:, t], 0.0)
+            sq_err += err * err
+            n_err += obs
+        new_level = a * (y - s) + (1 - a) * base
+        trend = np.where(obs, b * (new_level - level) + (1 - b) * phi * trend, phi * trend)
+        season[:, s_idx] = np.where(obs, g * (y - new_level) + (1 - g) * s, s)
+        level = np.where(obs, new_level, base)
+
+    state = HoltWintersState(
+        level=level,
+        trend=trend,
+        season=season,
+        sigma=np.sqrt(sq_err / np.maximum(n_err, 1)),
+        n_obs=(~np.isnan(Y)).sum(axis=1),
+        next_hour=start + timedelta(hours=H),
+        phi=phi,
+    )
+    return state, one_step
+
+
+def forecast_holt_winters(state: HoltWintersState, steps: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """Dự báo (len(rows), steps) cho các giờ `next_hour`, +1h, ...; không âm."""
+    rows = np.arange(len(state.level)) if rows is None else np.asarray(rows)
+    h = np.arange(1, steps + 1)
+    damp = np.cumsum(np.power(state.phi, h))
+    hod = (state.next_hour.hour + h - 1) % SEASON
+    f = state.level[rows, None] + damp[None, :] * state.trend[rows, None] + state.season[rows][:, hod]
+    return np.maximum(f, 0.0)
+
+
+def interval(flows: np.ndarray, sigma: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(p10, p90) giả định sai số chuẩn với độ lệch `sigma`."""
+    return np.maximum(flows - Z90 * sigma, 0.0), flows + Z90 * sigma
+
+
+@dataclass
+class FleetBaseline:
+    pumps: Dict[int, int]   # ma_may_bom -> dòng trong state
+    state: HoltWintersState
+    fitted_at: float
+
+    def forecast(self, ma_may_bom: int, now: datetime, steps: int = 1, min_obs: int = SEASON) -> Optional[Tuple[np.ndarray, float]]:
+        """(lưu lượng theo giờ từ giờ chứa `now`, sigma); None nếu máy bơm chưa đủ `min_obs` giờ dữ liệu."""
+        row = self.pumps.get(ma_may_bom)
+        if row is None or self.state.n_obs[row] < min_obs:
+            return None
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        skip = max(0, int((hour - self.state.next_hour) // timedelta(hours=1)))
+        flows = forecast_holt_winters(self.state, skip + steps, [row])[0, skip:]
+        return flows, float(self.state.sigma[row])
+
+
+async def fit_fleet_baseline(db: AsyncSession, now: datetime, history_days: int) -> FleetBaseline:
+    """Một truy vấn tổng hợp theo giờ cho mọi máy bơm, rồi khớp trên cả ma trận ngoài event loop."""
+    end = now.replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=history_days)
+    rows = await get_hourly_flow_rollups(db, start, end)
+    rollups = pd.DataFrame.from_records(rows, columns=["ma_may_bom", "gio", "luu_luong"])
+    pumps, Y = rollup_matrix(rollups, start, history_days * SEASON)
+    state, _ = await asyncio.to_thread(fit_holt_winters, Y, start)
+    return FleetBaseline(pumps={int(p): i for i, p in enumerate(pumps)}, state=state, fitted_at=time.monotonic())
+
+
+class BaselineStore:
+    """Mô hình cơ sở của cả đội máy bơm trong process.
+
+    Chỉ job định kỳ của scheduler (mỗi BASELINE_REFRESH_MINUTES phút, chạy ngay khi khởi động) gọi
+    `refresh()`; request chỉ đọc `current()` và không bao giờ khớp lại mô hình.
+    """
+
+    def __init__(self, history_days: int):
+        self.history_days = history_days
+        self._baseline: Optional[FleetBaseline] = None
+
+    def current(self) -> Optional[FleetBaseline]:
+        """Mô hình đã khớp gần nhất; None nếu job chưa chạy xong lần nào."""
+        return self._baseline
+
+    async def refresh(self, db: AsyncSession, now: Optional[datetime] = None) -> FleetBaseline:
+        self._baseline = await fit_fleet_baseline(db, now or datetime.now(), self.history_days)
+        return self._baseline
+
+
+baseline_store = BaselineStore(settings.BASELINE_HISTORY_DAYS)
+
+
+async def baseline_forecast(db: AsyncSession, ma_may_bom: int, ma_nguoi_dung, now: datetime) -> Optional[DuLieuDuBao]:
+    """Dòng dự báo Holt-Winters của máy bơm cho giờ chứa `now`.
+
+    Trong cùng giờ trả lại dòng đã lưu thay vì INSERT thêm; None nếu job scheduler chưa khớp mô hình
+    cơ sở hoặc máy bơm chưa đủ lịch sử.
+    """
+    existing = await get_latest_du_bao_by_mo_hinh(db, ma_may_bom, MO_HINH_HW, now.replace(minute=0, second=0, microsecond=0))
+    if existing is not None:
+        return existing
+    baseline = baseline_store.current()
+    result = baseline.forecast(ma_may_bom, now) if baseline is not None else None
+    if result is None:
+        return None
+    flows, sigma = result
+    flow = float(flows[0])
+    p10, p90 = (float(v[0]) for v in interval(flows, np.array([sigma])))
+    return await create_du_lieu_du_bao(db, DuLieuDuBao(
+        mo_hinh=MO_HINH_HW,
+        thoi_diem_du_bao=now,
+        luu_luong_du_bao=flow,
+        do_tin_cay=max(0.0, 1.0 - sigma / flow) if flow > 0 else float(sigma == 0),
+        luu_luong_p10=p10,
+        luu_luong_p50=flow,
+        luu_luong_p90=p90,
+        ma_nguoi_dung=ma_nguoi_dung,
+        ma_may_bom=ma_may_bom,
+    ))
+
+
+def one_step_predictions(readings: pd.DataFrame, params: Optional[HoltWintersParams] = None) -> pd.DataFrame:
+    """Dự báo một bước theo giờ (ma_may_bom, gio, du_bao) từ bản ghi cảm biến, dùng làm mốc trong backtest."""
+    flow = pd.to_numeric(readings["luu_luong_nuoc"], errors="coerce")
+    hourly = readings[["ma_may_bom"]].assign(
+        gio=pd.to_datetime(readings["thoi_gian_tao"]).dt.floor("h"),
+        luu_luong=flow,
+    ).dropna(subset=["luu_luong"])
+    rollups = hourly.groupby(["ma_may_bom", "gio"], as_index=False)["luu_luong"].mean()
+    if rollups.empty:
+        return pd.DataFrame(columns=["ma_may_bom", "gio", "du_bao"])
+    start = rollups["gio"].min()
+    hours = int((rollups["gio"].max() - start) // pd.Timedelta(hours=1)) + 2
+    pumps, Y = rollup_matrix(rollups, start.to_pydatetime(), hours)
+    _, one_step = fit_holt_winters(Y, start.to_pydatetime(), params)
+    return pd.DataFrame({
+        "ma_may_bom": np.repeat(pumps, hours),
+        "gio": np.tile(pd.date_range(start, periods=hours, freq="h").to_numpy(), len(pumps)),
+        "du_bao": np.maximum(one_step.ravel(), 0.0),
+    })
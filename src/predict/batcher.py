@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import numpy as np
+from src.core.config import settings
+from src.predict.ensemble import forest_predict_intervals_async
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    return float(np.percentile(np.fromiter(samples, dtype=np.float64), q))
+
+
+@dataclass
+class _Pending:
+    model: Any
+    rows: List[np.ndarray] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    enqueued_at: List[float] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class InferenceBatcher:
+    """Gom các request dự báo một dòng đến gần nhau thành một lần gọi mô hình.
+
+    Khi không có lô nào của mô hình đang chạy, request được chạy ngay (không phải chờ). Trong lúc
+    một lô đang chạy, các request mới dồn vào lô chờ; lô chờ được chạy khi lô trước xong, khi hết
+    `max_wait_ms` kể từ request đầu tiên, hoặc khi đủ `max_batch` dòng, rồi kết quả từng dòng được
+    trả về future của từng request. Các lô tách riêng theo `ma_mo_hinh`. Dùng trên event loop của
+    ứng dụng.
+    """
+
+    def __init__(self, max_wait_ms: float = 5.0, max_batch: int = 64, window: int = 1000):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pending: Dict[int, _Pending] = {}
+        self._running: Dict[int, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._started_at = time.monotonic()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_batch_seen = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=window)
+        self._wait_ms: Deque[float] = deque(maxlen=window)
+        self._inference_ms: Deque[float] = deque(maxlen=window)
+
+    async def predict(self, ma_mo_hinh: int, model, x: np.ndarray) -> Tuple[float, float, Tuple[float, ...]]:
+        """(lưu lượng dự báo, độ tin cậy, (p10, p50, p90)) cho một dòng đặc trưng `x`."""
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(ma_mo_hinh)
+        if batch is not None and batch.model is not model:
+            # Mô hình vừa được nạp lại: chạy lô cũ với mô hình cũ, mở lô mới
+            self._flush(ma_mo_hinh)
+            batch = None
+        if batch is None:
+            batch = _Pending(model=model)
+            self._pending[ma_mo_hinh] = batch
+
+        fut = loop.create_future()
+        batch.rows.append(np.asarray(x, dtype=np.float32).reshape(1, -1))
+        batch.futures.append(fut)
+        batch.enqueued_at.append(time.perf_counter())
+        self._requests += 1
+        if len(batch.rows) >= self.max_batch or not self._running.get(ma_mo_hinh):
+            self._flush(ma_mo_hinh)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.max_wait, self._flush, ma_mo_hinh)
+        return await fut
+
+    def _flush(self, ma_mo_hinh: int) -> None:
+        batch = self._pending.pop(ma_mo_hinh, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._running[ma_mo_hinh] = self._running.get(ma_mo_hinh, 0) + 1
+        task = asyncio.ensure_future(self._run(ma_mo_hinh, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _done(self, ma_mo_hinh: int) -> None:
+        """Một lô của mô hình vừa xong: nếu không còn lô nào đang chạy thì chạy ngay lô đang chờ."""
+        self._running[ma_mo_hinh] -= 1
+        if not self._running[ma_mo_hinh]:
+            del self._running[ma_mo_hinh]
+            if ma_mo_hinh in self._pending:
+                self._flush(ma_mo_hinh)
+
+    async def _run(self, ma_mo_hinh: int, batch: _Pending) -> None:
+        started = time.perf_counter()
+        try:
+            flows, confidences, quantiles = await forest_predict_intervals_async(ma_mo_hinh, batch.model, np.vstack(batch.rows))
+        except Exception as e:
+            self._errors += 1
+            for fut in batch.futures:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        finally:
+            self._done(ma_mo_hinh)
+
+        self._batches += 1
+        self._max_batch_seen = max(self._max_batch_seen, len(batch.rows))
+        self._batch_sizes.append(len(batch.rows))
+        self._inference_ms.append((time.perf_counter() - started) * 1000)
+        self._wait_ms.extend((started - t) * 1000 for t in batch.enqueued_at)
+        for fut, flow, conf, q in zip(batch.futures, flows, confidences, quantiles.T):
+            # Request đã bị huỷ (client ngắt kết nối) thì bỏ qua
+            if not fut.done():
+                fut.set_result((float(flow), float(conf), tuple(float(v) for v in q)))
+
+    def metrics(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started_at
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch": self.max_batch,
+            "requests": self._requests,
+            "batches": self._batches,
+            "errors": self._errors,
+            "pending": sum(len(b.rows) for b in self._pending.values()),
+            "requests_per_second": self._requests / elapsed if elapsed > 0 else 0.0,
+            "avg_batch_size": float(np.mean(self._batch_sizes)) if self._batch_sizes else None,
+            "max_batch_size": self._max_batch_seen,
+            "queue_wait_ms_p50": _percentile(self._wait_ms, 50),
+            "queue_wait_ms_p95": _percentile(self._wait_ms, 95),
+            "inference_ms_p50": _percentile(self._inference_ms, 50),
+            "inference_ms_p95": _percentile(self._inference_ms, 95),
+        }
+
+
+batcher = InferenceBatcher(settings.INFERENCE_BATCH_MAX_WAIT_MS, settings.INFERENCE_BATCH_MAX_SIZE)
@@ -0,0 +1,131 @@
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.crud.hieu_chinh_may_bom import get_correction_stats
+from src.predict.registry import registry
+
+KEYS = ["ma_mo_hinh", "ma_may_bom"]
+# Giới hạn hệ số góc để một máy bơm ít biến động không làm hiệu chỉnh phóng đại sai số
+SLOPE_RANGE = (0.5, 2.0)
+
+
+class Correction(NamedTuple):
+    """Hiệu chỉnh tuyến tính của một máy bơm: lưu lượng = max(0, he_so_chan + he_so_goc * dự báo gốc)."""
+
+    he_so_chan: float
+    he_so_goc: float
+
+    def apply(self, values):
+        return np.maximum(self.he_so_chan + self.he_so_goc * np.asarray(values, dtype=np.float64), 0.0)
+
+
+def summarize_corrections(rows, forgetting: float) -> List[dict]:
+    """Tổng quên dần của (dự báo gốc p, thực tế a) theo (mô hình, máy bơm) cho `add_correction_stats`.
+
+    Mẫu thứ i trong k mẫu của nhóm (theo thời điểm dự báo) có trọng số λ^(k-1-i); `he_so_giam` = λ^k
+    là hệ số nhân cho tổng cũ. Mỗi mẫu chỉ đóng góp O(1) vào các tổng.
+    """
+    df = pd.DataFrame.from_records(
+        rows, columns=[*KEYS, "thoi_diem_du_bao", "luu_luong_du_bao", "luu_luong_thuc_te", "luu_luong_goc"]
+    )
+    df = df.dropna(subset=["ma_mo_hinh", "luu_luong_thuc_te", "luu_luong_goc"])
+    if df.empty:
+        return []
+    df = df.astype({"ma_mo_hinh": "int64", "luu_luong_goc": "float64", "luu_luong_thuc_te": "float64"})
+    df = df.sort_values([*KEYS, "thoi_diem_du_bao"], kind="stable")
+
+    g = df.groupby(KEYS)
+    k = g["luu_luong_goc"].transform("size")
+    w = np.power(forgetting, k - 1 - g.cumcount())
+    p, a = df["luu_luong_goc"], df["luu_luong_thuc_te"]
+    terms = pd.DataFrame({
+        "ma_mo_hinh": df["ma_mo_hinh"],
+        "ma_may_bom": df["ma_may_bom"],
+        "so_mau": 1,
+        "tong_trong_so": w,
+        "tong_p": w * p,
+        "tong_a": w * a,
+        "tong_pp": w * p * p,
+        "tong_pa": w * p * a,
+    })
+    out = terms.groupby(KEYS).sum().reset_index()
+    out["he_so_giam"] = np.power(forgetting, out["so_mau"])
+    records = out.to_dict("records")
+    for r in records:
+        for key in ("ma_mo_hinh", "ma_may_bom", "so_mau"):
+            r[key] = int(r[key])
+    return records
+
+
+def correction_from_stats(stats, min_samples: int) -> Optional[Correction]:
+    """Hồi quy có trọng số a ~ p từ các tổng; chưa đủ mẫu thì None (không hiệu chỉnh).
+
+    Dự báo gốc gần như không đổi (phương sai ~ 0) thì chỉ hiệu chỉnh độ lệch.
+    """
+    if stats is None or stats.so_mau < min_samples or stats.tong_trong_so <= 0:
+        return None
+    w = stats.tong_trong_so
+    mean_p, mean_a = stats.tong_p / w, stats.tong_a / w
+    var_p = stats.tong_pp / w - mean_p * mean_p
+    cov = stats.tong_pa / w - mean_p * mean_a
+    slope = 1.0
+    if var_p > 1e-9 * max(1.0, mean_p * mean_p):
+        slope = float(np.clip(cov / var_p, *SLOPE_RANGE))
+    return Correction(he_so_chan=float(mean_a - slope * mean_p), he_so_goc=slope)
+
+
+def correction_arrays(corrections: Dict[int, Correction], ma_may_bom_ids: List[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(hệ số chặn, hệ số góc, có hiệu chỉnh) cho từng máy bơm theo thứ tự; không có thì (0, 1)."""
+    has = np.array([ma in corrections for ma in ma_may_bom_ids], dtype=bool)
+    intercept = np.array([corrections[ma].he_so_chan if ma in corrections else 0.0 for ma in ma_may_bom_ids])
+    slope = np.array([corrections[ma].he_so_goc if ma in corrections else 1.0 for ma in ma_may_bom_ids])
+    return intercept, slope, has
+
+
+class PumpCorrectionStore:
+    """Hiệu chỉnh theo (mô hình, máy bơm), giữ trong bộ nhớ `ttl_seconds` rồi đọc lại từ DB.
+
+    Job đối chiếu độ chính xác cập nhật các tổng trong DB; process phục vụ chỉ đọc theo lô.
+    """
+
+    def __init__(self, ttl_seconds: float, min_samples: int):
+        self.ttl_seconds = ttl_seconds
+        self.min_samples = min_samples
+        self._items: Dict[Tuple[int, int], Tuple[float, Optional[Correction]]] = {}
+
+    async def get_many(self, db: AsyncSession, ma_mo_hinh: int, ma_may_bom_ids: Iterable[int]) -> Dict[int, Correction]:
+        now = time.monotonic()
+        found: Dict[int, Correction] = {}
+        missing: List[int] = []
+        for ma in dict.fromkeys(ma_may_bom_ids):
+            cached = self._items.get((ma_mo_hinh, ma))
+            if cached is not None and now - cached[0] < self.ttl_seconds:
+                if cached[1] is not None:
+                    found[ma] = cached[1]
+            else:
+                missing.append(ma)
+        if missing:
+            stats = await get_correction_stats(db, ma_mo_hinh, missing)
+            for ma in missing:
+                corr = correction_from_stats(stats.get(ma), self.min_samples)
+                self._items[(ma_mo_hinh, ma)] = (now, corr)
+                if corr is not None:
+                    found[ma] = corr
+        return found
+
+    async def get(self, db: AsyncSession, ma_mo_hinh: int, ma_may_bom: int) -> Optional[Correction]:
+        return (await self.get_many(db, ma_mo_hinh, [ma_may_bom])).get(ma_may_bom)
+
+    def invalidate_model(self, ma_mo_hinh: Optional[int] = None) -> None:
+        if ma_mo_hinh is None:
+            self._items.clear()
+        else:
+            for key in [k for k in self._items if k[0] == ma_mo_hinh]:
+                del self._items[key]
+
+
+pump_corrections = PumpCorrectionStore(settings.PUMP_CORRECTION_TTL_SECONDS, settings.PUMP_CORRECTION_MIN_SAMPLES)
+registry.add_reload_listener(pump_corrections.invalidate_model)
@@ -0,0 +1,111 @@
+from typing import Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.core.executor import executor_kind, run_cpu
+from src.predict.flat_forest import FlatForest
+
+# Thứ tự đặc trưng mà mô hình được huấn luyện (feature_names_in_)
+FEATURES = ("mua", "do_am_dat", "nhiet_do", "do_am")
+# Phân vị của khoảng dự báo (p10, p50, p90), lấy trên phân phối dự báo của các cây
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def feature_matrix(readings: Iterable) -> np.ndarray:
+    """Ma trận đặc trưng float32 (n, 4) từ các bản ghi cảm biến; giá trị thiếu được thay bằng 0."""
+    rows = [[getattr(r, f, None) or 0 for f in FEATURES] for r in readings]
+    return np.asarray(rows, dtype=np.float32).reshape(-1, len(FEATURES))
+
+
+def per_tree_predictions(model, X: np.ndarray) -> np.ndarray:
+    """Dự báo của từng cây, shape (n_trees, n_rows).
+
+    Gọi thẳng `tree_.apply` trên mảng float32 liên tục nên không có bước kiểm tra/ chuyển đổi
+    đầu vào của sklearn cho mỗi cây như `tree.predict(DataFrame)`.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    out = np.empty((len(model.estimators_), X.shape[0]), dtype=np.float64)
+    for i, est in enumerate(model.estimators_):
+        tree = est.tree_
+        out[i] = tree.value[tree.apply(X), 0, 0]
+    return out
+
+
+def confidence_from_trees(preds: np.ndarray) -> np.ndarray:
+    """Độ tin cậy mỗi dòng = max(0, 1 - std/|mean|) của dự báo các cây."""
+    mean = preds.mean(axis=0)
+    std = preds.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = std / np.abs(mean)
+    return np.where(mean == 0, (std == 0).astype(np.float64), np.maximum(0.0, 1.0 - cv))
+
+
+def _tree_matrix(model, X: np.ndarray) -> Optional[np.ndarray]:
+    """Ma trận dự báo theo cây (n_trees, n_rows); None nếu mô hình không phải random forest."""
+    if isinstance(model, FlatForest):
+        return model.per_tree(X)
+    if hasattr(model, "estimators_"):
+        return per_tree_predictions(model, X)
+    return None
+
+
+def _predict_plain(model, X: np.ndarray) -> np.ndarray:
+    return np.asarray(model.predict(pd.DataFrame(X, columns=list(FEATURES))), dtype=np.float64)
+
+
+def quantiles_from_trees(preds: np.ndarray) -> np.ndarray:
+    """Phân vị QUANTILES của dự báo các cây cho mỗi dòng, shape (len(QUANTILES), n_rows)."""
+    return np.quantile(preds, QUANTILES, axis=0)
+
+
+def forest_predict(model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(lưu lượng dự báo, độ tin cậy) cho mỗi dòng của X.
+
+    Với RandomForest, dự báo bằng trung bình các cây nên dùng luôn ma trận per-tree,
+    không cần gọi thêm `model.predict`.
+    """
+    preds = _tree_matrix(model, X)
+    if preds is not None:
+        return preds.mean(axis=0), confidence_from_trees(preds)
+
+    # Mô hình không phải RF: không có phân phối theo cây
+    flow = _predict_plain(model, X)
+    return flow, np.full(flow.shape, 0.9)
+
+
+def forest_predict_intervals(model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Như `forest_predict`, thêm khoảng dự báo (len(QUANTILES), n_rows) từ cùng ma trận per-tree.
+
+    Mô hình không phải RF không có phân phối: mọi phân vị bằng giá trị dự báo.
+    """
+    preds = _tree_matrix(model, X)
+    if preds is not None:
+        return preds.mean(axis=0), confidence_from_trees(preds), quantiles_from_trees(preds)
+    flow = _predict_plain(model, X)
+    return flow, np.full(flow.shape, 0.9), np.tile(flow, (len(QUANTILES), 1))
+
+
+def predict_by_id(ma_mo_hinh: int, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Dùng trong worker process: mô hình lấy từ registry của chính process đó, chỉ X được pickle."""
+    from src.predict.registry import registry
+
+    return forest_predict(registry.get(ma_mo_hinh).model, X)
+
+
+def predict_intervals_by_id(ma_mo_hinh: int, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    from src.predict.registry import registry
+
+    return forest_predict_intervals(registry.get(ma_mo_hinh).model, X)
+
+
+async def forest_predict_async(ma_mo_hinh: int, model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """`forest_predict` chạy trên executor suy luận dùng chung thay vì trên event loop."""
+    if executor_kind() == "process":
+        return await run_cpu(predict_by_id, ma_mo_hinh, X)
+    return await run_cpu(forest_predict, model, X)
+
+
+async def forest_predict_intervals_async(ma_mo_hinh: int, model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """`forest_predict_intervals` chạy trên executor suy luận dùng chung."""
+    if executor_kind() == "process":
+        return await run_cpu(predict_intervals_by_id, ma_mo_hinh, X)
+    return await run_cpu(forest_predict_intervals, model, X)
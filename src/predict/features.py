@@ -0,0 +1,183 @@
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.crud.dac_trung_may_bom import (
+    insert_features,
+    list_completed_runs,
+    list_pumps_with_new_readings,
+    list_readings_for_pump,
+    stream_readings_for_pump,
+)
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = {"1h": timedelta(hours=1), "6h": timedelta(hours=6), "24h": timedelta(hours=24)}
+RAIN_WINDOWS = ("6h", "24h")
+# Cửa sổ dài nhất: lượng dữ liệu cần đọc lại để dựng trạng thái khi chưa có trong bộ nhớ
+LOOKBACK = max(WINDOWS.values())
+
+FEATURE_COLUMNS = (
+    *(f"do_am_dat_tb_{w}" for w in WINDOWS),
+    *(f"do_am_tb_{w}" for w in WINDOWS),
+    *(f"mua_tong_{w}" for w in RAIN_WINDOWS),
+    "thoi_luong_tuoi_gan_nhat",
+    "thoi_gian_tu_lan_tuoi",
+)
+
+
+class RollingWindow:
+    """Tổng và trung bình trượt theo thời gian trên khoảng (t - width, t].
+
+    Mỗi giá trị được thêm và bỏ đúng một lần nên cập nhật là O(1) khấu hao; giá trị None bị bỏ qua.
+    Thời gian phải được đưa vào theo thứ tự tăng dần.
+    """
+
+    __slots__ = ("width", "_items", "_total")
+
+    def __init__(self, width: timedelta):
+        self.width = width
+        self._items: Deque[Tuple[datetime, float]] = deque()
+        self._total = 0.0
+
+    def push(self, t: datetime, value: Optional[float]) -> None:
+        if value is not None:
+            self._items.append((t, float(value)))
+            self._total += float(value)
+        self.advance(t)
+
+    def advance(self, t: datetime) -> None:
+        cutoff = t - self.width
+        items = self._items
+        while items and items[0][0] <= cutoff:
+            self._total -= items.popleft()[1]
+        if not items:
+            # Tránh sai số cộng dồn khi cửa sổ rỗng
+            self._total = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    def mean(self) -> Optional[float]:
+        return self._total / len(self._items) if self._items else None
+
+
+class PumpFeatureState:
+    """Trạng thái đặc trưng của một máy bơm, cập nhật lần lượt theo từng bản ghi cảm biến."""
+
+    def __init__(self):
+        self.do_am_dat = {w: RollingWindow(width) for w, width in WINDOWS.items()}
+        self.do_am = {w: RollingWindow(width) for w, width in WINDOWS.items()}
+        self.mua = {w: RollingWindow(WINDOWS[w]) for w in RAIN_WINDOWS}
+        # Vị trí (thoi_gian_tao, ma_du_lieu) của bản ghi cuối cùng đã đưa vào
+        self.position: Optional[Tuple[datetime, int]] = None
+        # Các lần bơm đã kết thúc nhưng chưa tới (theo thời gian bản ghi), và lần gần nhất đã tới
+        self._runs: Deque[Tuple[datetime, datetime]] = deque()
+        self.last_run: Optional[Tuple[datetime, datetime]] = None
+        self.runs_seen: Optional[datetime] = None
+
+    def add_runs(self, runs) -> None:
+        for bat, tat in runs:
+            if self.runs_seen is None or tat > self.runs_seen:
+                self._runs.append((bat, tat))
+                self.runs_seen = tat
+
+    def update(self, reading) -> Dict[str, Optional[float]]:
+        t = reading.thoi_gian_tao
+        for w in WINDOWS:
+            self.do_am_dat[w].push(t, reading.do_am_dat)
+            self.do_am[w].push(t, reading.do_am)
+        for w in RAIN_WINDOWS:
+            self.mua[w].push(t, reading.mua)
+        while self._runs and self._runs[0][1] <= t:
+            self.last_run = self._runs.popleft()
+        self.position = (t, reading.ma_du_lieu)
+
+        features: Dict[str, Optional[float]] = {}
+        for w in WINDOWS:
+            features[f"do_am_dat_tb_{w}"] = self.do_am_dat[w].mean()
+            features[f"do_am_tb_{w}"] = self.do_am[w].mean()
+        for w in RAIN_WINDOWS:
+            features[f"mua_tong_{w}"] = self.mua[w].total
+        if self.last_run is not None:
+            bat, tat = self.last_run
+            features["thoi_luong_tuoi_gan_nhat"] = (tat - bat).total_seconds()
+            features["thoi_gian_tu_lan_tuoi"] = (t - tat).total_seconds()
+        else:
+            features["thoi_luong_tuoi_gan_nhat"] = None
+            features["thoi_gian_tu_lan_tuoi"] = None
+        return features
+
+
+# Trạng thái giữ giữa các lần chạy job trong cùng process; dựng lại từ DB khi không khớp high-water mark
+_states: Dict[int, PumpFeatureState] = {}
+
+
+async def _seed_state(db: AsyncSession, ma_may_bom: int, high_water: Optional[Tuple[datetime, int]]) -> PumpFeatureState:
+    """Dựng trạng thái tại `high_water` từ `LOOKBACK` dữ liệu trước đó (không ghi đặc trưng)."""
+    state = PumpFeatureState()
+    if high_water is None:
+        state.add_runs(await list_completed_runs(db, ma_may_bom, None))
+        return state
+
+    since = high_water[0] - LOOKBACK
+    state.add_runs(await list_completed_runs(db, ma_may_bom, since))
+    async for rows in stream_readings_for_pump(db, ma_may_bom, until=high_water, since=since):
+        for r in rows:
+            state.update(r)
+    state.position = high_water
+    return state
+
+
+async def refresh_pump_features(
+    db: AsyncSession,
+    ma_may_bom: int,
+    high_water: Optional[Tuple[datetime, int]],
+    chunk_size: int = 1000,
+) -> int:
+    """Tính đặc trưng cho các bản ghi mới của một máy bơm (sau `high_water`) và ghi theo lô."""
+    state = _states.get(ma_may_bom)
+    if state is None or state.position != high_water:
+        state = await _seed_state(db, ma_may_bom, high_water)
+    else:
+        state.add_runs(await list_completed_runs(db, ma_may_bom, state.runs_seen))
+    _states.pop(ma_may_bom, None)
+
+    # Từng trang keyset: đọc, tính, ghi + commit, rồi đi tiếp từ vị trí cuối
+    written = 0
+    position = high_water
+    while True:
+        rows = await list_readings_for_pump(db, ma_may_bom, position, chunk_size)
+        if not rows:
+            break
+        batch: List[dict] = [
+            {"ma_du_lieu": r.ma_du_lieu, "ma_may_bom": ma_may_bom, "thoi_gian": r.thoi_gian_tao, **state.update(r)}
+            for r in rows
+        ]
+        await insert_features(db, batch)
+        written += len(batch)
+        position = state.position
+        if len(rows) < chunk_size:
+            break
+
+    _states[ma_may_bom] = state
+    return written
+
+
+async def refresh_feature_store(db: AsyncSession, chunk_size: int = 1000) -> int:
+    """Cập nhật feature store cho mọi máy bơm có bản ghi mới; trả về số dòng đặc trưng đã ghi."""
+    pumps = await list_pumps_with_new_readings(db)
+    total = 0
+    for ma, high_water in pumps.items():
+        try:
+            total += await refresh_pump_features(db, ma, high_water, chunk_size)
+        except Exception:
+            _states.pop(ma, None)
+            await db.rollback()
+            logger.exception("Lỗi khi cập nhật đặc trưng cho máy bơm %s", ma)
+    return total
@@ -0,0 +1,202 @@
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+# Tên file .npy trong thư mục artifact phẳng
+ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "depths")
+EVALUATORS = ("auto", "numpy", "numba")
+# Số dòng mỗi lượt của bộ đánh giá NumPy: giới hạn ma trận chỉ số (n_trees, rows)
+NUMPY_ROW_CHUNK = 4096
+
+
+def numba_available() -> bool:
+    """numba là phụ thuộc tuỳ chọn, chỉ cần cho bộ đánh giá biên dịch JIT."""
+    return importlib.util.find_spec("numba") is not None
+
+
+def resolve_evaluator(name: str) -> str:
+    if name not in EVALUATORS:
+        raise ValueError(f"Bộ đánh giá không hợp lệ: {name}")
+    if name == "auto":
+        return "numba" if numba_available() else "numpy"
+    if name == "numba" and not numba_available():
+        raise ValueError("Bộ đánh giá numba cần cài đặt gói numba")
+    return name
+
+
+def _walk(feature, threshold, left, right, value, roots, X, out):
+    """Duyệt từng cây cho từng dòng, dừng khi gặp lá (node trỏ về chính nó)."""
+    for t in range(roots.shape[0]):
+        for r in range(X.shape[0]):
+            i = roots[t]
+            while left[i] != i:
+                if X[r, feature[i]] <= threshold[i]:
+                    i = left[i]
+                else:
+                    i = right[i]
+            out[t, r] = value[i]
+
+
+_walk_jit = None
+
+
+def _numba_walk():
+    global _walk_jit
+    if _walk_jit is None:
+        import numba
+
+        # nogil: chạy song song được trên thread pool của executor suy luận
+        _walk_jit = numba.njit(nogil=True, cache=True)(_walk)
+    return _walk_jit
+
+
+def per_tree_numpy(forest: "FlatForest", X: np.ndarray) -> np.ndarray:
+    """Duyệt mọi cây cùng lúc: mỗi bước là một phép gather trên ma trận chỉ số (n_trees, rows).
+
+    Lá trỏ về chính nó nên chạy đủ `max(depths)` bước cho mọi cây vẫn cho kết quả đúng.
+    """
+    out = np.empty((forest.n_trees, X.shape[0]), dtype=np.float64)
+    steps = int(forest.depths.max()) if forest.n_trees else 0
+    roots = np.asarray(forest.roots, dtype=np.intp)[:, None]
+    for start in range(0, X.shape[0], NUMPY_ROW_CHUNK):
+        chunk = X[start:start + NUMPY_ROW_CHUNK]
+        rows = np.arange(chunk.shape[0])[None, :]
+        idx = np.repeat(roots, chunk.shape[0], axis=1)
+        for _ in range(steps):
+            go_left = chunk[rows, forest.feature[idx]] <= forest.threshold[idx]
+            idx = np.where(go_left, forest.left[idx], forest.right[idx])
+        out[:, start:start + chunk.shape[0]] = forest.value[idx]
+    return out
+
+
+def per_tree_numba(forest: "FlatForest", X: np.ndarray) -> np.ndarray:
+    out = np.empty((forest.n_trees, X.shape[0]), dtype=np.float64)
+    _numba_walk()(forest.feature, forest.threshold, forest.left, forest.right, forest.value, forest.roots, X, out)
+    return out
+
+
+@dataclass(frozen=True)
+class FlatForest:
+    """Random forest hồi quy dưới dạng các mảng node phẳng, nối liền của mọi cây.
+
+    Node `i` so sánh `X[:, feature[i]] <= threshold[i]` rồi sang `left[i]`/`right[i]` (chỉ số
+    tuyệt đối). Lá trỏ về chính nó nên duyệt đủ `depths[t]` bước luôn dừng ở lá; `value[i]` là
+    giá trị dự báo của lá. Các mảng có thể là memmap chỉ đọc, dùng chung page cache giữa các worker.
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    depths: np.ndarray
+    feature_names: Tuple[str, ...]
+    evaluator: str = "numpy"
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.feature)
+
+    def per_tree(self, X: np.ndarray) -> np.ndarray:
+        """Dự báo của từng cây, shape (n_trees, n_rows).
+
+        X được so sánh ở float32 như sklearn nên kết quả trùng khớp `model.predict`.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.evaluator == "numba":
+            return per_tree_numba(self, X)
+        return per_tree_numpy(self, X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.per_tree(X).mean(axis=0)
+
+
+def compile_forest(model, evaluator: str = "numpy") -> FlatForest:
+    """Chuyển RandomForestRegressor (một output) đã huấn luyện sang FlatForest."""
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Chỉ hỗ trợ mô hình một output")
+
+    trees = [est.tree_ for est in model.estimators_]
+    counts = np.array([t.node_count for t in trees], dtype=np.int64)
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int32)
+    total = int(counts.sum())
+
+    feature = np.empty(total, dtype=np.int32)
+    threshold = np.empty(total, dtype=np.float64)
+    left = np.empty(total, dtype=np.int32)
+    right = np.empty(total, dtype=np.int32)
+    value = np.empty(total, dtype=np.float64)
+    for tree, start in zip(trees, roots):
+        end = start + tree.node_count
+        own = np.arange(start, end, dtype=np.int32)
+        is_leaf = tree.children_left < 0
+        feature[start:end] = np.where(is_leaf, 0, tree.feature)
+        threshold[start:end] = tree.threshold
+        left[start:end] = np.where(is_leaf, own, tree.children_left + start)
+        right[start:end] = np.where(is_leaf, own, tree.children_right + start)
+        value[start:end] = tree.value[:, 0, 0]
+
+    names = getattr(model, "feature_names_in_", None)
+    return FlatForest(
+        feature=feature,
+        threshold=threshold,
+        left=left,
+        right=right,
+        value=value,
+        roots=roots,
+        depths=np.array([t.max_depth for t in trees], dtype=np.int32),
+        feature_names=tuple(str(n) for n in names) if names is not None else (),
+        evaluator=resolve_evaluator(evaluator),
+    )
+
+
+def save_flat(forest: FlatForest, directory: str, source_checksum: Optional[str] = None) -> None:
+    """Ghi FlatForest thành các file .npy trong `directory` (ghi vào thư mục tạm rồi đổi tên).
+
+    Nếu `directory` đã tồn tại (một worker khác vừa ghi xong) thì giữ bản đó.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    tmp = tempfile.mkdtemp(prefix=".flat-", dir=parent)
+    try:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(forest, name))
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "n_trees": forest.n_trees,
+            "node_count": forest.node_count,
+            "feature_names": list(forest.feature_names),
+            "source_checksum": source_checksum,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp, directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_flat(directory: str, mmap: bool = True, evaluator: str = "numpy") -> FlatForest:
+    """Đọc FlatForest; với `mmap=True` các mảng là memmap chỉ đọc (không copy vào heap)."""
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Phiên bản định dạng không hỗ trợ: {meta.get('format_version')}")
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in ARRAYS
+    }
+    return FlatForest(feature_names=tuple(meta["feature_names"]), evaluator=resolve_evaluator(evaluator), **arrays)
@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.last_value import last_values
+from src.crud.du_lieu_du_bao import create_du_lieu_du_bao_bulk, get_forecast_inputs_for_pumps, get_latest_forecast_keys
+from src.core.config import settings
+from src.schemas.du_lieu_du_bao import ForecastOut
+from src.predict.correction import correction_arrays, pump_corrections
+from src.predict.ensemble import feature_matrix, forest_predict_intervals_async
+from src.predict.forecast_cache import forecast_cache
+
+MO_HINH_RF = "RandomForest"
+
+
+async def forecast_pumps(
+    db: AsyncSession,
+    pumps: List,
+    ma_mo_hinh: int,
+    model,
+    version: str,
+    skip_unchanged: bool = False,
+) -> Tuple[List[ForecastOut], List[int]]:
+    """Dự báo cho nhiều máy bơm: một truy vấn lấy dữ liệu tham chiếu, một lần gọi mô hình,
+    một câu INSERT cho toàn bộ kết quả.
+
+    Mỗi dòng lưu khoá đầu vào (bản ghi cảm biến tham chiếu, phiên bản mô hình `version`). Máy bơm
+    có khoá trong `forecast_cache` dùng lại dự báo đã lưu, không chạy mô hình. Với `skip_unchanged`,
+    máy bơm có khoá trùng với dự báo trong cache hoặc dự báo mới nhất đã lưu của mô hình bị bỏ qua
+    (không có trong cả hai danh sách trả về). Trả về (dự báo theo thứ tự `pumps`, mã các máy bơm
+    không có dữ liệu cảm biến).
+    """
+    now = datetime.now()
+    owners = {p.ma_may_bom: p.ma_nguoi_dung for p in pumps}
+    ids = list(owners)
+
+    readings: Dict[int, object] = {}
+    for row in await get_forecast_inputs_for_pumps(db, ids, now):
+        if row.ma_du_lieu is not None:
+            readings[row.ma_may_bom] = row
+
+    # Không có bản ghi trước thời điểm bật máy: dùng bản ghi mới nhất, như predict_flow
+    no_ref = [ma for ma in ids if ma not in readings]
+    if no_ref:
+        readings.update(await last_values.get_many(db, no_ref))
+
+    missing = [ma for ma in ids if ma not in readings]
+    keys = {ma: (ma, readings[ma].ma_du_lieu, version) for ma in ids if ma in readings}
+    results: Dict[int, ForecastOut] = {}
+    for ma, key in keys.items():
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            results[ma] = cached
+    order = [ma for ma in keys if ma not in results]
+    if skip_unchanged:
+        results = {}
+        stored = await get_latest_forecast_keys(db, order, ma_mo_hinh)
+        order = [ma for ma in order if stored.get(ma) != keys[ma][1:]]
+    if not order:
+        return [results[ma] for ma in keys if ma in results], missing
+
+    flows, confidences, (p10, p50, p90) = await forest_predict_intervals_async(
+        ma_mo_hinh, model, feature_matrix(readings[ma] for ma in order)
+    )
+    raw = [None] * len(order)
+    if settings.PUMP_CORRECTION_ENABLED:
+        corrections = await pump_corrections.get_many(db, ma_mo_hinh, order)
+        if corrections:
+            intercept, slope, has = correction_arrays(corrections, order)
+            raw = [float(v) if h else None for v, h in zip(flows, has)]
+            flows, p10, p50, p90 = (np.maximum(intercept + slope * v, 0.0) for v in (flows, p10, p50, p90))
+    rows = [
+        {
+            "mo_hinh": MO_HINH_RF,
+            "thoi_diem_du_bao": now,
+            "luu_luong_du_bao": float(flow),
+            "do_tin_cay": float(conf),
+            "luu_luong_p10": float(lo),
+            "luu_luong_p50": float(mid),
+            "luu_luong_p90": float(hi),
+            "luu_luong_goc": goc,
+            "ma_nguoi_dung": owners[ma],
+            "ma_may_bom": ma,
+            "ma_mo_hinh": ma_mo_hinh,
+            "ma_du_lieu_tham_chieu": readings[ma].ma_du_lieu,
+            "phien_ban_mo_hinh": version,
+        }
+        for ma, flow, conf, lo, mid, hi, goc in zip(order, flows, confidences, p10, p50, p90, raw)
+    ]
+    for row in await create_du_lieu_du_bao_bulk(db, rows):
+        result = ForecastOut.from_orm(row)
+        forecast_cache.put(keys[row.ma_may_bom], result)
+        results[row.ma_may_bom] = result
+    return [results[ma] for ma in keys if ma in results], missing
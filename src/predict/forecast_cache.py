@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from src.core.config import settings
+from src.predict.registry import registry
+
+# (ma_may_bom, ma_du_lieu của bản ghi cảm biến tham chiếu, phiên bản mô hình)
+CacheKey = Tuple[int, int, str]
+
+
+class ForecastCache:
+    """Kết quả dự báo gần nhất theo (máy bơm, bản ghi cảm biến tham chiếu, phiên bản mô hình), LRU.
+
+    Khi đầu vào và mô hình không đổi (người dùng bấm làm mới), `predict_flow` và `forecast_pumps`
+    (dự báo hàng loạt, job định kỳ) trả lại dự báo đã lưu thay vì chạy mô hình và INSERT thêm dòng.
+    Bản ghi cảm biến mới làm đổi `ma_du_lieu` tham chiếu; bản ghi bị sửa thì gọi `invalidate_pump`,
+    mô hình nạp lại thì `invalidate_model`.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[CacheKey, Any]" = OrderedDict()
+        self._by_pump: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._by_pump.setdefault(key[0], set()).add(key)
+            while len(self._items) > self.max_entries:
+                self._discard(next(iter(self._items)))
+
+    def _discard(self, key: CacheKey) -> None:
+        self._items.pop(key, None)
+        keys = self._by_pump.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_pump[key[0]]
+
+    def invalidate_pump(self, ma_may_bom: int) -> None:
+        with self._lock:
+            for key in list(self._by_pump.get(ma_may_bom, ())):
+                self._discard(key)
+
+    def invalidate_model(self, ma_mo_hinh: Optional[int] = None) -> None:
+        with self._lock:
+            if ma_mo_hinh is None:
+                self._items.clear()
+                self._by_pump.clear()
+                return
+            prefix = f"{ma_mo_hinh}:"
+            for key in [k for k in self._items if k[2].startswith(prefix)]:
+                self._discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+forecast_cache = ForecastCache(settings.FORECAST_CACHE_MAX_ENTRIES)
+registry.add_reload_listener(forecast_cache.invalidate_model)
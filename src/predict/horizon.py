@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.core.last_value import last_values
+from src.crud.du_bao_theo_gio import get_hourly_feature_profile
+from src.predict.correction import pump_corrections
+from src.predict.ensemble import FEATURES, forest_predict_intervals_async
+
+# Số ngày dữ liệu gần đây dùng để dựng biên dạng theo giờ trong ngày của đặc trưng
+PROFILE_LOOKBACK = timedelta(days=7)
+# Độ lệch của bản ghi mới nhất so với biên dạng giảm dần theo hệ số này mỗi giờ
+ANCHOR_DECAY = 0.85
+
+
+def hourly_profile(rows: Sequence) -> np.ndarray:
+    """Ma trận (24, len(FEATURES)) trung bình đặc trưng theo giờ; giờ không có dữ liệu là NaN."""
+    profile = np.full((24, len(FEATURES)), np.nan)
+    for r in rows:
+        profile[int(r.gio)] = [np.nan if getattr(r, f) is None else float(getattr(r, f)) for f in FEATURES]
+    return profile
+
+
+def build_horizon_features(
+    latest: np.ndarray,
+    latest_hour: int,
+    profile: np.ndarray,
+    start: datetime,
+    steps: int,
+    decay: float = ANCHOR_DECAY,
+) -> np.ndarray:
+    """Đặc trưng cho `steps` giờ bắt đầu từ `start`, dựng một lần cho cả chuỗi (direct, không đệ quy).
+
+    Giờ thứ k = biên dạng tại giờ trong ngày tương ứng + (bản ghi mới nhất - biên dạng tại giờ của
+    nó) * decay^(k+1). Giờ chưa có biên dạng dùng nguyên giá trị mới nhất (đã gồm độ lệch, nên không
+    cộng thêm); đặc trưng không âm.
+    """
+    latest = np.asarray(latest, dtype=np.float64)
+    hours = (start.hour + np.arange(steps)) % 24
+    base = profile[hours]
+    missing = np.isnan(base)
+    offset = np.nan_to_num(latest - profile[latest_hour % 24], nan=0.0)
+    weights = np.power(decay, np.arange(1, steps + 1))[:, None]
+    X = np.where(missing, latest, base + offset * weights)
+    return np.maximum(X, 0.0).astype(np.float32)
+
+
+def next_hour(t: datetime) -> datetime:
+    return t.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+
+async def forecast_horizon(
+    db: AsyncSession,
+    ma_may_bom: int,
+    ma_mo_hinh: int,
+    model,
+    steps: int = 24,
+    now: Optional[datetime] = None,
+) -> Optional[Tuple[datetime, np.ndarray, np.ndarray, np.ndarray]]:
+    """(thời điểm bắt đầu, lưu lượng, độ tin cậy, phân vị (3, steps)) theo từng giờ; None nếu máy bơm
+    chưa có dữ liệu.
+
+    Toàn bộ `steps` dòng đặc trưng được đánh giá trong một lần gọi mô hình.
+    """
+    now = now or datetime.now()
+    readings = await last_values.get_many(db, [ma_may_bom])
+    reading = readings.get(ma_may_bom)
+    if reading is None:
+        return None
+
+    profile = hourly_profile(await get_hourly_feature_profile(db, ma_may_bom, now - PROFILE_LOOKBACK))
+    latest = np.array([getattr(reading, f, None) or 0 for f in FEATURES], dtype=np.float64)
+    latest_hour = (reading.thoi_gian_tao or now).hour
+    start = next_hour(now)
+    X = build_horizon_features(latest, latest_hour, profile, start, steps)
+    flows, confidences, quantiles = await forest_predict_intervals_async(ma_mo_hinh, model, X)
+    if settings.PUMP_CORRECTION_ENABLED:
+        correction = await pump_corrections.get(db, ma_mo_hinh, ma_may_bom)
+        if correction is not None:
+            flows, quantiles = correction.apply(flows), correction.apply(quantiles)
+    return start, flows, confidences, quantiles
@@ -0,0 +1,240 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.core.last_value import last_values
+from src.crud.du_bao_theo_gio import get_latest_hourly_forecasts
+from src.crud.du_lieu_cam_bien import get_hourly_soil_moisture_rollups
+from src.crud.lich_tuoi import create_lich_tuoi_bulk, list_irrigation_configs
+from src.crud.nhat_ky_may_bom import list_runs_between
+from src.predict.baseline import FleetBaseline, baseline_store, rollup_matrix
+from src.predict.horizon import next_hour
+
+
+def allowed_hours(
+    gio_bat_dau: np.ndarray,
+    gio_ket_thuc: np.ndarray,
+    restricted: np.ndarray,
+    start: datetime,
+    steps: int,
+) -> np.ndarray:
+    """Ma trận (P, steps) các giờ được phép bơm theo cửa sổ [gio_bat_dau, gio_ket_thuc) của cấu hình.
+
+    Cửa sổ qua nửa đêm khi gio_bat_dau > gio_ket_thuc. Máy bơm không giới hạn thời gian hoặc có
+    gio_bat_dau == gio_ket_thuc (cấu hình mặc định 0/0) được bơm mọi giờ.
+    """
+    a = (np.asarray(gio_bat_dau, dtype=np.int64) % 24)[:, None]
+    b = (np.asarray(gio_ket_thuc, dtype=np.int64) % 24)[:, None]
+    hod = ((start.hour + np.arange(steps)) % 24)[None, :]
+    inside = np.where(a <= b, (hod >= a) & (hod < b), (hod >= a) | (hod < b))
+    unrestricted = (~np.asarray(restricted, dtype=bool)) | (a[:, 0] == b[:, 0])
+    return inside | unrestricted[:, None]
+
+
+def pumping_matrix(runs: pd.DataFrame, pumps: np.ndarray, start: datetime, hours: int, now: datetime) -> np.ndarray:
+    """Ma trận (P, hours): giờ có máy bơm chạy theo nhat_ky_may_bom (lần đang bơm tính đến `now`)."""
+    on = np.zeros((len(pumps), hours + 1), dtype=np.int64)
+    if runs.empty or not len(pumps):
+        return on[:, :hours] > 0
+    ma = runs["ma_may_bom"].to_numpy(np.int64)
+    rows = np.minimum(np.searchsorted(pumps, ma), len(pumps) - 1)
+    hour = pd.Timedelta(hours=1)
+    bat = pd.to_datetime(runs["thoi_gian_bat"])
+    tat = pd.to_datetime(runs["thoi_gian_tat"]).fillna(pd.Timestamp(now))
+    h0 = np.clip(((bat - pd.Timestamp(start)) // hour).to_numpy(np.int64), 0, hours)
+    h1 = np.clip(((tat - pd.Timestamp(start)) // hour).to_numpy(np.int64) + 1, 0, hours)
+    keep = (pumps[rows] == ma) & (h1 > h0)
+    np.add.at(on, (rows[keep], h0[keep]), 1)
+    np.add.at(on, (rows[keep], h1[keep]), -1)
+    return np.cumsum(on[:, :hours], axis=1) > 0
+
+
+def moisture_rates(
+    moisture: np.ndarray,
+    on: np.ndarray,
+    default_drain: float,
+    default_gain: float,
+    min_samples: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(mức giảm độ ẩm mỗi giờ không bơm, mức tăng mỗi giờ bơm) của từng máy bơm từ lịch sử theo giờ.
+
+    Giảm = trung bình độ giảm giữa hai giờ liền nhau đều không bơm; tăng = trung bình độ thay đổi
+    trong giờ có bơm cộng mức giảm. Máy bơm chưa đủ `min_samples` cặp giờ dùng giá trị mặc định.
+    """
+    dm = np.diff(moisture, axis=1)
+    valid = ~np.isnan(dm)
+    idle = valid & ~on[:, :-1] & ~on[:, 1:]
+    pumping = valid & on[:, :-1]
+    dm = np.nan_to_num(dm)
+    n_idle, n_pumping = idle.sum(axis=1), pumping.sum(axis=1)
+    drain = np.maximum(-(dm * idle).sum(axis=1) / np.maximum(n_idle, 1), 0.0)
+    drain = np.where(n_idle >= min_samples, drain, default_drain)
+    gain = (dm * pumping).sum(axis=1) / np.maximum(n_pumping, 1) + drain
+    gain = np.where((n_pumping >= min_samples) & (gain > 0), gain, default_gain)
+    return drain, gain
+
+
+def plan_irrigation(
+    m0: np.ndarray,
+    drain: np.ndarray,
+    gain: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    allowed: np.ndarray,
+    cost: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lịch bơm giữ độ ẩm đất trong [lo, hi] với chi phí thấp nhất; trả về (tỉ lệ giờ bơm (P, H),
+    độ ẩm dự kiến cuối mỗi giờ (P, H), đạt ngưỡng (P,)).
+
+    Độ ẩm giảm `drain` mỗi giờ và tăng thêm `gain` mỗi giờ bơm; bơm một giờ tốn `cost` (P, H) (lưu
+    lượng dự báo của giờ đó; None hoặc NaN là 0). Lượt xuôi tham lam: khi độ ẩm cuối giờ t xuống
+    dưới `lo`, bù phần thiếu bằng giờ được phép rẻ nhất trong [0, t] còn chỗ (chưa bơm trọn giờ và
+    không đẩy các giờ bơm từ đó tới t vượt `hi`); cùng chi phí thì chọn giờ muộn nhất, nên không tưới
+    sớm hơn cần. Không đạt ngưỡng khi độ ẩm xuống dưới `lo` hoặc vượt `hi` ở giờ bơm (cửa sổ quá
+    ngắn). Mỗi bước tính cho mọi máy bơm cùng lúc.
+    """
+    P, H = allowed.shape
+    m0 = np.asarray(m0, dtype=np.float64)
+    cost = np.zeros((P, H)) if cost is None else np.nan_to_num(np.asarray(cost, dtype=np.float64), nan=0.0)
+    # Độ ẩm cuối mỗi giờ nếu không bơm
+    dry = m0[:, None] - drain[:, None] * np.arange(1, H + 1)
+    rows = np.arange(P)
+    x = np.zeros((P, H))
+    for t in range(H):
+        # Mỗi vòng hoặc bù hết phần thiếu, hoặc dùng hết chỗ của một giờ
+        for _ in range(t + 2):
+            level = dry[:, :t + 1] + gain[:, None] * np.cumsum(x[:, :t + 1], axis=1)
+            deficit = lo - level[:, t]
+            # Bơm thêm ở giờ s nâng độ ẩm mọi giờ từ s: chỗ còn lại theo `hi` là min trên giờ s và
+            # các giờ đang bơm sau s
+            slack = np.where(x[:, :t + 1] > 0, hi[:, None] - level, np.inf)
+            room = np.minimum(np.minimum.accumulate(slack[:, ::-1], axis=1)[:, ::-1], hi[:, None] - level)
+            cap = np.minimum(1.0 - x[:, :t + 1], room / gain[:, None])
+            eligible = allowed[:, :t + 1] & (cap > 1e-9) & (deficit > 1e-9)[:, None]
+            if not eligible.any():
+                break
+            c = np.where(eligible, cost[:, :t + 1], np.inf)
+            s = t - np.argmin(c[:, ::-1], axis=1)
+            x[rows, s] += np.where(eligible[rows, s], np.minimum(deficit / gain, cap[rows, s]), 0.0)
+
+    moisture = np.empty((P, H))
+    m = m0.copy()
+    for t in range(H):
+        m = np.maximum(m - drain + gain * x[:, t], 0.0)
+        moisture[:, t] = m
+    over = (x > 0) & (moisture > hi[:, None] + 1e-9)
+    feasible = (moisture >= lo[:, None] - 1e-9).all(axis=1) & ~over.any(axis=1)
+    return x, moisture, feasible
+
+
+def forecast_flow_matrix(forecasts: List, pumps: np.ndarray, start: datetime, steps: int) -> np.ndarray:
+    """Lưu lượng dự báo (P, steps) theo giờ từ `start` lấy từ các dòng du_bao_theo_gio; giờ sau cuối
+    chuỗi dùng giá trị cuối, máy bơm không có dự báo là NaN."""
+    flows = np.full((len(pumps), steps), np.nan)
+    index = {int(p): i for i, p in enumerate(pumps)}
+    for r in forecasts:
+        if r.buoc_phut != 60 or not r.luu_luong:
+            continue
+        bat_dau = r.thoi_diem_bat_dau.replace(tzinfo=None)
+        offset = int((start - bat_dau) // timedelta(hours=1))
+        values = np.asarray(r.luu_luong, dtype=np.float64)
+        idx = np.clip(offset + np.arange(steps), 0, len(values) - 1)
+        if offset < len(values):
+            flows[index[r.ma_may_bom]] = values[idx]
+    return flows
+
+
+def fill_missing_flows(flows: np.ndarray, pumps: np.ndarray, start: datetime, baseline: FleetBaseline) -> np.ndarray:
+    """Máy bơm chưa có dự báo theo giờ (dòng NaN) lấy dự báo của mô hình cơ sở Holt-Winters."""
+    flows = flows.copy()
+    for i in np.flatnonzero(np.isnan(flows).any(axis=1)):
+        result = baseline.forecast(int(pumps[i]), start, flows.shape[1])
+        if result is not None:
+            flows[i] = result[0]
+    return flows
+
+
+async def plan_fleet(db: AsyncSession, now: Optional[datetime] = None, steps: Optional[int] = None) -> int:
+    """Lập lịch tưới cho mọi máy bơm có cấu hình ngưỡng độ ẩm; trả về số lịch đã lưu.
+
+    Mỗi bước (cấu hình, lịch sử độ ẩm, nhật ký bơm, độ ẩm hiện tại, dự báo theo giờ) là một truy vấn
+    cho cả đội máy bơm; việc lập lịch chạy trên các ma trận (máy bơm × giờ). Lưu lượng dự báo theo giờ
+    (du_bao_theo_gio, không có thì mô hình cơ sở) là chi phí của từng giờ bơm.
+    """
+    now = now or datetime.now()
+    steps = steps or settings.IRRIGATION_PLAN_HOURS
+    configs = pd.DataFrame.from_records(
+        await list_irrigation_configs(db),
+        columns=["ma_may_bom", "gioi_han_thoi_gian", "do_am_toi_thieu", "do_am_toi_da", "gio_bat_dau", "gio_ket_thuc"],
+    )
+    if configs.empty:
+        return 0
+    pumps = configs["ma_may_bom"].to_numpy(np.int64)
+
+    start = next_hour(now)
+    history = start - timedelta(days=settings.IRRIGATION_HISTORY_DAYS)
+    hours = settings.IRRIGATION_HISTORY_DAYS * 24
+    rollups = pd.DataFrame.from_records(
+        await get_hourly_soil_moisture_rollups(db, history, start), columns=["ma_may_bom", "gio", "do_am_dat"]
+    )
+    _, moisture = rollup_matrix(rollups, history, hours, pumps)
+    runs = pd.DataFrame.from_records(
+        await list_runs_between(db, history, start), columns=["ma_may_bom", "thoi_gian_bat", "thoi_gian_tat"]
+    )
+    on = pumping_matrix(runs, pumps, history, hours, now)
+    drain, gain = moisture_rates(
+        moisture, on, settings.IRRIGATION_DRYDOWN_PER_HOUR, settings.IRRIGATION_GAIN_PER_HOUR,
+        settings.IRRIGATION_MIN_SAMPLES,
+    )
+
+    # Độ ẩm hiện tại: bản ghi mới nhất, không có thì giờ gần nhất trong lịch sử
+    readings = await last_values.get_many(db, pumps.tolist())
+    m0 = np.array([
+        np.nan if readings.get(int(p)) is None or readings[int(p)].do_am_dat is None else float(readings[int(p)].do_am_dat)
+        for p in pumps
+    ])
+    m0 = np.where(np.isnan(m0), pd.DataFrame(moisture).ffill(axis=1).iloc[:, -1].to_numpy(), m0)
+    # Độ ẩm đã giảm từ lúc đo đến đầu giờ kế tiếp
+    m0 = m0 - drain * ((start - now) / timedelta(hours=1))
+
+    lo = configs["do_am_toi_thieu"].to_numpy(np.float64)
+    hi = configs["do_am_toi_da"].fillna(0).to_numpy(np.float64)
+    hi = np.where(hi > lo, hi, np.inf)
+    allowed = allowed_hours(
+        configs["gio_bat_dau"].fillna(0).to_numpy(np.int64),
+        configs["gio_ket_thuc"].fillna(0).to_numpy(np.int64),
+        configs["gioi_han_thoi_gian"].fillna(True).to_numpy(bool),
+        start, steps,
+    )
+    plannable = ~np.isnan(m0)
+    pumps = pumps[plannable]
+
+    flows = forecast_flow_matrix(
+        await get_latest_hourly_forecasts(db, pumps.tolist(), now - timedelta(days=1)), pumps, start, steps
+    )
+    # Mô hình cơ sở do job scheduler khớp sẵn; chưa có thì giữ NaN (máy bơm không có chi phí theo giờ)
+    baseline = baseline_store.current()
+    if baseline is not None and np.isnan(flows).any():
+        flows = fill_missing_flows(flows, pumps, start, baseline)
+
+    x, expected, feasible = plan_irrigation(
+        m0[plannable], drain[plannable], gain[plannable], lo[plannable], hi[plannable], allowed[plannable], cost=flows,
+    )
+    minutes = np.ceil(x * 60 - 1e-6)
+    water = np.where(np.isnan(flows).any(axis=1), np.nan, (np.nan_to_num(flows) * minutes / 60).sum(axis=1))
+
+    rows = [
+        {
+            "ma_may_bom": int(pumps[i]),
+            "thoi_diem_bat_dau": start,
+            "buoc_phut": 60,
+            "phut_bom": minutes[i].tolist(),
+            "do_am_du_kien": np.round(expected[i], 3).tolist(),
+            "luong_nuoc_du_kien": None if np.isnan(water[i]) else float(water[i]),
+            "dat_nguong": bool(feasible[i]),
+        }
+        for i in range(len(pumps))
+    ]
+    return await create_lich_tuoi_bulk(db, rows)
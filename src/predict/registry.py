@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import joblib
+from src.core.config import settings
+from src.predict.flat_forest import compile_forest, load_flat, save_flat
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT = "mo_hinh_random_forest.joblib"
+
+
+def _checksum(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass
+class LoadedModel:
+    ma_mo_hinh: int
+    model: Any
+    path: str
+    mtime: float
+    size: int
+    checksum: str
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def version(self) -> str:
+        """Định danh phiên bản artifact: đổi khi file mô hình thay đổi nội dung."""
+        return f"{self.ma_mo_hinh}:{self.checksum[:12]}"
+
+
+class ModelRegistry:
+    """Nạp mô hình dự báo một lần cho mỗi process, khoá theo `MoHinhDuBao.ma_mo_hinh`.
+
+    Artifact của mô hình `n` là `mo_hinh_{n}.joblib` trong `model_dir`; riêng mô hình mặc định
+    (`default_ma_mo_hinh`) được dùng `mo_hinh_random_forest.joblib` khi chưa có file riêng, mô hình
+    khác thiếu file thì báo FileNotFoundError. Mỗi `check_interval` giây, `get()` kiểm tra
+    mtime/kích thước file; nếu đổi và checksum khác thì nạp lại (hot reload). Trong event loop dùng
+    `aget()`: việc đọc file, tính checksum và nạp mô hình chạy trong thread.
+
+    Với `model_format="flat"`, random forest được chuyển một lần sang các mảng node phẳng
+    (`<artifact>.<checksum>.flat/`) và nạp bằng memmap, nên các worker uvicorn dùng chung page
+    cache thay vì mỗi process giữ một bản sao các cây. Với `"compiled"`, các mảng được dựng trong
+    bộ nhớ, không ghi ra đĩa. Cả hai được đánh giá bằng `evaluator` (numpy, numba hoặc auto).
+    """
+
+    def __init__(
+        self,
+        model_dir: str = MODEL_DIR,
+        check_interval: float = 5.0,
+        model_format: str = "joblib",
+        evaluator: str = "auto",
+        default_ma_mo_hinh: Optional[int] = settings.DEFAULT_MA_MO_HINH,
+    ):
+        self.model_dir = model_dir
+        self.default_ma_mo_hinh = default_ma_mo_hinh
+        self.check_interval = check_interval
+        self.model_format = model_format
+        self.evaluator = evaluator
+        self._models: Dict[int, LoadedModel] = {}
+        self._checked_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._reload_listeners: List[Callable[[Optional[int]], None]] = []
+
+    def add_reload_listener(self, listener: Callable[[Optional[int]], None]) -> None:
+        """Đăng ký hàm được gọi với `ma_mo_hinh` khi mô hình được nạp lại hoặc bị evict (None: tất cả)."""
+        self._reload_listeners.append(listener)
+
+    def _notify_reload(self, ma_mo_hinh: Optional[int]) -> None:
+        for listener in self._reload_listeners:
+            try:
+                listener(ma_mo_hinh)
+            except Exception:
+                logger.exception("Lỗi khi xử lý sự kiện nạp lại mô hình %s", ma_mo_hinh)
+
+    def artifact_path(self, ma_mo_hinh: int) -> str:
+        path = os.path.join(self.model_dir, f"mo_hinh_{ma_mo_hinh}.joblib")
+        if os.path.exists(path):
+            return path
+        if ma_mo_hinh == self.default_ma_mo_hinh:
+            return os.path.join(self.model_dir, DEFAULT_ARTIFACT)
+        raise FileNotFoundError(f"Không có artifact cho mô hình {ma_mo_hinh}: {path}")
+
+    def flat_path(self, path: str, checksum: str) -> str:
+        return f"{os.path.splitext(path)[0]}.{checksum[:12]}.flat"
+
+    def _load_flat(self, path: str, checksum: str) -> Any:
+        flat_dir = self.flat_path(path, checksum)
+        if not os.path.isdir(flat_dir):
+            model = joblib.load(path)
+            if not hasattr(model, "estimators_"):
+                logger.warning("Mô hình %s không phải random forest, dùng joblib", path)
+                return model
+            save_flat(compile_forest(model), flat_dir, checksum)
+        return load_flat(flat_dir, mmap=True, evaluator=self.evaluator)
+
+    def _load_model(self, path: str, checksum: str) -> Any:
+        if self.model_format == "flat":
+            return self._load_flat(path, checksum)
+        model = joblib.load(path)
+        if self.model_format == "compiled" and hasattr(model, "estimators_"):
+            return compile_forest(model, self.evaluator)
+        return model
+
+    def _load(self, ma_mo_hinh: int, path: str, checksum: Optional[str] = None) -> LoadedModel:
+        st = os.stat(path)
+        t0 = time.perf_counter()
+        checksum = checksum or _checksum(path)
+        model = self._load_model(path, checksum)
+        entry = LoadedModel(
+            ma_mo_hinh=ma_mo_hinh,
+            model=model,
+            path=path,
+            mtime=st.st_mtime,
+            size=st.st_size,
+            checksum=checksum,
+        )
+        logger.info("Nạp mô hình %s từ %s (%.0f ms)", entry.version, path, (time.perf_counter() - t0) * 1000)
+        return entry
+
+    def _is_stale(self, entry: LoadedModel, path: str) -> Optional[str]:
+        """Trả về checksum mới nếu artifact đã thay đổi nội dung, ngược lại None."""
+        if path != entry.path:
+            return _checksum(path)
+        st = os.stat(path)
+        if st.st_mtime == entry.mtime and st.st_size == entry.size:
+            return None
+        checksum = _checksum(path)
+        if checksum == entry.checksum:
+            entry.mtime, entry.size = st.st_mtime, st.st_size
+            return None
+        return checksum
+
+    def _cached(self, ma_mo_hinh: int) -> Optional[LoadedModel]:
+        """Bản đã nạp nếu chưa đến lúc kiểm tra lại artifact, ngược lại None."""
+        entry = self._models.get(ma_mo_hinh)
+        if entry is not None and time.monotonic() - self._checked_at.get(ma_mo_hinh, 0) < self.check_interval:
+            return entry
+        return None
+
+    def get(self, ma_mo_hinh: int) -> LoadedModel:
+        entry = self._cached(ma_mo_hinh)
+        if entry is not None:
+            return entry
+        now = time.monotonic()
+
+        reloaded = False
+        with self._lock:
+            entry = self._models.get(ma_mo_hinh)
+            path = self.artifact_path(ma_mo_hinh)
+            if entry is None:
+                entry = self._load(ma_mo_hinh, path)
+            else:
+                checksum = self._is_stale(entry, path)
+                if checksum is not None:
+                    entry = self._load(ma_mo_hinh, path, checksum)
+                    reloaded = True
+            self._models[ma_mo_hinh] = entry
+            self._checked_at[ma_mo_hinh] = now
+        if reloaded:
+            self._notify_reload(ma_mo_hinh)
+        return entry
+
+    async def aget(self, ma_mo_hinh: int) -> LoadedModel:
+        """Như `get()` nhưng stat/checksum/joblib.load chạy trong thread, không chặn event loop."""
+        entry = self._cached(ma_mo_hinh)
+        if entry is not None:
+            return entry
+        return await asyncio.to_thread(self.get, ma_mo_hinh)
+
+    def preload(self, ma_mo_hinh_ids: Iterable[int]) -> None:
+        for ma in ma_mo_hinh_ids:
+            self.get(ma)
+
+    def evict(self, ma_mo_hinh: Optional[int] = None) -> None:
+        with self._lock:
+            if ma_mo_hinh is None:
+                self._models.clear()
+                self._checked_at.clear()
+            else:
+                self._models.pop(ma_mo_hinh, None)
+                self._checked_at.pop(ma_mo_hinh, None)
+        self._notify_reload(ma_mo_hinh)
+
+
+registry = ModelRegistry(settings.MODEL_DIR or MODEL_DIR, settings.MODEL_RELOAD_CHECK_SECONDS, settings.MODEL_FORMAT, settings.MODEL_EVALUATOR)
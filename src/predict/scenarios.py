@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from src.core.config import settings
+from src.predict.ensemble import forest_predict_async
+from src.predict.registry import registry
+
+# (phiên bản mô hình, giá trị các trục theo thứ tự FEATURES)
+ScenarioKey = Tuple[str, Tuple[Tuple[float, ...], ...]]
+
+
+def build_grid(axes: Sequence[np.ndarray]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """Tích Descartes của các trục (theo thứ tự FEATURES) thành ma trận đặc trưng float32 (n, 4).
+
+    Dòng được sắp theo thứ tự C của lưới, nên kết quả reshape về `shape` cho ma trận theo trục.
+    """
+    shape = tuple(len(a) for a in axes)
+    grids = np.meshgrid(*(np.asarray(a, dtype=np.float32) for a in axes), indexing="ij")
+    X = np.stack([g.ravel() for g in grids], axis=1)
+    return X, shape
+
+
+class ScenarioCache:
+    """Kết quả lưới kịch bản theo (phiên bản mô hình, các trục), LRU; xoá theo mô hình khi nạp lại."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[ScenarioKey, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ScenarioKey) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: ScenarioKey, value: Tuple[np.ndarray, np.ndarray]) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate_model(self, ma_mo_hinh: Optional[int] = None) -> None:
+        with self._lock:
+            if ma_mo_hinh is None:
+                self._items.clear()
+                return
+            prefix = f"{ma_mo_hinh}:"
+            for key in [k for k in self._items if k[0].startswith(prefix)]:
+                del self._items[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+scenario_cache = ScenarioCache(settings.SCENARIO_CACHE_MAX_ENTRIES)
+registry.add_reload_listener(scenario_cache.invalidate_model)
+
+
+async def evaluate_scenarios(loaded, axes: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """(lưu lượng, độ tin cậy) dạng mảng có shape theo các trục, và cờ lấy từ cache.
+
+    Cả lưới được đánh giá trong một lần gọi mô hình trên executor suy luận.
+    """
+    key: ScenarioKey = (loaded.version, tuple(tuple(float(v) for v in a) for a in axes))
+    cached = scenario_cache.get(key)
+    if cached is not None:
+        return cached[0], cached[1], True
+
+    X, shape = build_grid(axes)
+    flows, confidences = await forest_predict_async(loaded.ma_mo_hinh, loaded.model, X)
+    result = (flows.astype(np.float32).reshape(shape), confidences.astype(np.float32).reshape(shape))
+    scenario_cache.put(key, result)
+    return result[0], result[1], False
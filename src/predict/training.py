@@ -0,0 +1,369 @@
+"""Huấn luyện mô hình random forest dự báo lưu lượng từ dữ liệu cảm biến trong DB.
+
+Mỗi bản ghi cảm biến có `luu_luong_nuoc` là một mẫu (đặc trưng FEATURES -> lưu lượng). Dữ liệu được
+đọc qua server-side cursor theo lô và chép thẳng vào mảng NumPy cấp phát trước, nên bộ nhớ chỉ phụ
+thuộc `max_rows` (khi bảng lớn hơn, lấy mẫu đều theo `ma_du_lieu`). Artifact `mo_hinh_{id}.joblib`
+được ghi ra file tạm rồi đổi tên, nên registry không bao giờ đọc phải file ghi dở.
+
+Kích thước mô hình không phụ thuộc số dòng: mỗi cây có tối đa `max_leaf_nodes` lá (tức
+2 * max_leaf_nodes - 1 nút), nên cả rừng có tối đa n_estimators * (2 * max_leaf_nodes - 1) nút;
+mặc định 100 cây x 4096 lá, khoảng vài chục MB. `max_samples` giới hạn số dòng bootstrap của mỗi
+cây (thời gian huấn luyện), `min_samples_leaf` tránh các lá chỉ khớp một bản ghi nhiễu.
+
+Công việc huấn luyện chạy từ API được giữ trong bộ nhớ của process (`training_jobs`, tối đa
+TRAINING_JOB_HISTORY công việc), nên service phải chạy với một worker uvicorn (như scheduler).
+Dữ liệu được ghi thẳng vào file .npy tạm và process con huấn luyện đọc bằng memmap, không chép
+mảng qua pipe.
+
+Chạy: python -m src.predict.training --from 2024-01-01 --n-estimators 100
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.config import settings
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+from src.models.mo_hinh_du_bao import MoHinhDuBao
+from src.predict.ensemble import FEATURES
+from src.predict.registry import registry
+
+logger = logging.getLogger(__name__)
+
+TEN_MO_HINH = "RandomForest"
+
+
+@dataclass
+class TrainingParams:
+    tu: Optional[datetime] = None
+    den: Optional[datetime] = None
+    max_rows: int = settings.TRAINING_MAX_ROWS
+    n_estimators: int = 100
+    max_depth: Optional[int] = None
+    # Giới hạn kích thước mô hình (xem docstring module); None bỏ giới hạn
+    max_leaf_nodes: Optional[int] = 4096
+    max_samples: Optional[int] = 1_000_000
+    min_samples_leaf: int = 5
+    validation_fraction: float = 0.1
+    n_jobs: int = -1
+    random_state: int = 42
+    ten_mo_hinh: str = TEN_MO_HINH
+    chunk_size: int = 50_000
+
+
+@dataclass
+class TrainingResult:
+    ma_mo_hinh: int
+    phien_ban: str
+    duong_dan: str
+    so_mau: int
+    buoc_lay_mau: int
+    so_mau_kiem_tra: int
+    mae: Optional[float]
+    rmse: Optional[float]
+    thoi_gian_giay: float
+
+
+def _conditions(params: TrainingParams) -> list:
+    c = DuLieuCamBien
+    conds = [c.luu_luong_nuoc.isnot(None)]
+    if params.tu is not None:
+        conds.append(c.thoi_gian_tao >= params.tu)
+    if params.den is not None:
+        conds.append(c.thoi_gian_tao < params.den)
+    return conds
+
+
+def _fill_block(X: np.ndarray, y: np.ndarray, rows, start: int) -> None:
+    block = np.array(rows, dtype=np.float64)
+    np.nan_to_num(block[:, :-1], copy=False, nan=0.0)
+    X[start:start + len(rows)] = block[:, :-1]
+    y[start:start + len(rows)] = block[:, -1]
+
+
+async def load_training_data(
+    db: AsyncSession, params: TrainingParams, out_dir: Optional[str] = None
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """(X float32, y float64, bước lấy mẫu) theo thứ tự `ma_du_lieu` (xấp xỉ thứ tự thời gian).
+
+    Đếm trước số dòng để cấp phát đúng một lần; nếu vượt `max_rows` thì chỉ lấy các dòng có
+    `ma_du_lieu % buoc == 0`. Giá trị đặc trưng NULL được thay bằng 0 như khi suy luận. Với
+    `out_dir`, mảng là memmap của `X.npy`/`y.npy` trong thư mục đó (cho process con đọc lại).
+    Việc chuyển từng lô sang NumPy chạy trong thread, không chặn event loop.
+    """
+    c = DuLieuCamBien
+    conds = _conditions(params)
+    total = int((await db.execute(select(func.count()).select_from(c).where(*conds))).scalar_one())
+    step = max(1, math.ceil(total / params.max_rows)) if params.max_rows > 0 else 1
+    if step > 1:
+        conds.append(c.ma_du_lieu % step == 0)
+
+    capacity = min(total, params.max_rows) if params.max_rows > 0 else total
+    if out_dir is None:
+        X = np.empty((capacity, len(FEATURES)), dtype=np.float32)
+        y = np.empty(capacity, dtype=np.float64)
+    else:
+        open_memmap = np.lib.format.open_memmap
+        X = open_memmap(os.path.join(out_dir, "X.npy"), mode="w+", dtype=np.float32, shape=(capacity, len(FEATURES)))
+        y = open_memmap(os.path.join(out_dir, "y.npy"), mode="w+", dtype=np.float64, shape=(capacity,))
+    q = (
+        select(*(getattr(c, f) for f in FEATURES), c.luu_luong_nuoc)
+        .where(*conds)
+        .order_by(c.ma_du_lieu)
+        .execution_options(yield_per=params.chunk_size)
+    )
+    filled = 0
+    result = await db.stream(q)
+    async for rows in result.partitions():
+        # Bảng có thể có thêm dòng sau khi đếm: dừng khi đã đầy
+        n = min(len(rows), capacity - filled)
+        if n <= 0:
+            break
+        await asyncio.to_thread(_fill_block, X, y, rows[:n], filled)
+        filled += n
+    await result.close()
+    if out_dir is not None:
+        X.flush()
+        y.flush()
+    return X[:filled], y[:filled], step
+
+
+def fit_forest(X: np.ndarray, y: np.ndarray, params: TrainingParams):
+    """Huấn luyện trên phần đầu, đánh giá trên `validation_fraction` dòng cuối (mới nhất).
+
+    Trả về (model, số mẫu kiểm tra, MAE, RMSE); không có phần kiểm tra thì MAE/RMSE là None.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    n_val = int(len(y) * params.validation_fraction) if len(y) > 1 else 0
+    n_train = len(y) - n_val
+    model = RandomForestRegressor(
+        n_estimators=params.n_estimators,
+        max_depth=params.max_depth,
+        max_leaf_nodes=params.max_leaf_nodes,
+        # sklearn không cho max_samples lớn hơn số dòng huấn luyện
+        max_samples=min(params.max_samples, n_train) if params.max_samples else None,
+        min_samples_leaf=params.min_samples_leaf,
+        n_jobs=params.n_jobs,
+        random_state=params.random_state,
+    )
+    # Bọc mảng (không chép) để mô hình nhớ tên đặc trưng như khi dự báo bằng DataFrame
+    model.fit(pd.DataFrame(X[:n_train], columns=list(FEATURES), copy=False), y[:n_train])
+    if not n_val:
+        return model, 0, None, None
+    pred = model.predict(pd.DataFrame(X[n_train:], columns=list(FEATURES), copy=False))
+    err = pred - y[n_train:]
+    return model, n_val, float(np.abs(err).mean()), float(np.sqrt((err * err).mean()))
+
+
+def _fit_from_files(work_dir: str, n: int, params: TrainingParams):
+    X = np.load(os.path.join(work_dir, "X.npy"), mmap_mode="r")[:n]
+    y = np.load(os.path.join(work_dir, "y.npy"), mmap_mode="r")[:n]
+    return fit_forest(X, y, params)
+
+
+def _fit_in_process(work_dir: str, n: int, params: TrainingParams):
+    """fit_forest trong một process con riêng (spawn), để huấn luyện không tranh GIL với API.
+
+    Process con memmap `n` dòng đầu của `X.npy`/`y.npy` trong `work_dir` (do load_training_data
+    ghi), nên dữ liệu không bị pickle sang process con.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_fit_from_files, work_dir, n, params).result()
+
+
+def _dump_tmp(model, model_dir: str) -> str:
+    """Ghi model ra file tạm trong cùng thư mục với artifact (để os.replace là thao tác nguyên tử)."""
+    fd, tmp = tempfile.mkstemp(prefix=".mo_hinh_", suffix=".joblib.tmp", dir=model_dir)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            joblib.dump(model, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
+
+
+async def register_model(db: AsyncSession, model, params: TrainingParams, phien_ban: str) -> Tuple[int, str]:
+    """Tạo dòng MoHinhDuBao và đặt artifact vào `mo_hinh_{id}.joblib`; trả về (ma_mo_hinh, đường dẫn)."""
+    model_dir = registry.model_dir
+    tmp = await asyncio.to_thread(_dump_tmp, model, model_dir)
+    path = None
+    try:
+        obj = MoHinhDuBao(ten_mo_hinh=params.ten_mo_hinh, phien_ban=phien_ban, trang_thai=True, thoi_gian_tao=datetime.now())
+        db.add(obj)
+        await db.flush()
+        path = os.path.join(model_dir, f"mo_hinh_{obj.ma_mo_hinh}.joblib")
+        os.replace(tmp, path)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        for p in (tmp, path):
+            if p and os.path.exists(p):
+                os.unlink(p)
+        raise
+    return obj.ma_mo_hinh, path
+
+
+async def train_model(db: AsyncSession, params: TrainingParams, in_process: bool = False) -> TrainingResult:
+    """Đọc dữ liệu, huấn luyện và đăng ký mô hình mới.
+
+    Với `in_process`, phần huấn luyện chạy trong process con (dùng khi gọi từ API); mặc định chạy
+    trên một thread của process hiện tại.
+    """
+    t0 = time.perf_counter()
+    work = tempfile.TemporaryDirectory(prefix="huan_luyen_") if in_process else contextlib.nullcontext()
+    with work as work_dir:
+        X, y, step = await load_training_data(db, params, work_dir)
+        n = len(y)
+        if not n:
+            raise ValueError("Không có dữ liệu cảm biến có lưu lượng để huấn luyện")
+        logger.info("Huấn luyện trên %d mẫu (bước lấy mẫu %d)", n, step)
+        # Giải phóng kết nối trong lúc huấn luyện (có thể mất nhiều phút)
+        await db.rollback()
+        if work_dir is None:
+            model, n_val, mae, rmse = await asyncio.to_thread(fit_forest, X, y, params)
+        else:
+            del X, y
+            model, n_val, mae, rmse = await asyncio.to_thread(_fit_in_process, work_dir, n, params)
+
+    phien_ban = datetime.now().strftime("%Y%m%d%H%M%S")
+    ma_mo_hinh, path = await register_model(db, model, params, phien_ban)
+    result = TrainingResult(
+        ma_mo_hinh=ma_mo_hinh,
+        phien_ban=phien_ban,
+        duong_dan=path,
+        so_mau=n,
+        buoc_lay_mau=step,
+        so_mau_kiem_tra=n_val,
+        mae=mae,
+        rmse=rmse,
+        thoi_gian_giay=time.perf_counter() - t0,
+    )
+    logger.info("Đã huấn luyện mô hình %s (phiên bản %s): MAE=%s RMSE=%s", ma_mo_hinh, phien_ban, mae, rmse)
+    return result
+
+
+@dataclass
+class TrainingJob:
+    ma_cong_viec: str
+    tham_so: Dict
+    trang_thai: str = "PENDING"
+    thoi_gian_bat_dau: datetime = field(default_factory=datetime.now)
+    thoi_gian_ket_thuc: Optional[datetime] = None
+    ket_qua: Optional[Dict] = None
+    loi: Optional[str] = None
+
+
+# Công việc huấn luyện trong process hiện tại (chỉ cho phép một công việc chạy cùng lúc). Không dùng
+# chung giữa các process: service chạy một worker uvicorn.
+training_jobs: Dict[str, TrainingJob] = {}
+
+
+def running_job() -> Optional[TrainingJob]:
+    return next((j for j in training_jobs.values() if j.trang_thai in ("PENDING", "RUNNING")), None)
+
+
+def create_job(params: TrainingParams, history: int = settings.TRAINING_JOB_HISTORY) -> TrainingJob:
+    """Tạo công việc mới; chỉ giữ `history` công việc gần nhất (công việc đang chạy luôn được giữ)."""
+    job = TrainingJob(ma_cong_viec=uuid.uuid4().hex, tham_so=asdict(params))
+    training_jobs[job.ma_cong_viec] = job
+    finished = [k for k, j in training_jobs.items() if j.trang_thai not in ("PENDING", "RUNNING")]
+    for k in finished[:max(0, len(training_jobs) - history)]:
+        del training_jobs[k]
+    return job
+
+
+async def run_training_job(job: TrainingJob, params: TrainingParams) -> None:
+    """Chạy huấn luyện trong nền với session riêng, rồi báo kết quả cho quản trị viên.
+
+    Phần huấn luyện chạy trong process con với `params.n_jobs` (TRAINING_N_JOBS) lõi, nên process API
+    vẫn phục vụ request trong lúc huấn luyện.
+    """
+    from src.core.db import AsyncSessionLocal
+    from src.crud.nguoi_dung import get_all_admins
+    from src.crud.thong_bao import create_notification
+
+    job.trang_thai = "RUNNING"
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await train_model(db, params, in_process=True)
+            job.ket_qua = asdict(result)
+            job.trang_thai = "SUCCESS"
+            for admin in await get_all_admins(db):
+                await create_notification(
+                    db=db,
+                    ma_nguoi_dung=admin.ma_nguoi_dung,
+                    loai="INFO",
+                    muc_do="MEDIUM",
+                    tieu_de="Huấn luyện mô hình dự báo hoàn tất",
+                    noi_dung=f"Mô hình '{params.ten_mo_hinh}' phiên bản {result.phien_ban} (mã {result.ma_mo_hinh}) đã được huấn luyện trên {result.so_mau} mẫu.",
+                    du_lieu_lien_quan={"ma_mo_hinh": result.ma_mo_hinh, "mae": result.mae, "rmse": result.rmse},
+                )
+            await db.commit()
+    except Exception as e:
+        logger.exception("Lỗi khi huấn luyện mô hình")
+        job.trang_thai = "FAILED"
+        job.loi = str(e)
+    finally:
+        job.thoi_gian_ket_thuc = datetime.now()
+
+
+async def _main(args) -> None:
+    from src.core.db import AsyncSessionLocal
+
+    params = TrainingParams(
+        tu=args.tu,
+        den=args.den,
+        max_rows=args.max_rows,
+        n_estimators=args.n_estimators,
+        max_depth=args.max_depth,
+        max_leaf_nodes=args.max_leaf_nodes or None,
+        max_samples=args.max_samples or None,
+        min_samples_leaf=args.min_samples_leaf,
+        validation_fraction=args.validation_fraction,
+        n_jobs=args.n_jobs,
+        ten_mo_hinh=args.ten_mo_hinh,
+    )
+    async with AsyncSessionLocal() as db:
+        result = await train_model(db, params)
+    for k, v in asdict(result).items():
+        print(f"{k}: {v}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Huấn luyện mô hình random forest dự báo lưu lượng từ dữ liệu cảm biến")
+    parser.add_argument("--from", dest="tu", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--to", dest="den", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--max-rows", type=int, default=settings.TRAINING_MAX_ROWS)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--max-leaf-nodes", type=int, default=TrainingParams.max_leaf_nodes, help="Số lá tối đa mỗi cây (0: không giới hạn)")
+    parser.add_argument("--max-samples", type=int, default=TrainingParams.max_samples, help="Số dòng bootstrap tối đa mỗi cây (0: toàn bộ)")
+    parser.add_argument("--min-samples-leaf", type=int, default=TrainingParams.min_samples_leaf)
+    parser.add_argument("--validation-fraction", type=float, default=0.1)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Số lõi dùng khi huấn luyện (-1: mọi lõi)")
+    parser.add_argument("--ten-mo-hinh", default=TEN_MO_HINH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class ForecastCreate(BaseModel):
@@ -18,9 +18,70 @@ class ForecastOut(BaseModel):
     thoi_diem_du_bao: Optional[datetime]
     luu_luong_du_bao: Optional[float] = 0
     do_tin_cay: Optional[float] = 0
+    luu_luong_p10: Optional[float] = None
+    luu_luong_p50: Optional[float] = None
+    luu_luong_p90: Optional[float] = None
     thoi_gian_tao: Optional[datetime]
     ma_nguoi_dung: UUID
     ma_may_bom: int
+    ma_mo_hinh: Optional[int] = None
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+
+class ForecastBatchRequest(BaseModel):
+    ma_may_bom: List[int] = Field(..., min_length=1, max_length=1000)
+    ma_mo_hinh: Optional[int] = None
+
+
+class HorizonForecastOut(BaseModel):
+    ma_du_bao_theo_gio: int
+    ma_may_bom: int
+    ma_mo_hinh: Optional[int] = None
+    mo_hinh: Optional[str] = None
+    thoi_diem_bat_dau: datetime
+    buoc_phut: int
+    thoi_diem: List[datetime]
+    luu_luong: List[float]
+    do_tin_cay: List[float]
+    luu_luong_p10: Optional[List[float]] = None
+    luu_luong_p50: Optional[List[float]] = None
+    luu_luong_p90: Optional[List[float]] = None
+    thoi_gian_tao: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row) -> "HorizonForecastOut":
+        step = timedelta(minutes=row.buoc_phut)
+        return cls(
+            ma_du_bao_theo_gio=row.ma_du_bao_theo_gio,
+            ma_may_bom=row.ma_may_bom,
+            ma_mo_hinh=row.ma_mo_hinh,
+            mo_hinh=row.mo_hinh,
+            thoi_diem_bat_dau=row.thoi_diem_bat_dau,
+            buoc_phut=row.buoc_phut,
+            thoi_diem=[row.thoi_diem_bat_dau + i * step for i in range(len(row.luu_luong))],
+            luu_luong=list(row.luu_luong),
+            do_tin_cay=list(row.do_tin_cay),
+            luu_luong_p10=row.luu_luong_p10,
+            luu_luong_p50=row.luu_luong_p50,
+            luu_luong_p90=row.luu_luong_p90,
+            thoi_gian_tao=row.thoi_gian_tao,
+        )
+
+
+class KhoangGiaTri(BaseModel):
+    """`so_diem` giá trị cách đều từ `tu` đến `den` (gồm hai đầu); không có `den` là giá trị cố định."""
+    tu: float
+    den: Optional[float] = None
+    so_diem: int = Field(1, ge=1, le=1000)
+
+
+class ScenarioRequest(BaseModel):
+    ma_mo_hinh: Optional[int] = None
+    # Đặc trưng không truyền lấy theo bản ghi cảm biến mới nhất của máy bơm này
+    ma_may_bom: Optional[int] = None
+    mua: Optional[KhoangGiaTri] = None
+    nhiet_do: Optional[KhoangGiaTri] = None
+    do_am: Optional[KhoangGiaTri] = None
+    do_am_dat: Optional[KhoangGiaTri] = None
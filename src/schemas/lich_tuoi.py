@@ -0,0 +1,50 @@
+from pydantic import BaseModel
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+
+class KhoangBom(BaseModel):
+    bat: datetime
+    tat: datetime
+
+
+class LichTuoiOut(BaseModel):
+    ma_lich_tuoi: int
+    ma_may_bom: int
+    thoi_diem_bat_dau: datetime
+    buoc_phut: int
+    thoi_diem: List[datetime]
+    phut_bom: List[float]
+    do_am_du_kien: List[float]
+    # Các khoảng bật/tắt liên tục, gộp từ số phút bơm đầu mỗi giờ
+    khoang_bom: List[KhoangBom]
+    luong_nuoc_du_kien: Optional[float] = None
+    dat_nguong: bool
+    thoi_gian_tao: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row) -> "LichTuoiOut":
+        step = timedelta(minutes=row.buoc_phut)
+        thoi_diem = [row.thoi_diem_bat_dau + i * step for i in range(len(row.phut_bom))]
+        khoang: List[KhoangBom] = []
+        for t, phut in zip(thoi_diem, row.phut_bom):
+            if phut <= 0:
+                continue
+            tat = t + timedelta(minutes=phut)
+            if khoang and khoang[-1].tat == t:
+                khoang[-1].tat = tat
+            else:
+                khoang.append(KhoangBom(bat=t, tat=tat))
+        return cls(
+            ma_lich_tuoi=row.ma_lich_tuoi,
+            ma_may_bom=row.ma_may_bom,
+            thoi_diem_bat_dau=row.thoi_diem_bat_dau,
+            buoc_phut=row.buoc_phut,
+            thoi_diem=thoi_diem,
+            phut_bom=list(row.phut_bom),
+            do_am_du_kien=list(row.do_am_du_kien),
+            khoang_bom=khoang,
+            luong_nuoc_du_kien=row.luong_nuoc_du_kien,
+            dat_nguong=row.dat_nguong,
+            thoi_gian_tao=row.thoi_gian_tao,
+        )
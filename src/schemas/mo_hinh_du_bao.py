@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MoHinhDuBaoCreate(BaseModel):
@@ -23,3 +23,16 @@ class MoHinhDuBaoOut(BaseModel):
     thoi_gian_tao: Optional[datetime] = None
     thoi_gian_cap_nhat: Optional[datetime] = None
     trang_thai: Optional[bool] = None
+
+
+class HuanLuyenMoHinhRequest(BaseModel):
+    ten_mo_hinh: str = "RandomForest"
+    tu: Optional[datetime] = None
+    den: Optional[datetime] = None
+    max_rows: Optional[int] = Field(None, ge=1)
+    n_estimators: int = Field(100, ge=1, le=1000)
+    max_depth: Optional[int] = Field(None, ge=1)
+    max_leaf_nodes: Optional[int] = Field(4096, ge=2)
+    max_samples: Optional[int] = Field(1_000_000, ge=1)
+    min_samples_leaf: int = Field(5, ge=1)
+    validation_fraction: float = Field(0.1, ge=0, lt=1)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 
@@ -17,3 +17,27 @@ class NhatKyOut(BaseModel):
     thoi_gian_tat: Optional[datetime]
     ghi_chu: Optional[str]
     thoi_gian_tao: Optional[datetime]
+
+
+class ThongKeVanHanhNgayOut(BaseModel):
+    ngay: date
+    so_lan_bom: int
+    tong_phut_bom: float
+    ty_le_hoat_dong: float
+    lan_bom_dai_nhat_phut: float
+    so_cap_chong_lan: int
+    phut_chong_lan: float
+
+
+class ThongKeVanHanhOut(BaseModel):
+    ma_may_bom: int
+    tu: date
+    den: date
+    so_lan_bom: int
+    tong_phut_bom: float
+    # Tỉ lệ thời gian bơm trên toàn khoảng ngày
+    ty_le_hoat_dong: float
+    lan_bom_dai_nhat_phut: float
+    so_cap_chong_lan: int
+    phut_chong_lan: float
+    theo_ngay: List[ThongKeVanHanhNgayOut]
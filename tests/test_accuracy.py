@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.predict.accuracy import summarize_errors
+from src.predict.correction import correction_from_stats, summarize_corrections
+
+T0 = datetime(2024, 6, 1, 6, 0)
+
+
+def test_summarize_errors_batch_ewma_matches_sequential():
+    alpha = 0.5
+    rows = [
+        (1, 7, T0 + timedelta(hours=2), 12.0, 10.0, 12.0),  # APE 20
+        (1, 7, T0, 5.0, 10.0, 5.0),                         # APE 50 (sớm nhất)
+        (1, 7, T0 + timedelta(hours=1), 3.0, 0.0, 3.0),     # thực tế 0: không tính APE
+        (1, 7, T0 + timedelta(hours=3), 4.0, None, 4.0),    # chưa có thực tế: bỏ qua
+        (None, 7, T0, 4.0, 5.0, 4.0),                       # không có mô hình: bỏ qua
+    ]
+    [r] = summarize_errors(rows, alpha)
+    assert (r["ma_mo_hinh"], r["ma_may_bom"], r["so_mau"], r["so_mau_phan_tram"]) == (1, 7, 3, 2)
+    assert r["tong_sai_so_tuyet_doi"] == pytest.approx(5.0 + 3.0 + 2.0)
+    assert r["tong_binh_phuong_sai_so"] == pytest.approx(25.0 + 9.0 + 4.0)
+    assert r["tong_sai_so_phan_tram"] == pytest.approx(70.0)
+    # Thống kê mới: EWMA bắt đầu từ mẫu đầu tiên theo thời điểm dự báo
+    assert r["ewma_moi"] == pytest.approx(0.5 * 50.0 + 0.5 * 20.0)
+    # Đã có EWMA cũ = 40: (1 - a)^2 * 40 + a (1 - a) * 50 + a * 20
+    assert r["he_so_giam"] * 40.0 + r["dong_gop"] == pytest.approx(10.0 + 12.5 + 10.0)
+
+
+def test_pump_correction_recovers_affine_bias_across_batches():
+    lam = 0.95
+    rows = [(1, 7, T0 + timedelta(hours=i), None, 2.0 + 1.5 * p, p) for i, p in enumerate([1.0, 4.0, 2.0, 8.0, 5.0, 3.0])]
+    [one] = summarize_corrections(rows, lam)
+
+    # Hai lô liên tiếp, gộp như câu upsert: tổng mới = tổng cũ * λ^k + tổng của lô
+    [first], [second] = summarize_corrections(rows[:4], lam), summarize_corrections(rows[4:], lam)
+    sums = ("tong_trong_so", "tong_p", "tong_a", "tong_pp", "tong_pa")
+    merged = {k: first[k] * second["he_so_giam"] + second[k] for k in sums}
+    assert merged == pytest.approx({k: one[k] for k in sums})
+
+    stats = SimpleNamespace(so_mau=6, **merged)
+    corr = correction_from_stats(stats, min_samples=5)
+    assert (corr.he_so_chan, corr.he_so_goc) == pytest.approx((2.0, 1.5))
+    assert correction_from_stats(stats, min_samples=10) is None
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from src.predict.backtest import ErrorStats, build_samples
+from src.predict.ensemble import FEATURES
+
+T0 = datetime(2024, 6, 1)
+
+
+@pytest.fixture
+def history():
+    """Bản ghi của ba máy bơm (có lưu lượng/đặc trưng thiếu) và các lần bơm, gồm cả lần không tạo được mẫu."""
+    rng = np.random.default_rng(7)
+    rows = []
+    for ma in (1, 2, 3):
+        minutes = np.sort(rng.choice(3 * 24 * 60, 120, replace=False))
+        for m in minutes:
+            flow = None if rng.random() < 0.2 else float(rng.uniform(0, 10))
+            values = [None if rng.random() < 0.1 else float(rng.uniform(0, 100)) for _ in FEATURES]
+            rows.append((ma, T0 + timedelta(minutes=int(m)), *values, flow))
+    readings = pd.DataFrame(rows, columns=["ma_may_bom", "thoi_gian_tao", *FEATURES, "luu_luong_nuoc"])
+    # Xáo trộn: build_samples tự sắp xếp
+    readings = readings.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    runs = []
+    for ma in (1, 2, 3):
+        times = readings.loc[readings["ma_may_bom"] == ma, "thoi_gian_tao"].sort_values()
+        for k in range(8):
+            bat = T0 + timedelta(hours=int(rng.integers(0, 70)), minutes=int(rng.integers(0, 60)))
+            runs.append((len(runs) + 1, ma, bat, bat + timedelta(minutes=int(rng.integers(5, 180)))))
+        # Bật đúng lúc có bản ghi: bản ghi đó vừa là đặc trưng vừa thuộc khoảng thực tế
+        t = times.iloc[50]
+        runs.append((len(runs) + 1, ma, t, t + timedelta(hours=1)))
+        # Trước mọi bản ghi (không có đặc trưng) và khoảng không có bản ghi nào
+        runs.append((len(runs) + 1, ma, times.iloc[0] - timedelta(hours=2), times.iloc[0] - timedelta(hours=1)))
+        gap = times.iloc[10] + timedelta(seconds=1)
+        runs.append((len(runs) + 1, ma, gap, gap + timedelta(seconds=1)))
+    runs.append((len(runs) + 1, 9, T0, T0 + timedelta(hours=1)))  # máy bơm không có trong lô
+    runs = pd.DataFrame(runs, columns=["ma_nhat_ky", "ma_may_bom", "thoi_gian_bat", "thoi_gian_tat"])
+    return readings, runs
+
+
+def brute_force(readings: pd.DataFrame, runs: pd.DataFrame):
+    samples = {}
+    for run in runs.itertuples():
+        mine = readings[readings["ma_may_bom"] == run.ma_may_bom].sort_values("thoi_gian_tao")
+        before = mine[mine["thoi_gian_tao"] <= run.thoi_gian_bat]
+        inside = mine[(mine["thoi_gian_tao"] >= run.thoi_gian_bat) & (mine["thoi_gian_tao"] <= run.thoi_gian_tat)]
+        flows = [f for f in inside["luu_luong_nuoc"] if f is not None and not pd.isna(f)]
+        if before.empty or not flows:
+            continue
+        x = [0.0 if v is None or pd.isna(v) else v for v in before.iloc[-1][list(FEATURES)]]
+        samples[(run.ma_may_bom, run.thoi_gian_bat)] = (x, sum(flows) / len(flows))
+    return samples
+
+
+def test_build_samples_matches_brute_force(history):
+    readings, runs = history
+    pumps, X, actual, started = build_samples(readings, runs)
+    expected = brute_force(readings, runs)
+
+    got = {(int(ma), pd.Timestamp(t).to_pydatetime()): (x, a) for ma, x, a, t in zip(pumps, X, actual, started)}
+    assert len(got) == len(pumps) and set(got) == set(expected)
+    for key, (x, a) in expected.items():
+        np.testing.assert_allclose(got[key][0], np.asarray(x, dtype=np.float32))
+        assert got[key][1] == pytest.approx(a)
+    assert len(expected) < len(runs) - 9  # các lần bơm không tạo được mẫu đã bị loại
+
+
+def test_build_samples_empty_batch(history):
+    readings, runs = history
+    pumps, X, actual, started = build_samples(readings[readings["ma_may_bom"] == 1], runs[runs["ma_may_bom"] == 2])
+    assert len(pumps) == len(actual) == len(started) == 0 and X.shape == (0, len(FEATURES))
+
+
+def test_error_stats_accumulates_across_batches():
+    rng = np.random.default_rng(3)
+    pumps = rng.integers(1, 4, 50)
+    actual = rng.uniform(0, 5, 50)
+    actual[::7] = 0.0
+    predicted = actual + rng.normal(0, 1, 50)
+
+    stats = ErrorStats()
+    stats.add(pumps[:20], actual[:20], predicted[:20])
+    stats.add(pumps[20:], actual[20:], predicted[20:])
+
+    per_pump = stats.per_pump()
+    for ma in (1, 2, 3):
+        m = pumps == ma
+        err = predicted[m] - actual[m]
+        nz = actual[m] != 0
+        row = per_pump.loc[ma]
+        assert row["n"] == m.sum()
+        assert row["mae"] == pytest.approx(np.abs(err).mean())
+        assert row["rmse"] == pytest.approx(np.sqrt((err ** 2).mean()))
+        assert row["mape"] == pytest.approx(np.abs(err[nz] / actual[m][nz]).mean() * 100)
+    overall = stats.overall()
+    assert overall["n"] == 50
+    assert overall["mae"] == pytest.approx(np.abs(predicted - actual).mean())
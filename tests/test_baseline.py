@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from src.predict import baseline
+from src.predict.baseline import MO_HINH_HW, BaselineStore, FleetBaseline, baseline_forecast, fit_holt_winters, rollup_matrix
+
+
+def test_holt_winters_fleet_matches_per_pump_and_tracks_daily_season():
+    start = datetime(2024, 6, 1, 5)
+    hours = np.arange(24 * 10)
+    daily = 10 + 5 * np.sin(2 * np.pi * ((start.hour + hours) % 24) / 24)
+    Y = np.vstack([daily, 2 * daily + 3, daily])
+    Y[2, 100:130] = np.nan  # mất dữ liệu hơn một ngày
+
+    state, one_step = fit_holt_winters(Y, start)
+    for i in range(len(Y)):
+        single, single_step = fit_holt_winters(Y[i:i + 1], start)
+        np.testing.assert_allclose(single_step[0], one_step[i])
+        assert single.level[0] == pytest.approx(state.level[i])
+
+    # Chuỗi mùa vụ thuần: dự báo ngày kế tiếp gần như đúng, kể cả máy bơm bị mất dữ liệu
+    baseline = FleetBaseline(pumps={1: 0, 2: 1, 3: 2}, state=state, fitted_at=0.0)
+    flows, sigma = baseline.forecast(3, state.next_hour, steps=24)
+    np.testing.assert_allclose(flows, daily[:24], atol=0.05)
+    assert sigma < 0.2
+    assert baseline.forecast(99, state.next_hour) is None
+
+
+def test_rollup_matrix_places_hours_and_leaves_gaps():
+    start = datetime(2024, 6, 1)
+    rollups = pd.DataFrame({
+        "ma_may_bom": [7, 7, 3],
+        "gio": pd.to_datetime(["2024-06-01 00:00", "2024-06-01 02:00", "2024-06-01 01:00"]),
+        "luu_luong": [1.0, 2.0, 3.0],
+    })
+    pumps, Y = rollup_matrix(rollups, start, 3)
+    assert pumps.tolist() == [3, 7]
+    np.testing.assert_array_equal(np.isnan(Y), [[True, False, True], [False, True, False]])
+    assert Y[1, 2] == 2.0 and Y[0, 1] == 3.0
+
+
+def test_stale_fallback_reuses_row_of_same_hour_and_never_refits(monkeypatch):
+    now = datetime(2024, 6, 11, 9, 40)
+    Y = np.tile(10 + 5 * np.sin(2 * np.pi * np.arange(24) / 24), 10)[None, :]
+    state, _ = fit_holt_winters(Y, datetime(2024, 6, 1, 9))
+    store = BaselineStore(history_days=10)
+    monkeypatch.setattr(baseline, "baseline_store", store)
+
+    saved = []
+
+    async def latest(db, ma_may_bom, mo_hinh, since):
+        assert since == datetime(2024, 6, 11, 9)
+        return next((f for f in saved if f.ma_may_bom == ma_may_bom and f.mo_hinh == mo_hinh), None)
+
+    async def create(db, obj):
+        saved.append(obj)
+        return obj
+
+    monkeypatch.setattr(baseline, "get_latest_du_bao_by_mo_hinh", latest)
+    monkeypatch.setattr(baseline, "create_du_lieu_du_bao", create)
+    user = uuid.uuid4()
+
+    # Job scheduler chưa khớp lần nào: không có dự báo cơ sở (và request không tự khớp)
+    assert asyncio.run(baseline_forecast(None, 4, user, now)) is None
+
+    store._baseline = FleetBaseline(pumps={4: 0}, state=state, fitted_at=0.0)
+    first = asyncio.run(baseline_forecast(None, 4, user, now))
+    again = asyncio.run(baseline_forecast(None, 4, user, now))
+    assert first.mo_hinh == MO_HINH_HW and first.luu_luong_p10 <= first.luu_luong_du_bao <= first.luu_luong_p90
+    assert again is first and len(saved) == 1
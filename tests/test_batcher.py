@@ -0,0 +1,90 @@
+import asyncio
+import numpy as np
+import pytest
+from src.predict import batcher as batcher_module
+from src.predict.batcher import InferenceBatcher
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """Thay mô hình bằng hàm trả về cột đầu của X; mỗi lần gọi chờ `gate` và ghi lại số dòng."""
+    state = {"sizes": [], "gate": None, "fail": False}
+
+    async def fake_predict(ma_mo_hinh, model, X):
+        state["sizes"].append(len(X))
+        await state["gate"].wait()
+        if state["fail"]:
+            raise RuntimeError("mô hình lỗi")
+        flows = X[:, 0].astype(np.float64)
+        return flows, np.ones(len(X)), np.vstack([flows, flows, flows])
+
+    monkeypatch.setattr(batcher_module, "forest_predict_intervals_async", fake_predict)
+    return state
+
+
+async def _settle():
+    """Cho các task vừa tạo (request, lô) chạy tới điểm chờ tiếp theo."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _run(state, scenario):
+    async def main():
+        state["gate"] = asyncio.Event()
+        return await scenario(state["gate"])
+
+    return asyncio.run(asyncio.wait_for(main(), 5))
+
+
+def test_single_request_runs_without_waiting(model_calls):
+    b = InferenceBatcher(max_wait_ms=60_000, max_batch=64)
+
+    async def scenario(gate):
+        gate.set()
+        return await b.predict(1, object(), np.array([3.0, 0, 0, 0]))
+
+    assert _run(model_calls, scenario) == (3.0, 1.0, (3.0, 3.0, 3.0))
+    assert model_calls["sizes"] == [1]
+
+
+def test_requests_during_inflight_batch_are_coalesced_and_capped(model_calls):
+    b = InferenceBatcher(max_wait_ms=60_000, max_batch=3)
+    model = object()
+
+    async def scenario(gate):
+        first = asyncio.ensure_future(b.predict(1, model, np.array([0.0, 0, 0, 0])))
+        await _settle()
+        # Lô đầu đang chạy: 4 request sau dồn lại, đủ 3 dòng thì chạy ngay, dòng còn lại chờ
+        rest = [asyncio.ensure_future(b.predict(1, model, np.array([float(i), 0, 0, 0]))) for i in range(1, 5)]
+        await _settle()
+        assert model_calls["sizes"] == [1, 3]
+        gate.set()
+        return await asyncio.gather(first, *rest)
+
+    results = _run(model_calls, scenario)
+    assert [r[0] for r in results] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert model_calls["sizes"] == [1, 3, 1]
+
+
+def test_errors_reach_every_future_and_cancelled_requests_are_skipped(model_calls):
+    b = InferenceBatcher(max_wait_ms=60_000, max_batch=64)
+    model = object()
+
+    async def scenario(gate):
+        first = asyncio.ensure_future(b.predict(1, model, np.array([0.0, 0, 0, 0])))
+        await _settle()
+        queued = [asyncio.ensure_future(b.predict(1, model, np.array([float(i), 0, 0, 0]))) for i in (1, 2)]
+        await _settle()
+        queued[0].cancel()
+        gate.set()
+        ok = await asyncio.gather(first, queued[1])
+
+        # Lô lỗi: mọi request của lô nhận cùng exception
+        model_calls["fail"] = True
+        failed = await asyncio.gather(*(b.predict(1, model, np.array([1.0, 0, 0, 0])) for _ in range(3)), return_exceptions=True)
+        return ok, queued[0].cancelled(), failed
+
+    ok, cancelled, failed = _run(model_calls, scenario)
+    assert [r[0] for r in ok] == [0.0, 2.0] and cancelled
+    assert all(isinstance(e, RuntimeError) for e in failed)
+    assert b.metrics()["errors"] >= 1 and b.metrics()["pending"] == 0
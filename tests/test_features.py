@@ -0,0 +1,119 @@
+import asyncio
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from src.predict import features
+from src.predict.features import PumpFeatureState, RollingWindow
+
+Reading = namedtuple("Reading", "ma_du_lieu thoi_gian_tao do_am_dat do_am mua")
+T0 = datetime(2024, 6, 1, 6, 0)
+
+
+def test_rolling_window_evicts_by_time():
+    w = RollingWindow(timedelta(hours=1))
+    w.push(T0, 10.0)
+    w.push(T0 + timedelta(minutes=30), None)
+    w.push(T0 + timedelta(minutes=40), 20.0)
+    assert w.mean() == pytest.approx(15.0)
+    w.push(T0 + timedelta(minutes=60), 30.0)  # cửa sổ (t - 1h, t]: bản ghi lúc T0 bị loại
+    assert len(w) == 2
+    assert w.total == pytest.approx(50.0)
+    w.advance(T0 + timedelta(hours=3))
+    assert w.mean() is None and w.total == 0.0
+
+
+def test_pump_features_last_watering_and_rain():
+    state = PumpFeatureState()
+    state.add_runs([(T0 - timedelta(hours=2), T0 - timedelta(hours=1, minutes=30))])
+    state.add_runs([(T0 + timedelta(minutes=10), T0 + timedelta(minutes=25))])
+
+    f = state.update(Reading(1, T0, 40.0, 70.0, 2.0))
+    assert f["thoi_luong_tuoi_gan_nhat"] == 1800
+    assert f["thoi_gian_tu_lan_tuoi"] == 5400
+
+    f = state.update(Reading(2, T0 + timedelta(minutes=30), 50.0, None, 1.0))
+    assert f["thoi_luong_tuoi_gan_nhat"] == 900
+    assert f["do_am_dat_tb_1h"] == pytest.approx(45.0)
+    assert f["do_am_tb_1h"] == pytest.approx(70.0)
+    assert f["mua_tong_24h"] == pytest.approx(3.0)
+    assert state.position == (T0 + timedelta(minutes=30), 2)
+
+
+class FakeStore:
+    """Bản ghi cảm biến, nhật ký bơm và bảng đặc trưng của một máy bơm, thay cho các hàm crud."""
+
+    def __init__(self, runs):
+        self.readings = []
+        self.runs = sorted(runs, key=lambda r: r[1])
+        self.features = {}
+
+    def _sorted(self):
+        return sorted(self.readings, key=lambda r: (r.thoi_gian_tao, r.ma_du_lieu))
+
+    def high_water(self):
+        if not self.features:
+            return None
+        return max((f["thoi_gian"], f["ma_du_lieu"]) for f in self.features.values())
+
+    def install(self, monkeypatch):
+        async def list_readings(db, ma, after, limit):
+            rows = [r for r in self._sorted() if after is None or (r.thoi_gian_tao, r.ma_du_lieu) > after]
+            return rows[:limit]
+
+        async def stream_readings(db, ma, until=None, since=None, chunk_size=1000):
+            rows = [
+                r for r in self._sorted()
+                if (until is None or (r.thoi_gian_tao, r.ma_du_lieu) <= until) and (since is None or r.thoi_gian_tao >= since)
+            ]
+            for i in range(0, len(rows), chunk_size):
+                yield rows[i:i + chunk_size]
+
+        async def completed_runs(db, ma, after):
+            if after is None:
+                return list(self.runs)
+            before = [r for r in self.runs if r[1] <= after][-1:]
+            return before + [r for r in self.runs if r[1] > after]
+
+        async def insert(db, rows):
+            for row in rows:
+                self.features.setdefault(row["ma_du_lieu"], row)
+
+        monkeypatch.setattr(features, "list_readings_for_pump", list_readings)
+        monkeypatch.setattr(features, "stream_readings_for_pump", stream_readings)
+        monkeypatch.setattr(features, "list_completed_runs", completed_runs)
+        monkeypatch.setattr(features, "insert_features", insert)
+
+
+@pytest.mark.parametrize("keep_state", [True, False])
+def test_incremental_refresh_matches_full_recompute(monkeypatch, keep_state):
+    rng = np.random.default_rng(1)
+    times = [T0 + timedelta(minutes=int(m)) for m in np.sort(rng.integers(0, 48 * 60, 60))]
+    # Vài bản ghi trùng thời điểm (đến sau, ma_du_lieu lớn hơn)
+    times[31] = times[30]
+    times[45] = times[44] = times[43]
+    readings = [
+        Reading(i + 1, t, float(rng.uniform(20, 60)), float(rng.uniform(50, 90)) if i % 7 else None, float(rng.uniform(0, 2)))
+        for i, t in enumerate(times)
+    ]
+    runs = [(T0 + timedelta(hours=h), T0 + timedelta(hours=h, minutes=20)) for h in (-3, 5, 13, 30, 41)]
+
+    full = FakeStore(runs)
+    full.readings = list(readings)
+    full.install(monkeypatch)
+    features._states.clear()
+    asyncio.run(features.refresh_pump_features(None, 1, None, chunk_size=7))
+
+    inc = FakeStore(runs)
+    inc.install(monkeypatch)
+    features._states.clear()
+    # Bản ghi đến theo từng đợt; đợt sau có bản ghi trùng thời điểm với high-water mark
+    for cut in (10, 31, 44, 60):
+        inc.readings = list(readings[:cut])
+        if not keep_state:
+            features._states.clear()
+        asyncio.run(features.refresh_pump_features(None, 1, inc.high_water(), chunk_size=7))
+
+    assert sorted(inc.features) == sorted(full.features) == list(range(1, 61))
+    for ma_du_lieu, row in full.features.items():
+        assert inc.features[ma_du_lieu] == pytest.approx(row)
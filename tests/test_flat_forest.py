@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from src.predict.ensemble import forest_predict, forest_predict_intervals
+from src.predict.flat_forest import compile_forest, load_flat, numba_available, save_flat
+
+
+@pytest.fixture(scope="module")
+def forest_and_rows():
+    rng = np.random.RandomState(0)
+    X = (rng.rand(400, 4) * [50, 100, 45, 100]).astype(np.float32)
+    y = X[:, 1] * 0.3 - X[:, 0] * 0.1 + rng.randn(400)
+    model = RandomForestRegressor(n_estimators=15, random_state=0).fit(X, y)
+    rows = (rng.rand(300, 4) * [60, 110, 50, 110]).astype(np.float32)
+    return model, rows
+
+
+def test_numpy_evaluator_matches_sklearn(forest_and_rows):
+    model, rows = forest_and_rows
+    flat = compile_forest(model, "numpy")
+    np.testing.assert_array_equal(flat.predict(rows), model.predict(rows))
+    per_tree = np.stack([est.predict(rows) for est in model.estimators_])
+    np.testing.assert_array_equal(flat.per_tree(rows), per_tree)
+
+
+@pytest.mark.skipif(not numba_available(), reason="numba chưa được cài đặt")
+def test_numba_evaluator_matches_sklearn(forest_and_rows):
+    model, rows = forest_and_rows
+    np.testing.assert_array_equal(compile_forest(model, "numba").predict(rows), model.predict(rows))
+
+
+def test_flat_roundtrip_mmap(forest_and_rows, tmp_path):
+    model, rows = forest_and_rows
+    save_flat(compile_forest(model), str(tmp_path / "rf.flat"))
+    flat = load_flat(str(tmp_path / "rf.flat"), mmap=True)
+    assert isinstance(flat.value, np.memmap)
+    np.testing.assert_array_equal(flat.predict(rows), model.predict(rows))
+
+
+def test_intervals_from_per_tree_distribution(forest_and_rows):
+    model, rows = forest_and_rows
+    flow, conf, (p10, p50, p90) = forest_predict_intervals(compile_forest(model), rows)
+    per_tree = np.stack([est.predict(rows) for est in model.estimators_])
+    np.testing.assert_allclose(p10, np.quantile(per_tree, 0.1, axis=0))
+    np.testing.assert_allclose(p90, np.quantile(per_tree, 0.9, axis=0))
+    assert np.all((p10 <= p50) & (p50 <= p90))
+    np.testing.assert_array_equal((flow, conf), forest_predict(model, rows))
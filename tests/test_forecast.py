@@ -0,0 +1,86 @@
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from src.predict import forecast
+from src.predict.forecast_cache import ForecastCache
+
+
+class SumModel:
+    def predict(self, X):
+        return X.to_numpy().sum(axis=1)
+
+
+@pytest.fixture
+def fleet(monkeypatch):
+    """Ba máy bơm, mỗi máy một bản ghi tham chiếu; các dòng INSERT được giữ trong `stored`."""
+    state = SimpleNamespace(
+        readings={ma: SimpleNamespace(ma_may_bom=ma, ma_du_lieu=100 + ma, mua=0, do_am_dat=ma, nhiet_do=0, do_am=0) for ma in (1, 2, 3)},
+        stored=[],
+    )
+
+    async def inputs(db, ids, now):
+        return [state.readings[ma] for ma in ids]
+
+    async def latest_keys(db, ids, ma_mo_hinh):
+        keys = {}
+        for r in state.stored:
+            if r["ma_mo_hinh"] == ma_mo_hinh and r["ma_may_bom"] in ids:
+                keys[r["ma_may_bom"]] = (r["ma_du_lieu_tham_chieu"], r["phien_ban_mo_hinh"])
+        return keys
+
+    async def insert(db, rows):
+        state.stored.extend(rows)
+        return [SimpleNamespace(ma_du_bao=uuid.uuid4(), thoi_gian_tao=datetime.now(), **r) for r in rows]
+
+    monkeypatch.setattr(forecast, "get_forecast_inputs_for_pumps", inputs)
+    monkeypatch.setattr(forecast, "get_latest_forecast_keys", latest_keys)
+    monkeypatch.setattr(forecast, "create_du_lieu_du_bao_bulk", insert)
+    state.cache = ForecastCache()
+    monkeypatch.setattr(forecast, "forecast_cache", state.cache)
+    owner = uuid.uuid4()
+    state.pumps = [SimpleNamespace(ma_may_bom=ma, ma_nguoi_dung=owner) for ma in (1, 2, 3)]
+    return state
+
+
+def test_job_skips_pumps_whose_reference_and_version_are_unchanged(fleet):
+    run = lambda version: asyncio.run(forecast.forecast_pumps(None, fleet.pumps, 11, SumModel(), version, skip_unchanged=True))
+
+    created, missing = run("11:aaa")
+    assert [r.ma_may_bom for r in created] == [1, 2, 3] and missing == []
+    assert [r.luu_luong_du_bao for r in created] == pytest.approx([1.0, 2.0, 3.0])
+
+    # Không có gì đổi: không chạy mô hình, không thêm dòng
+    assert run("11:aaa") == ([], [])
+    assert len(fleet.stored) == 3
+
+    # Bản ghi tham chiếu mới của máy bơm 2, rồi mô hình đổi phiên bản
+    fleet.readings[2] = SimpleNamespace(ma_may_bom=2, ma_du_lieu=500, mua=0, do_am_dat=7, nhiet_do=0, do_am=0)
+    assert [r.ma_may_bom for r in run("11:aaa")[0]] == [2]
+    assert [r.ma_may_bom for r in run("11:bbb")[0]] == [1, 2, 3]
+    assert [r["phien_ban_mo_hinh"] for r in fleet.stored[-3:]] == ["11:bbb"] * 3
+
+
+def test_batch_reuses_cached_forecasts_until_invalidated(fleet):
+    run = lambda: asyncio.run(forecast.forecast_pumps(None, fleet.pumps, 11, SumModel(), "11:aaa"))
+
+    first, _ = run()
+    assert len(fleet.stored) == 3
+    # Trúng cache: cùng dự báo, không INSERT thêm
+    again, _ = run()
+    assert [f.ma_du_bao for f in again] == [f.ma_du_bao for f in first]
+    assert len(fleet.stored) == 3
+
+    # Trượt: bản ghi tham chiếu mới của máy bơm 1; bản ghi của máy bơm 3 bị sửa
+    fleet.readings[1] = SimpleNamespace(ma_may_bom=1, ma_du_lieu=900, mua=0, do_am_dat=4, nhiet_do=0, do_am=0)
+    fleet.cache.invalidate_pump(3)
+    third, _ = run()
+    assert len(fleet.stored) == 5 and [r["ma_may_bom"] for r in fleet.stored[3:]] == [1, 3]
+    assert [f.ma_may_bom for f in third] == [1, 2, 3]
+    assert third[0].luu_luong_du_bao == pytest.approx(4.0) and third[1].ma_du_bao == first[1].ma_du_bao
+
+    # Mô hình nạp lại: bỏ mọi dự báo của mô hình trong cache
+    fleet.cache.invalidate_model(11)
+    run()
+    assert len(fleet.stored) == 8
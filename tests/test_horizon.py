@@ -0,0 +1,23 @@
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pytest
+from src.predict.horizon import build_horizon_features, hourly_profile, next_hour
+
+Row = namedtuple("Row", "gio mua do_am_dat nhiet_do do_am")
+
+
+def test_horizon_features_follow_profile_and_decay_anchor():
+    profile = hourly_profile([
+        Row(9, 0.0, 40.0, 20.0, 80.0),
+        Row(10, 0.0, 50.0, 24.0, 70.0),
+        Row(11, None, 60.0, 28.0, 60.0),
+    ])
+    latest = np.array([2.0, 44.0, 20.0, 80.0])  # lúc 9h: do_am_dat cao hơn biên dạng 4
+    start = next_hour(datetime(2024, 6, 1, 9, 20))
+    X = build_horizon_features(latest, 9, profile, start, steps=3, decay=0.5)
+
+    assert X.shape == (3, 4) and X.dtype == np.float32
+    assert X[:, 1] == pytest.approx([50.0 + 4 * 0.5, 60.0 + 4 * 0.25, 44.0])
+    # Giờ 11 chưa có mua, giờ 12 chưa có biên dạng: dùng nguyên giá trị mới nhất, không cộng độ lệch
+    assert X[:, 0] == pytest.approx([0.0 + 2 * 0.5, 2.0, 2.0])
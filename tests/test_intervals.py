@@ -0,0 +1,40 @@
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+import pytest
+from src.core.intervals import interval_union, summarize_runs, sweep_overlaps
+
+
+def test_union_and_sweep_match_brute_force():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 3, 200)
+    starts = rng.integers(0, 5000, 200)
+    ends = starts + rng.integers(1, 200, 200)
+
+    g, s, e = interval_union(codes, starts, ends)
+    open_at_start, seg_g, seg_s, seg_e = sweep_overlaps(codes, starts, ends)
+    for c in range(3):
+        busy = np.zeros(5300, dtype=np.int64)
+        pairs = 0
+        idx = np.flatnonzero(codes == c)
+        for i in idx:
+            busy[starts[i]:ends[i]] += 1
+            pairs += sum(1 for j in idx if j < i and starts[j] < ends[i] and starts[i] < ends[j])
+        assert (e - s)[g == c].sum() == (busy > 0).sum()
+        assert (seg_e - seg_s)[seg_g == c].sum() == (busy >= 2).sum()
+        assert open_at_start[idx].sum() == pairs
+
+
+def test_summarize_runs_clips_days_and_detects_overlap():
+    runs = pd.DataFrame({
+        "ma_may_bom": [1, 1, 1, 1],
+        "thoi_gian_bat": pd.to_datetime(["2024-06-01 23:30", "2024-06-02 00:10", "2024-06-02 05:00", "2024-06-02 06:00"]),
+        "thoi_gian_tat": pd.to_datetime(["2024-06-02 00:30", "2024-06-02 00:20", "2024-06-02 06:00", None]),
+    })
+    out = summarize_runs(runs, [1, 2], date(2024, 6, 1), date(2024, 6, 2), datetime(2024, 6, 2, 6, 30))
+    day1, day2 = out.iloc[0], out.iloc[1]
+    assert (day1["so_lan_bom"], day1["tong_phut_bom"], day1["lan_bom_dai_nhat_phut"]) == (1, 30, 60)
+    # Lần bơm 00:10-00:20 nằm trong lần 23:30-00:30; 06:00 chỉ chạm 05:00-06:00; lần đang bơm tính đến 06:30
+    assert (day2["so_lan_bom"], day2["tong_phut_bom"], day2["so_cap_chong_lan"], day2["phut_chong_lan"]) == (3, 120, 1, 10)
+    assert day2["ty_le_hoat_dong"] == pytest.approx(120 / 1440)
+    assert out[out["ma_may_bom"] == 2]["tong_phut_bom"].sum() == 0
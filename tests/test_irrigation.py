@@ -0,0 +1,80 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+from src.crud.lich_tuoi import irrigation_configs_query
+from src.predict.irrigation import allowed_hours, fill_missing_flows, plan_irrigation
+
+
+def test_allowed_hours_wraps_midnight_and_ignores_default_window():
+    start = datetime(2024, 6, 1, 20)
+    allowed = allowed_hours(np.array([22, 6, 0, 6]), np.array([2, 8, 0, 8]), np.array([True, True, True, False]), start, 8)
+    hours = (20 + np.arange(8)) % 24
+    assert hours[allowed[0]].tolist() == [22, 23, 0, 1]
+    assert not allowed[1].any()
+    assert allowed[2].all() and allowed[3].all()
+
+
+def test_plan_pumps_as_late_as_window_allows():
+    # Giảm 1/giờ, tăng 4/giờ bơm, ngưỡng 10; chỉ được bơm ở giờ 2..3 của 8 giờ
+    allowed = np.zeros((2, 8), dtype=bool)
+    allowed[:, 2:4] = True
+    m0 = np.array([13.0, 30.0])
+    x, moisture, feasible = plan_irrigation(
+        m0, np.array([1.0, 1.0]), np.array([4.0, 4.0]), np.array([10.0, 10.0]), np.array([20.0, np.inf]), allowed,
+    )
+    # Máy bơm 1: cuối giờ 7 cần ≥ 10 -> cuối giờ 3 cần 14, tức 1.25 giờ bơm; bơm trọn giờ 3, phần
+    # còn lại ở giờ 2
+    assert x[0].tolist() == pytest.approx([0, 0, 0.25, 1.0, 0, 0, 0, 0])
+    assert moisture[0, -1] == pytest.approx(10.0)
+    assert feasible.tolist() == [True, True]
+    # Máy bơm 2 đủ ẩm cả chuỗi: không bơm
+    assert not x[1].any()
+
+    # Ngưỡng quá cao so với cửa sổ: bơm hết cửa sổ nhưng không đạt
+    x, moisture, feasible = plan_irrigation(
+        np.array([10.0]), np.array([2.0]), np.array([3.0]), np.array([10.0]), np.array([np.inf]), allowed[:1],
+    )
+    assert x[0, 2:4].tolist() == [1.0, 1.0] and not feasible[0]
+
+
+def test_plan_prefers_cheaper_hours_within_hi():
+    # Như trên nhưng được bơm giờ 2..5 và giờ 2 rẻ hơn: bơm sớm ở giờ 2, phần còn lại ở giờ muộn nhất
+    allowed = np.zeros((1, 8), dtype=bool)
+    allowed[:, 2:6] = True
+    cost = np.array([[9.0, 9.0, 1.0, 5.0, 5.0, 5.0, 9.0, 9.0]])
+    args = (np.array([13.0]), np.array([1.0]), np.array([4.0]), np.array([10.0]))
+    x, moisture, feasible = plan_irrigation(*args, np.array([20.0]), allowed, cost=cost)
+    assert x[0].tolist() == pytest.approx([0, 0, 1.0, 0, 0, 0.25, 0, 0])
+    assert moisture[0, -1] == pytest.approx(10.0) and feasible[0]
+
+    # Ngưỡng trên 13: giờ 2 chỉ bơm tới khi chạm ngưỡng, phần còn lại dời sang giờ đắt hơn
+    x, moisture, feasible = plan_irrigation(*args, np.array([13.0]), allowed, cost=cost)
+    assert feasible[0] and x[0].sum() == pytest.approx(1.25)
+    assert x[0, 2] == pytest.approx(0.75)
+    assert (moisture[x > 0] <= 13.0 + 1e-9).all()
+
+
+class FakeBaseline:
+    def forecast(self, ma_may_bom, now, steps=1):
+        return None if ma_may_bom == 3 else (np.full(steps, float(ma_may_bom)), 0.5)
+
+
+def test_missing_hourly_forecasts_fall_back_to_baseline():
+    flows = np.array([[1.0, 2.0, 3.0], [np.nan] * 3, [np.nan] * 3])
+    filled = fill_missing_flows(flows, np.array([1, 2, 3]), datetime(2024, 6, 1, 6), FakeBaseline())
+    assert filled[0].tolist() == [1.0, 2.0, 3.0]
+    assert filled[1].tolist() == [2.0, 2.0, 2.0]
+    assert np.isnan(filled[2]).all() and np.isnan(flows[1]).all()
+
+
+def test_irrigation_configs_take_latest_config_row_per_pump():
+    # Một máy bơm có hai dòng cấu hình: chỉ dòng mới nhất được dùng, và ngưỡng được lọc sau khi chọn
+    sql = str(irrigation_configs_query().compile(dialect=postgresql.dialect()))
+    inner, outer = sql.split(") AS anon_1")
+    assert "DISTINCT ON (cau_hinh_thiet_bi.ma_thiet_bi)" in inner
+    assert (
+        "ORDER BY cau_hinh_thiet_bi.ma_thiet_bi, cau_hinh_thiet_bi.thoi_gian_tao DESC NULLS LAST, "
+        "cau_hinh_thiet_bi.ma_cau_hinh DESC" in inner
+    )
+    assert "do_am_toi_thieu >" not in inner and "anon_1.do_am_toi_thieu >" in outer
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.core import last_value
+from src.core.last_value import LastValueStore, LatestReading
+
+T0 = datetime(2024, 6, 1, 6, 0)
+
+
+def _reading(ma_may_bom, ma_du_lieu, t):
+    return LatestReading(**{f: None for f in LatestReading._fields} | {"ma_may_bom": ma_may_bom, "ma_du_lieu": ma_du_lieu, "thoi_gian_tao": t})
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Bảng giả: bản ghi mới nhất theo máy bơm; ghi lại danh sách máy bơm của mỗi lần truy vấn."""
+    state = SimpleNamespace(latest={}, queries=[], now=1000.0)
+
+    async def latest_for_pumps(db, ids):
+        state.queries.append(list(ids))
+        return [SimpleNamespace(_mapping=state.latest[ma]._asdict()) for ma in ids if ma in state.latest]
+
+    monkeypatch.setattr(last_value, "get_latest_du_lieu_for_pumps", latest_for_pumps)
+    monkeypatch.setattr(last_value.time, "monotonic", lambda: state.now)
+    return state
+
+
+def test_get_many_reads_missing_pumps_in_one_query_then_serves_from_cache(db):
+    store = LastValueStore(ttl_seconds=30)
+    db.latest = {1: _reading(1, 10, T0), 2: _reading(2, 20, T0)}
+
+    found = asyncio.run(store.get_many(None, [1, 2, 3, 1]))
+    assert sorted(found) == [1, 2] and found[1].ma_du_lieu == 10
+    assert db.queries == [[1, 2, 3]]
+
+    db.latest[1] = _reading(1, 11, T0 + timedelta(minutes=1))
+    db.now += 29
+    assert asyncio.run(store.get(None, 1)).ma_du_lieu == 10
+    assert db.queries == [[1, 2, 3]]
+    # Máy bơm chưa có dữ liệu không được cache: đọc lại mỗi lần
+    assert asyncio.run(store.get(None, 3)) is None
+    assert db.queries == [[1, 2, 3], [3]]
+
+
+def test_entries_expire_after_ttl_and_refresh_bypasses_cache(db):
+    store = LastValueStore(ttl_seconds=30)
+    db.latest = {1: _reading(1, 10, T0)}
+    asyncio.run(store.get(None, 1))
+
+    db.latest[1] = _reading(1, 11, T0 + timedelta(minutes=1))
+    assert asyncio.run(store.get(None, 1, refresh=True)).ma_du_lieu == 11
+
+    db.latest[1] = _reading(1, 12, T0 + timedelta(minutes=2))
+    db.now += 29.9
+    assert asyncio.run(store.get(None, 1)).ma_du_lieu == 11
+    db.now += 0.2
+    assert asyncio.run(store.get(None, 1)).ma_du_lieu == 12
+    assert len(db.queries) == 3
+
+
+def test_record_keeps_only_newer_readings_of_cached_pumps(db):
+    store = LastValueStore(ttl_seconds=30)
+    db.latest = {1: _reading(1, 10, T0)}
+    # Máy bơm chưa có trong cache: record bỏ qua (không biết có phải bản mới nhất)
+    store.record(_reading(2, 5, T0))
+    asyncio.run(store.get(None, 1))
+
+    store.record(_reading(1, 9, T0 - timedelta(minutes=5)))
+    store.record(_reading(1, 8, None))
+    assert asyncio.run(store.get(None, 1)).ma_du_lieu == 10
+
+    store.record(_reading(1, 11, T0))  # cùng thời điểm, mã lớn hơn
+    assert asyncio.run(store.get(None, 1)).ma_du_lieu == 11
+    assert asyncio.run(store.get(None, 2)) is None
+    assert db.queries == [[1], [2]]
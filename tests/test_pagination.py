@@ -0,0 +1,36 @@
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from src.core.pagination import encode_cursor, decode_cursor
+from src.crud.du_lieu_cam_bien import paginate_du_lieu
+from src.models.du_lieu_cam_bien import DuLieuCamBien
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2024, 5, 1, 7, 30, 15, 250000)
+    token = encode_cursor(ts, 4821)
+    assert "=" not in token
+    assert decode_cursor(token) == (ts, 4821)
+
+
+def test_cursor_malformed():
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor("") is None
+
+
+def _sql(q) -> str:
+    return str(q.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_keyset_page_continues_after_cursor_and_ignores_offset():
+    pos = (datetime(2024, 5, 1, 7, 30), 4821)
+    sql = _sql(paginate_du_lieu(select(DuLieuCamBien.ma_du_lieu), 50, 200, pos))
+    assert "(du_lieu_cam_bien.thoi_gian_tao, du_lieu_cam_bien.ma_du_lieu) < ('2024-05-01 07:30:00', 4821)" in sql
+    assert "ORDER BY du_lieu_cam_bien.thoi_gian_tao DESC, du_lieu_cam_bien.ma_du_lieu DESC" in sql
+    assert "LIMIT 50" in sql and "OFFSET" not in sql
+
+
+def test_offset_page_without_cursor():
+    sql = _sql(paginate_du_lieu(select(DuLieuCamBien.ma_du_lieu), 50, 200, None))
+    assert "<" not in sql and "LIMIT 50 OFFSET 200" in sql
+    assert "LIMIT" not in _sql(paginate_du_lieu(select(DuLieuCamBien.ma_du_lieu), None, 0, None))
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import joblib
+import pytest
+from src.predict.forecast_cache import ForecastCache
+from src.predict.registry import DEFAULT_ARTIFACT, ModelRegistry
+
+
+def test_only_default_model_falls_back_to_shared_artifact(tmp_path):
+    joblib.dump({"ten": "mac_dinh"}, tmp_path / DEFAULT_ARTIFACT)
+    joblib.dump({"ten": "rieng"}, tmp_path / "mo_hinh_5.joblib")
+    reg = ModelRegistry(str(tmp_path), default_ma_mo_hinh=11)
+
+    assert reg.get(11).model == {"ten": "mac_dinh"}
+    assert reg.get(5).model == {"ten": "rieng"}
+    with pytest.raises(FileNotFoundError):
+        reg.get(7)
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(reg.aget(7))
+    assert asyncio.run(reg.aget(5)) is reg.get(5)
+
+
+def test_rewritten_artifact_is_reloaded_and_listeners_fire(tmp_path):
+    path = tmp_path / "mo_hinh_5.joblib"
+    joblib.dump({"ten": "v1"}, path)
+    reg = ModelRegistry(str(tmp_path), check_interval=0, default_ma_mo_hinh=None)
+    events = []
+    reg.add_reload_listener(events.append)
+    cache = ForecastCache()
+    reg.add_reload_listener(cache.invalidate_model)
+
+    first = reg.get(5)
+    cache.put((1, 100, first.version), "du_bao_v1")
+    assert events == [] and reg.get(5) is first
+
+    # Chỉ đổi mtime, nội dung giữ nguyên: checksum trùng nên không nạp lại
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    assert reg.get(5) is first and events == []
+
+    joblib.dump({"ten": "v2", "them": list(range(10))}, path)
+    os.utime(path, (st.st_atime, st.st_mtime + 20))
+    second = reg.get(5)
+    assert second.model == {"ten": "v2", "them": list(range(10))}
+    assert second.version != first.version and second.version.startswith("5:")
+    assert events == [5]
+    assert cache.get((1, 100, first.version)) is None
+
+    reg.evict()
+    assert events == [5, None]
@@ -0,0 +1,27 @@
+import asyncio
+from collections import namedtuple
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from src.predict.ensemble import forest_predict
+from src.predict.scenarios import build_grid, evaluate_scenarios, scenario_cache
+
+Loaded = namedtuple("Loaded", "ma_mo_hinh model version")
+
+
+def test_grid_matches_axes_and_is_cached():
+    rng = np.random.RandomState(0)
+    X = (rng.rand(200, 4) * [20, 100, 40, 100]).astype(np.float32)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0] * 2 + X[:, 2])
+    axes = [np.linspace(0, 20, 3), np.array([50.0]), np.linspace(20, 40, 4), np.array([70.0])]
+
+    grid, shape = build_grid(axes)
+    assert shape == (3, 1, 4, 1) and grid.shape == (12, 4)
+    np.testing.assert_allclose(grid.reshape(*shape, 4)[2, 0, 1, 0], [20.0, 50.0, 20 + 20 / 3, 70.0], rtol=1e-6)
+
+    loaded = Loaded(-1, model, "-1:test")
+    flows, _, cached = asyncio.run(evaluate_scenarios(loaded, axes))
+    assert not cached and flows.shape == shape
+    np.testing.assert_allclose(flows.ravel(), forest_predict(model, grid)[0], rtol=1e-6)
+    assert asyncio.run(evaluate_scenarios(loaded, axes))[2]
+    scenario_cache.invalidate_model(-1)
+    assert not asyncio.run(evaluate_scenarios(loaded, axes))[2]
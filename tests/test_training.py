@@ -0,0 +1,132 @@
+import asyncio
+import numpy as np
+import pytest
+from src.predict.ensemble import FEATURES
+from src.predict import training
+from src.predict.training import TrainingParams, _fit_in_process, create_job, fit_forest, load_training_data
+
+
+class FakeStreamResult:
+    def __init__(self, partitions):
+        self._partitions = partitions
+        self.closed = False
+
+    async def partitions(self):
+        for rows in self._partitions:
+            yield rows
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCount:
+    def __init__(self, n):
+        self._n = n
+
+    def scalar_one(self):
+        return self._n
+
+
+class FakeSession:
+    """Trả về số dòng đếm được và các partition đã cho; ghi lại câu truy vấn đã stream."""
+
+    def __init__(self, total, partitions):
+        self.total = total
+        self.result = FakeStreamResult(partitions)
+        self.query = None
+
+    async def execute(self, q):
+        return FakeCount(self.total)
+
+    async def stream(self, q):
+        self.query = q
+        return self.result
+
+
+def _rows(start, n):
+    # (mua, do_am_dat, nhiet_do, do_am, luu_luong_nuoc); mỗi dòng thứ ba thiếu do_am_dat
+    return [(0.0, None if i % 3 == 0 else float(i), 20.0, 50.0, float(i) / 10) for i in range(start, start + n)]
+
+
+def test_load_training_data_fills_preallocated_arrays():
+    db = FakeSession(7, [_rows(0, 4), _rows(4, 3)])
+    X, y, step = asyncio.run(load_training_data(db, TrainingParams(max_rows=100)))
+
+    assert step == 1 and X.dtype == np.float32 and X.shape == (7, len(FEATURES))
+    np.testing.assert_allclose(y, np.arange(7) / 10)
+    np.testing.assert_array_equal(X[:, 1], [0, 1, 2, 0, 4, 5, 0])  # NULL -> 0
+    assert db.result.closed
+    assert "%" not in str(db.query)
+
+
+def test_load_training_data_samples_and_stops_at_capacity():
+    # 25 dòng với max_rows 10: bước 3, cấp phát 10 dòng; dòng thêm sau khi đếm bị bỏ
+    db = FakeSession(25, [_rows(0, 6), _rows(6, 6), _rows(12, 6)])
+    X, y, step = asyncio.run(load_training_data(db, TrainingParams(max_rows=10)))
+
+    assert step == 3 and len(X) == len(y) == 10
+    np.testing.assert_allclose(y, np.arange(10) / 10)
+    assert "ma_du_lieu %" in str(db.query)
+
+
+def test_load_training_data_writes_npy_files_for_child(tmp_path):
+    db = FakeSession(7, [_rows(0, 4), _rows(4, 3)])
+    X, y, _ = asyncio.run(load_training_data(db, TrainingParams(max_rows=100), str(tmp_path)))
+
+    assert isinstance(X, np.memmap)
+    np.testing.assert_array_equal(np.load(tmp_path / "X.npy"), X)
+    np.testing.assert_allclose(np.load(tmp_path / "y.npy"), np.arange(7) / 10)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, (2000, len(FEATURES))).astype(np.float32)
+    y = 0.3 * X[:, 1] - 0.1 * X[:, 3] + rng.normal(0, 1, len(X))
+    return X, y
+
+
+def test_fit_forest_holds_out_newest_rows_and_bounds_trees(data):
+    X, y = data
+    params = TrainingParams(n_estimators=5, max_leaf_nodes=32, max_samples=10_000_000, validation_fraction=0.25, n_jobs=1)
+    model, n_val, mae, rmse = fit_forest(X, y, params)
+
+    assert n_val == 500
+    # max_samples lớn hơn số dòng huấn luyện được cắt về số dòng đó
+    assert model.max_samples == 1500
+    assert all(est.tree_.n_leaves <= 32 for est in model.estimators_)
+    pred = model.predict(X[1500:])
+    assert mae == pytest.approx(np.abs(pred - y[1500:]).mean())
+    assert rmse == pytest.approx(np.sqrt(((pred - y[1500:]) ** 2).mean()))
+    assert list(model.feature_names_in_) == list(FEATURES)
+
+
+def test_fit_forest_without_validation(data):
+    X, y = data
+    model, n_val, mae, rmse = fit_forest(X[:1], y[:1], TrainingParams(n_estimators=2, n_jobs=1))
+    assert (n_val, mae, rmse) == (0, None, None)
+
+
+def test_fit_in_process_returns_same_model(data, tmp_path):
+    X, y = data
+    np.save(tmp_path / "X.npy", np.vstack([X, X[:10]]))
+    np.save(tmp_path / "y.npy", np.concatenate([y, y[:10]]))
+    params = TrainingParams(n_estimators=3, max_leaf_nodes=16, n_jobs=1)
+    local = fit_forest(X, y, params)
+    # Process con chỉ đọc n dòng đầu của file
+    remote = _fit_in_process(str(tmp_path), len(y), params)
+    assert remote[1:] == local[1:]
+    np.testing.assert_allclose(remote[0].predict(X[:50]), local[0].predict(X[:50]))
+
+
+def test_create_job_keeps_recent_history_and_running_jobs(monkeypatch):
+    monkeypatch.setattr(training, "training_jobs", {})
+    running = create_job(TrainingParams())
+    running.trang_thai = "RUNNING"
+    done = []
+    for _ in range(4):
+        job = create_job(TrainingParams(), history=3)
+        job.trang_thai = "SUCCESS"
+        done.append(job.ma_cong_viec)
+
+    assert list(training.training_jobs) == [running.ma_cong_viec] + done[-2:]